@@ -85,6 +85,26 @@ st.markdown(
 )
 
 
+@st.cache_resource(show_spinner=False)
+def _connect_mongo_database():
+	"""Database MongoDB condiviso da tutte le sessioni (un solo client pymongo per processo).
+
+	Solleva se la connessione fallisce: st.cache_resource non salva le
+	eccezioni, quindi il rerun successivo ritenta.
+	"""
+	from backend.database import get_database_sync
+
+	return get_database_sync()
+
+
+def get_mongo_database():
+	"""Database MongoDB condiviso, None se MongoDB non e configurato o non raggiungibile."""
+	try:
+		return _connect_mongo_database()
+	except (ImportError, RuntimeError):
+		return None
+
+
 def _set_page(target: str) -> None:
 	st.session_state.page = target
 	st.rerun()
@@ -107,7 +127,10 @@ def render_sidebar() -> str:
 
 		st.markdown("---")
 		with st.expander("🔧 Status Sistema"):
-			st.caption("💾 MongoDB: Non configurato")
+			if get_mongo_database() is not None:
+				st.caption("💾 MongoDB: Connesso")
+			else:
+				st.caption("💾 MongoDB: Non configurato")
 			st.caption("🤖 Gemini AI: Non configurato")
 			st.caption("📝 Configura .env e riavvia")
 
@@ -138,6 +161,31 @@ def get_mock_metrics():
 	]
 
 
+@st.cache_data(ttl=30, show_spinner=False)
+def get_post_totals():
+	"""Totali post dai contatori MongoDB (None se MongoDB non e configurato o non risponde)."""
+	if get_mongo_database() is None:
+		return None
+	from pymongo.errors import PyMongoError
+
+	from backend.dao import SyncPostDAO, query_cache
+
+	try:
+		return SyncPostDAO(cache=query_cache).get_totals()
+	except PyMongoError:
+		# MongoDB caduto dopo la connessione: la home resta sui valori di esempio
+		return None
+
+
+def get_home_metrics():
+	metrics = [dict(metric) for metric in get_mock_metrics()]
+	totals = get_post_totals()
+	if totals is not None:
+		metrics[0].update(value=str(totals["total"]), delta=None)
+		metrics[1].update(value=str(totals["by_status"].get("scheduled", 0)), delta=None)
+	return metrics
+
+
 @st.cache_data(ttl=120)
 def get_mock_calendar():
 	today = datetime.now()
@@ -200,7 +248,7 @@ def render_home() -> None:
 	st.markdown("---")
 
 	metric_cols = st.columns(4)
-	for col, metric in zip(metric_cols, get_mock_metrics()):
+	for col, metric in zip(metric_cols, get_home_metrics()):
 		with col:
 			st.markdown('<div class="sm-card">', unsafe_allow_html=True)
 			st.metric(metric["label"], metric["value"], metric["delta"])
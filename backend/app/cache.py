@@ -0,0 +1,72 @@
+"""
+Cache in-process con TTL e stale-while-revalidate
+
+Dopo `ttl` secondi un valore e "stale": viene restituito subito mentre un
+task in background lo ricarica. Oltre `ttl + stale_ttl` il caricamento
+torna sincrono per il chiamante.
+"""
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Set
+
+
+class TTLCache:
+    """
+    Cache asincrona chiave -> valore con refresh in background.
+
+    Args:
+        ttl: secondi in cui il valore e considerato fresco
+        stale_ttl: secondi ulteriori in cui si serve il valore stale
+        max_entries: numero massimo di chiavi (si scartano le piu vecchie)
+    """
+
+    def __init__(self, ttl: float, stale_ttl: float = 0.0, max_entries: int = 1024):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self._entries: Dict[Hashable, tuple[Any, float]] = {}
+        self._refreshing: Dict[Hashable, asyncio.Task] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    def _store(self, key: Hashable, value: Any) -> None:
+        # I valori None (errore/nessun dato) non vengono messi in cache
+        if value is None:
+            return
+        self._entries.pop(key, None)
+        self._entries[key] = (value, time.monotonic())
+        while len(self._entries) > self.max_entries:
+            self._entries.pop(next(iter(self._entries)))
+
+    async def _refresh(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> None:
+        try:
+            self._store(key, await loader())
+        except Exception as e:
+            print(f"Errore refresh cache {key!r}: {e}")
+        finally:
+            self._refreshing.pop(key, None)
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        entry = self._entries.get(key)
+        if entry is not None:
+            value, stored_at = entry
+            age = time.monotonic() - stored_at
+            if age < self.ttl:
+                return value
+            if age < self.ttl + self.stale_ttl:
+                if key not in self._refreshing:
+                    task = asyncio.create_task(self._refresh(key, loader))
+                    self._refreshing[key] = task
+                    self._tasks.add(task)
+                    task.add_done_callback(self._tasks.discard)
+                return value
+
+        value = await loader()
+        self._store(key, value)
+        return value
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
@@ -0,0 +1,80 @@
+"""
+Circuit breaker per endpoint Graph API
+
+Dopo `failure_threshold` errori consecutivi (timeout, rete, 5xx) il circuito
+si apre e le chiamate falliscono subito per `reset_timeout` secondi; poi una
+sola chiamata di prova decide se richiuderlo.
+"""
+
+import os
+import time
+from typing import Dict
+
+from backend.app.errors import GraphCircuitOpenError
+
+
+FAILURE_THRESHOLD = int(os.getenv("INSTAGRAM_BREAKER_FAILURES", "5"))
+RESET_TIMEOUT = float(os.getenv("INSTAGRAM_BREAKER_RESET", "30"))
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = FAILURE_THRESHOLD,
+        reset_timeout: float = RESET_TIMEOUT,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+
+    def before_call(self) -> None:
+        """
+        Raises:
+            GraphCircuitOpenError: se il circuito e aperto (o la prova e gia in corso)
+        """
+        if self.state == self.CLOSED:
+            return
+
+        now = time.monotonic()
+        elapsed = now - self.opened_at
+        if elapsed >= self.reset_timeout:
+            # Lascia passare una sola chiamata di prova; se non arriva un esito
+            # (es. chiamata cancellata) ne passa un'altra dopo reset_timeout
+            self.state = self.HALF_OPEN
+            self.opened_at = now
+            return
+
+        retry_after = max(0.0, self.reset_timeout - elapsed)
+        raise GraphCircuitOpenError(
+            f"Graph API non disponibile ({self.name}), circuito aperto",
+            retry_after=retry_after,
+        )
+
+    def record_success(self) -> None:
+        self.state = self.CLOSED
+        self.failures = 0
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    breaker = _breakers.get(name)
+    if breaker is None:
+        breaker = CircuitBreaker(name)
+        _breakers[name] = breaker
+    return breaker
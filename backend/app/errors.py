@@ -0,0 +1,44 @@
+"""
+Errori strutturati delle chiamate Graph API
+"""
+
+from typing import Optional
+
+
+class GraphAPIError(Exception):
+    """Errore generico di una chiamata Graph API."""
+
+    def __init__(
+        self,
+        message: str,
+        status_code: Optional[int] = None,
+        code: Optional[int] = None,
+    ):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+        self.code = code
+
+
+class GraphRequestError(GraphAPIError):
+    """Richiesta rifiutata da Graph (4xx): ripeterla uguale non serve."""
+
+
+class GraphRateLimitError(GraphRequestError):
+    """Quota esaurita anche dopo l'attesa in coda."""
+
+    def __init__(self, message: str, retry_after: float, **kwargs):
+        super().__init__(message, **kwargs)
+        self.retry_after = retry_after
+
+
+class GraphUnavailableError(GraphAPIError):
+    """Graph non raggiungibile (timeout, errori di rete, 5xx) dopo i retry."""
+
+
+class GraphCircuitOpenError(GraphUnavailableError):
+    """Circuit breaker aperto: la chiamata fallisce subito senza andare in rete."""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
@@ -0,0 +1,153 @@
+"""
+Pipeline di pubblicazione Instagram
+
+Per ogni post: crea il container media -> attende che sia pronto -> pubblica.
+Piu post vengono pubblicati in parallelo con un limite di concorrenza.
+"""
+
+import asyncio
+import os
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from backend.app.errors import GraphAPIError
+from backend.app.richieste import RichiesteClient
+
+
+PUBLISH_CONCURRENCY = int(os.getenv("INSTAGRAM_PUBLISH_CONCURRENCY", "5"))
+CONTAINER_POLL_INTERVAL = 2.0
+CONTAINER_READY_TIMEOUT = 60.0
+
+
+class PublishError(Exception):
+    """Errore in una fase della pipeline di pubblicazione."""
+
+
+async def wait_until_ready(
+    container_id: str,
+    poll_interval: float = CONTAINER_POLL_INTERVAL,
+    timeout: float = CONTAINER_READY_TIMEOUT,
+) -> None:
+    """
+    Attende che il container sia FINISHED (le immagini di solito lo sono subito).
+
+    Raises:
+        PublishError: container in errore/scaduto o timeout
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while True:
+        status = await RichiesteClient.get_container_status(container_id)
+        status_code = (status or {}).get("status_code")
+
+        if status_code in ("FINISHED", "PUBLISHED"):
+            return
+        if status_code in ("ERROR", "EXPIRED"):
+            raise PublishError(f"Container {container_id} in stato {status_code}: {status.get('status', '')}")
+        if loop.time() + poll_interval > deadline:
+            raise PublishError(f"Container {container_id} non pronto entro {timeout:.0f}s")
+
+        await asyncio.sleep(poll_interval)
+
+
+async def create_container(url_risorsa: str, caption: str, user_id: str) -> str:
+    """
+    Crea il container media (senza attendere che sia pronto).
+
+    Returns:
+        str: creation_id
+
+    Raises:
+        PublishError: se Graph non crea il container
+    """
+    try:
+        container = await RichiesteClient.create_media(url_risorsa, caption, user_id)
+    except GraphAPIError as e:
+        raise PublishError(str(e)) from e
+    if not container or "id" not in container:
+        raise PublishError("Creazione container fallita")
+    return container["id"]
+
+
+async def container_status(creation_id: str) -> Optional[str]:
+    """
+    status_code del container (IN_PROGRESS, FINISHED, PUBLISHED, ERROR, EXPIRED)
+
+    Raises:
+        PublishError: Graph non risponde (stato sconosciuto)
+    """
+    try:
+        status = await RichiesteClient.get_container_status(creation_id)
+    except GraphAPIError as e:
+        raise PublishError(str(e)) from e
+    return (status or {}).get("status_code")
+
+
+async def publish_container(user_id: str, creation_id: str) -> str:
+    """
+    Pubblica un container pronto: unico passo non idempotente della pipeline.
+
+    Returns:
+        str: media_id pubblicato
+
+    Raises:
+        PublishError: se la pubblicazione fallisce (o l'esito e sconosciuto)
+    """
+    try:
+        published = await RichiesteClient.publish_media(user_id, creation_id)
+    except GraphAPIError as e:
+        raise PublishError(str(e)) from e
+    if not published or "id" not in published:
+        raise PublishError(f"Pubblicazione container {creation_id} fallita")
+    return published["id"]
+
+
+async def publish_post(url_risorsa: str, caption: str, user_id: str) -> Dict[str, Any]:
+    """
+    Esegue l'intera sequenza create -> wait -> publish per un singolo post.
+
+    Returns:
+        Dict: creation_id e media_id pubblicato
+
+    Raises:
+        PublishError: se una fase fallisce
+    """
+    creation_id = await create_container(url_risorsa, caption, user_id)
+    try:
+        await wait_until_ready(creation_id)
+    except GraphAPIError as e:
+        raise PublishError(str(e)) from e
+    media_id = await publish_container(user_id, creation_id)
+    return {"creation_id": creation_id, "media_id": media_id}
+
+
+async def publish_batch(
+    posts: List[Dict[str, str]],
+    concurrency: Optional[int] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Pubblica piu post in parallelo (al massimo `concurrency` alla volta).
+
+    Args:
+        posts: lista di dict con url_risorsa, caption, user_id
+
+    Yields:
+        Dict: esito per post (index nella lista originale), in ordine di completamento
+    """
+    semaphore = asyncio.Semaphore(concurrency or PUBLISH_CONCURRENCY)
+
+    async def _run(index: int, post: Dict[str, str]) -> Dict[str, Any]:
+        async with semaphore:
+            try:
+                result = await publish_post(post["url_risorsa"], post["caption"], post["user_id"])
+                return {"index": index, "status": "published", **result}
+            except PublishError as e:
+                return {"index": index, "status": "failed", "error": str(e)}
+
+    tasks = [asyncio.create_task(_run(i, post)) for i, post in enumerate(posts)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # Client disconnesso o generatore chiuso: non lasciare task orfani
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,147 @@
+"""
+Rate limiting per chiamate Graph API
+
+Token bucket asincrono per account (user_id o token): le chiamate oltre
+quota vengono messe in coda invece di fallire. I bucket si adattano agli
+header di utilizzo restituiti da Meta (X-App-Usage, X-Business-Use-Case-Usage).
+"""
+
+import asyncio
+import json
+import os
+import time
+from typing import Dict, Mapping, Optional
+
+
+CALLS_PER_HOUR = float(os.getenv("INSTAGRAM_CALLS_PER_HOUR", "200"))
+PUBLISH_PER_DAY = float(os.getenv("INSTAGRAM_PUBLISH_PER_DAY", "100"))
+
+# Sopra questa percentuale di utilizzo si rallenta progressivamente
+USAGE_THROTTLE_THRESHOLD = 75.0
+# Pausa quando la quota e esaurita ma Meta non indica quando riprovare
+DEFAULT_BLOCK_SECONDS = 60.0
+
+
+class TokenBucket:
+    """
+    Token bucket con coda FIFO.
+
+    Args:
+        rate: token generati al secondo
+        capacity: token massimi accumulabili (burst)
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.throttle = 1.0
+        self.paused_until = 0.0
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate * self.throttle)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        """Attende (in coda) finche non e disponibile un token."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                await asyncio.sleep((1 - self.tokens) / (self.rate * self.throttle))
+
+    def pause(self, seconds: float) -> None:
+        """Blocca il bucket per `seconds` (es. dopo un 429)."""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+def _parse_usage_header(raw: Optional[str]) -> tuple[float, float]:
+    """
+    Estrae (utilizzo % massimo, secondi prima di riavere accesso) da un header.
+    """
+    if not raw:
+        return 0.0, 0.0
+    try:
+        data = json.loads(raw)
+    except ValueError:
+        return 0.0, 0.0
+
+    # X-App-Usage e un dict piatto, X-Business-Use-Case-Usage e {id: [dict, ...]}
+    entries = [data]
+    if all(isinstance(value, list) for value in data.values()):
+        entries = [entry for value in data.values() for entry in value]
+
+    usage = 0.0
+    regain_seconds = 0.0
+    for entry in entries:
+        for field in ("call_count", "total_cputime", "total_time"):
+            usage = max(usage, float(entry.get(field, 0) or 0))
+        regain_minutes = float(entry.get("estimated_time_to_regain_access", 0) or 0)
+        regain_seconds = max(regain_seconds, regain_minutes * 60)
+    return usage, regain_seconds
+
+
+class RateLimiter:
+    """
+    Registro dei bucket per account.
+
+    Ogni chiave ha un bucket "calls" (chiamate/ora) e uno "publish"
+    (pubblicazioni/24h, limite contenuti di Instagram).
+    """
+
+    def __init__(
+        self,
+        calls_per_hour: float = CALLS_PER_HOUR,
+        publish_per_day: float = PUBLISH_PER_DAY,
+    ):
+        self._limits = {
+            "calls": (calls_per_hour / 3600, calls_per_hour),
+            "publish": (publish_per_day / 86400, publish_per_day),
+        }
+        self._buckets: Dict[tuple[str, str], TokenBucket] = {}
+
+    def bucket(self, key: str, kind: str = "calls") -> TokenBucket:
+        bucket = self._buckets.get((key, kind))
+        if bucket is None:
+            rate, capacity = self._limits[kind]
+            bucket = TokenBucket(rate, capacity)
+            self._buckets[(key, kind)] = bucket
+        return bucket
+
+    async def acquire(self, key: str, kind: str = "calls") -> None:
+        await self.bucket(key, "calls").acquire()
+        if kind != "calls":
+            await self.bucket(key, kind).acquire()
+
+    def update_from_headers(self, key: str, headers: Mapping[str, str]) -> None:
+        """
+        Adatta il ritmo del bucket "calls" all'utilizzo riportato da Meta.
+        """
+        app_usage, app_regain = _parse_usage_header(headers.get("x-app-usage"))
+        buc_usage, buc_regain = _parse_usage_header(headers.get("x-business-use-case-usage"))
+        usage = max(app_usage, buc_usage)
+        regain_seconds = max(app_regain, buc_regain)
+
+        bucket = self.bucket(key)
+        if regain_seconds > 0 or usage >= 100:
+            bucket.pause(regain_seconds or DEFAULT_BLOCK_SECONDS)
+        elif usage > USAGE_THROTTLE_THRESHOLD:
+            # Da 75% a 100% il ritmo scende linearmente fino al 10%
+            remaining = (100 - usage) / (100 - USAGE_THROTTLE_THRESHOLD)
+            bucket.throttle = max(0.1, remaining)
+        else:
+            bucket.throttle = 1.0
+
+
+rate_limiter = RateLimiter()
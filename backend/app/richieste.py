@@ -1,14 +1,55 @@
 import os
+import asyncio
+import hashlib
+import importlib.util
+import random
+import re
+from datetime import datetime
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Hashable, Optional
 
 import httpx
 from dotenv import load_dotenv
 
+from backend.app.cache import TTLCache
+from backend.app.circuit_breaker import CircuitBreaker, get_breaker
+from backend.app.errors import (
+    GraphRateLimitError,
+    GraphRequestError,
+    GraphUnavailableError,
+)
+from backend.app.rate_limit import DEFAULT_BLOCK_SECONDS, rate_limiter
+
 
 load_dotenv()
 
 TOKEN_SEGRETO = os.getenv("INSTAGRAM_ACCESS_TOKEN", "")
 BASE_URL = "https://graph.instagram.com/v24.0"
 DEFAULT_TIMEOUT = httpx.Timeout(10.0, connect=5.0)
+MEDIA_FIELDS = "id,caption,media_url,timestamp"
+MEDIA_PAGE_SIZE = 50
+INSIGHTS_METRICS = "views,likes,comments,shares"
+
+# Pool connessioni verso Graph API (condiviso da tutto il processo)
+MAX_CONNECTIONS = int(os.getenv("INSTAGRAM_MAX_CONNECTIONS", "100"))
+MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("INSTAGRAM_MAX_KEEPALIVE", "20"))
+KEEPALIVE_EXPIRY = float(os.getenv("INSTAGRAM_KEEPALIVE_EXPIRY", "30"))
+HTTP2_ENABLED = os.getenv("INSTAGRAM_HTTP2", "true").lower() in ("1", "true", "yes")
+
+# Profilo (/me): cambia raramente, servito da cache per token
+PROFILE_CACHE_TTL = float(os.getenv("INSTAGRAM_PROFILE_CACHE_TTL", "300"))
+PROFILE_CACHE_STALE_TTL = float(os.getenv("INSTAGRAM_PROFILE_CACHE_STALE_TTL", "3600"))
+
+# Codici errore Graph API che indicano quota superata
+RATE_LIMIT_ERROR_CODES = {4, 17, 32, 613}
+RATE_LIMIT_RETRIES = 3
+
+# Retry con backoff esponenziale e jitter (solo GET, idempotenti)
+GET_RETRIES = int(os.getenv("INSTAGRAM_GET_RETRIES", "2"))
+RETRY_BASE_DELAY = 0.5
+RETRY_MAX_DELAY = 8.0
+
+_http_client: httpx.AsyncClient | None = None
+_profile_cache = TTLCache(ttl=PROFILE_CACHE_TTL, stale_ttl=PROFILE_CACHE_STALE_TTL)
 
 
 def _auth_headers() -> dict:
@@ -19,54 +60,303 @@ def _auth_headers() -> dict:
     }
 
 
-def _safe_request(method: str, url: str, **kwargs):
+def _http2_available() -> bool:
+    # HTTP/2 richiede l'extra httpx[http2] (pacchetto h2)
+    return HTTP2_ENABLED and importlib.util.find_spec("h2") is not None
+
+
+async def open_http_client() -> httpx.AsyncClient:
+    """
+    Crea il client HTTP condiviso (keep-alive, HTTP/2 se disponibile).
+    Da chiamare all'avvio dell'applicazione.
+    """
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            timeout=DEFAULT_TIMEOUT,
+            http2=_http2_available(),
+            limits=httpx.Limits(
+                max_connections=MAX_CONNECTIONS,
+                max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=KEEPALIVE_EXPIRY,
+            ),
+        )
+    return _http_client
+
+
+async def close_http_client() -> None:
+    """
+    Chiude il client HTTP condiviso e le connessioni nel pool.
+    """
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+async def get_http_client() -> httpx.AsyncClient:
+    # Fallback per script/test che non passano dal lifespan FastAPI
+    if _http_client is None or _http_client.is_closed:
+        return await open_http_client()
+    return _http_client
+
+
+def _token_key() -> str:
+    # Chiave di rate limit per chiamate non legate a uno user_id
+    return "token:" + hashlib.sha256(TOKEN_SEGRETO.encode()).hexdigest()[:16]
+
+
+def _is_rate_limited(response: httpx.Response) -> bool:
+    if response.status_code == 429:
+        return True
+    if response.status_code not in (400, 403):
+        return False
+    try:
+        error = response.json().get("error", {})
+    except ValueError:
+        return False
+    return error.get("code") in RATE_LIMIT_ERROR_CODES
+
+
+def _retry_after(response: httpx.Response) -> float:
+    try:
+        return float(response.headers.get("retry-after", DEFAULT_BLOCK_SECONDS))
+    except ValueError:
+        return DEFAULT_BLOCK_SECONDS
+
+
+class SingleFlight:
+    """
+    Coalescing di chiamate identiche concorrenti: chi arriva mentre una
+    chiamata con la stessa chiave e in corso ne attende il risultato.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.create_task(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+        # shield: se un chiamante viene cancellato la chiamata condivisa prosegue
+        return await asyncio.shield(task)
+
+
+_single_flight = SingleFlight()
+
+
+async def _safe_request(method: str, url: str, **kwargs):
+    if method != "GET":
+        return await _send_request(method, url, **kwargs)
+
+    params = kwargs.get("params") or {}
+    key = (method, url, tuple(sorted((k, str(v)) for k, v in params.items())))
+    return await _single_flight.do(key, lambda: _send_request(method, url, **kwargs))
+
+
+def _endpoint_name(method: str, url: str) -> str:
+    # Un circuit breaker per endpoint: gli ID numerici non contano
+    path = httpx.URL(url).path.removeprefix(httpx.URL(BASE_URL).path)
+    return f"{method} " + re.sub(r"/\d+", "/{id}", path)
+
+
+def _backoff_delay(attempt: int) -> float:
+    # Full jitter: attesa casuale tra 0 e il backoff esponenziale
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+
+
+def _raise_request_error(response: httpx.Response) -> None:
     try:
-        response = httpx.request(method, url, timeout=DEFAULT_TIMEOUT, **kwargs)
-        response.raise_for_status()
-        return response.json()
-    except httpx.HTTPError:
-        return None
+        error = response.json().get("error", {})
+    except ValueError:
+        error = {}
+    message = error.get("message") or f"HTTP {response.status_code}"
+    if _is_rate_limited(response):
+        raise GraphRateLimitError(
+            message,
+            retry_after=_retry_after(response),
+            status_code=response.status_code,
+            code=error.get("code"),
+        )
+    raise GraphRequestError(message, status_code=response.status_code, code=error.get("code"))
+
+
+async def _send_once(client: httpx.AsyncClient, method: str, url: str, key: str, limit_kind: str, **kwargs):
+    for _ in range(RATE_LIMIT_RETRIES + 1):
+        # Oltre quota la chiamata resta in coda sul bucket dell'account
+        await rate_limiter.acquire(key, limit_kind)
+        response = await client.request(method, url, **kwargs)
+        rate_limiter.update_from_headers(key, response.headers)
+        if not _is_rate_limited(response):
+            break
+        rate_limiter.bucket(key).pause(_retry_after(response))
+    return response
+
+
+async def _send_request(
+    method: str,
+    url: str,
+    limit_key: str | None = None,
+    limit_kind: str = "calls",
+    **kwargs,
+):
+    """
+    Esegue la chiamata con rate limit, retry (solo GET) e circuit breaker.
+
+    Raises:
+        GraphCircuitOpenError: endpoint in errore, si fallisce senza chiamare
+        GraphUnavailableError: timeout/rete/5xx anche dopo i retry
+        GraphRequestError: risposta 4xx (GraphRateLimitError se quota esaurita)
+    """
+    client = await get_http_client()
+    key = limit_key or _token_key()
+    breaker = get_breaker(_endpoint_name(method, url))
+    attempts = GET_RETRIES + 1 if method == "GET" else 1
+
+    for attempt in range(attempts):
+        breaker.before_call()
+        try:
+            response = await _send_once(client, method, url, key, limit_kind, **kwargs)
+        except httpx.TransportError as e:
+            failure = f"{type(e).__name__}: {e}"
+        else:
+            if response.status_code < 500:
+                # Anche un 4xx dimostra che Graph risponde
+                breaker.record_success()
+                if response.is_error:
+                    _raise_request_error(response)
+                return response.json()
+            failure = f"HTTP {response.status_code}"
+
+        breaker.record_failure()
+        if attempt + 1 < attempts and breaker.state != CircuitBreaker.OPEN:
+            await asyncio.sleep(_backoff_delay(attempt))
+
+    raise GraphUnavailableError(f"Graph API non disponibile ({failure})")
+
+
+def parse_graph_timestamp(value: str) -> datetime:
+    # Formato Graph API: 2024-01-31T12:00:00+0000
+    return datetime.strptime(value, "%Y-%m-%dT%H:%M:%S%z")
+
+
+async def _fetch_user():
+    url = f"{BASE_URL}/me"
+    params = {
+        "fields": "user_id,username,profile_picture_url,followers_count",
+        "access_token": TOKEN_SEGRETO,
+    }
+    return await _safe_request("GET", url, params=params)
 
 
 class RichiesteClient:
     @staticmethod
-    def retrieve_user():
+    async def retrieve_user():
         if not TOKEN_SEGRETO:
             return None
-        url = f"{BASE_URL}/me"
-        params = {
-            "fields": "user_id,username,profile_picture_url,followers_count",
-            "access_token": TOKEN_SEGRETO,
-        }
-        return _safe_request("GET", url, params=params)
+        return await _profile_cache.get_or_load(_token_key(), _fetch_user)
 
     @staticmethod
-    def create_media(url_risorsa: str, caption: str, user_id: str):
+    async def create_media(url_risorsa: str, caption: str, user_id: str):
         if not TOKEN_SEGRETO:
             return None
         url = f"{BASE_URL}/{user_id}/media"
         payload = {"image_url": url_risorsa, "caption": caption}
-        return _safe_request("POST", url, headers=_auth_headers(), json=payload)
+        return await _safe_request(
+            "POST", url, limit_key=user_id, headers=_auth_headers(), json=payload
+        )
 
     @staticmethod
-    def publish_media(user_id: str, media_id: str):
+    async def publish_media(user_id: str, media_id: str):
         if not TOKEN_SEGRETO:
             return None
         url = f"{BASE_URL}/{user_id}/media_publish"
         payload = {"creation_id": media_id}
-        return _safe_request("POST", url, headers=_auth_headers(), params=payload)
+        return await _safe_request(
+            "POST",
+            url,
+            limit_key=user_id,
+            limit_kind="publish",
+            headers=_auth_headers(),
+            params=payload,
+        )
+
+    @staticmethod
+    async def get_container_status(container_id: str):
+        if not TOKEN_SEGRETO:
+            return None
+        url = f"{BASE_URL}/{container_id}"
+        params = {"fields": "status_code,status", "access_token": TOKEN_SEGRETO}
+        return await _safe_request("GET", url, params=params)
+
+    @staticmethod
+    async def get_media_insights(media_id: str, user_id: Optional[str] = None):
+        if not TOKEN_SEGRETO:
+            return None
+        url = f"{BASE_URL}/{media_id}/insights"
+        params = {"metric": INSIGHTS_METRICS, "access_token": TOKEN_SEGRETO}
+        return await _safe_request("GET", url, limit_key=user_id, params=params)
 
     @staticmethod
-    def get_all_posts(user_id: str):
+    async def get_all_posts(
+        user_id: str,
+        limit: int = 20,
+        after: Optional[str] = None,
+        until: Optional[datetime] = None,
+    ):
         if not TOKEN_SEGRETO:
             return None
         url = f"{BASE_URL}/{user_id}/media"
         params = {
-            "fields": "id,caption,media_url",
+            "fields": MEDIA_FIELDS,
             "access_token": TOKEN_SEGRETO,
-            "limit": 20,
+            "limit": limit,
         }
-        return _safe_request("GET", url, params=params)
+        if after:
+            params["after"] = after
+        if until:
+            # Paginazione temporale di Graph: solo media precedenti a until
+            params["until"] = int(until.timestamp())
+        return await _safe_request("GET", url, limit_key=user_id, params=params)
+
+    @staticmethod
+    async def iter_all_posts(
+        user_id: str,
+        since: Optional[datetime] = None,
+        page_size: int = MEDIA_PAGE_SIZE,
+        until: Optional[datetime] = None,
+    ) -> AsyncIterator[dict]:
+        """
+        Scorre tutti i media dell'account seguendo i cursori di paginazione.
+
+        Tiene in memoria una sola pagina alla volta. I media arrivano dal piu
+        recente: con `since` (datetime timezone-aware) lo scorrimento si ferma
+        al primo media piu vecchio del limite; con `until` parte dai media
+        precedenti a until (quelli piu recenti vengono comunque scartati).
+        """
+        after = None
+        while True:
+            page = await RichiesteClient.get_all_posts(
+                user_id, limit=page_size, after=after, until=until
+            )
+            if not page:
+                return
+
+            for media in page.get("data", []):
+                if "timestamp" in media:
+                    timestamp = parse_graph_timestamp(media["timestamp"])
+                    if since and timestamp < since:
+                        return
+                    if until and timestamp > until:
+                        continue
+                yield media
+
+            paging = page.get("paging", {})
+            after = paging.get("cursors", {}).get("after")
+            if not paging.get("next") or not after:
+                return
 
 
 richiesteClass = RichiesteClient
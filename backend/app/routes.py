@@ -1,7 +1,20 @@
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+import hashlib
+import json
+from datetime import datetime
+from typing import Optional
 
-from backend.app.richieste import RichiesteClient
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+
+from backend.app.errors import (
+    GraphAPIError,
+    GraphCircuitOpenError,
+    GraphRateLimitError,
+    GraphRequestError,
+)
+from backend.app.pubblicazione import publish_batch
+from backend.app.richieste import PROFILE_CACHE_STALE_TTL, PROFILE_CACHE_TTL, RichiesteClient
 
 
 router = APIRouter()
@@ -14,6 +27,17 @@ class InstagramMediaPayload(BaseModel):
     creation_id: str
 
 
+class BatchPostItem(BaseModel):
+    url_risorsa: str
+    caption: str
+    user_id: str
+
+
+class BatchPublishPayload(BaseModel):
+    posts: list[BatchPostItem] = Field(..., min_length=1, max_length=100)
+    concurrency: Optional[int] = Field(None, ge=1, le=25)
+
+
 def _raise_service_error() -> None:
     raise HTTPException(
         status_code=503,
@@ -21,31 +45,133 @@ def _raise_service_error() -> None:
     )
 
 
+def _raise_graph_error(error: GraphAPIError) -> None:
+    if isinstance(error, GraphRateLimitError):
+        raise HTTPException(
+            status_code=429,
+            detail="Limite di richieste Instagram raggiunto, riprova piu tardi",
+            headers={"Retry-After": f"{error.retry_after:.0f}"},
+        )
+    if isinstance(error, GraphRequestError):
+        # 401/403: token non valido o permessi mancanti, non e colpa del client
+        status_code = 502 if error.status_code in (401, 403) else 400
+        raise HTTPException(status_code=status_code, detail=f"Instagram: {error.message}")
+    if isinstance(error, GraphCircuitOpenError):
+        raise HTTPException(
+            status_code=503,
+            detail="Instagram non raggiungibile, riprova piu tardi",
+            headers={"Retry-After": f"{error.retry_after:.0f}"},
+        )
+    _raise_service_error()
+
+
 @router.get("/")
 @router.get("/profile")
-def retrieve_profile():
-    result = RichiesteClient.retrieve_user()
+async def retrieve_profile(request: Request, response: Response):
+    try:
+        result = await RichiesteClient.retrieve_user()
+    except GraphAPIError as e:
+        _raise_graph_error(e)
     if not result:
         _raise_service_error()
+
+    body = json.dumps(result, sort_keys=True).encode()
+    etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": (
+            f"private, max-age={PROFILE_CACHE_TTL:.0f}, "
+            f"stale-while-revalidate={PROFILE_CACHE_STALE_TTL:.0f}"
+        ),
+    }
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+
+    response.headers.update(headers)
     return result
 
 
 @router.post("/createPost")
-def create_draft(payload: InstagramMediaPayload):
-    result = RichiesteClient.create_media(
-        payload.url_risorsa,
-        payload.caption,
-        payload.user_id,
-    )
+async def create_draft(payload: InstagramMediaPayload):
+    try:
+        result = await RichiesteClient.create_media(
+            payload.url_risorsa,
+            payload.caption,
+            payload.user_id,
+        )
+    except GraphAPIError as e:
+        _raise_graph_error(e)
     if not result:
         _raise_service_error()
     return result
 
 
 @router.post("/PostMedia")
-def post_media(payload: InstagramMediaPayload):
-    result = RichiesteClient.publish_media(payload.user_id, payload.creation_id)
+async def post_media(payload: InstagramMediaPayload):
+    try:
+        result = await RichiesteClient.publish_media(payload.user_id, payload.creation_id)
+    except GraphAPIError as e:
+        _raise_graph_error(e)
     if not result:
         _raise_service_error()
     return result
 
+
+@router.get("/posts/{user_id}/stream")
+async def stream_posts(user_id: str, since: Optional[datetime] = None):
+    if since and since.tzinfo is None:
+        raise HTTPException(status_code=422, detail="Il parametro since deve includere il fuso orario")
+
+    async def _ndjson():
+        try:
+            async for media in RichiesteClient.iter_all_posts(user_id, since=since):
+                yield json.dumps(media) + "\n"
+        except GraphAPIError as e:
+            # Lo status HTTP e gia stato inviato: l'errore chiude lo stream
+            yield json.dumps({"error": e.message}) + "\n"
+
+    return StreamingResponse(_ndjson(), media_type="application/x-ndjson")
+
+
+@router.post("/publishBatch")
+async def post_media_batch(payload: BatchPublishPayload):
+    posts = [item.model_dump() for item in payload.posts]
+
+    async def _ndjson():
+        async for result in publish_batch(posts, concurrency=payload.concurrency):
+            yield json.dumps(result) + "\n"
+
+    return StreamingResponse(_ndjson(), media_type="application/x-ndjson")
+
+
+@router.get("/media/{user_id}")
+async def list_media(user_id: str, limit: int = Query(50, ge=1, le=200), skip: int = Query(0, ge=0)):
+    # Letture dal mirror locale (aggiornato da backend.services.media_sync)
+    try:
+        # Import locale: motor/pymongo sono extra (requirements-full.txt)
+        from backend.dao.media_dao import MediaDAO
+        from backend.dao.query_cache import query_cache
+        content = await MediaDAO(cache=query_cache).get_media_json(user_id, limit=limit, skip=skip)
+        return Response(content=content, media_type="application/json")
+    except (ImportError, RuntimeError):
+        _raise_service_error()
+
+
+@router.get("/posts/export")
+async def export_posts(status: Optional[str] = None, social_target: Optional[str] = None):
+    try:
+        from backend.dao.post_dao import PostDAO, PostStatus
+        dao = PostDAO()
+    except (ImportError, RuntimeError):
+        _raise_service_error()
+    try:
+        status_filter = PostStatus(status) if status else None
+    except ValueError:
+        raise HTTPException(status_code=422, detail=f"Status non valido: {status}")
+
+    async def _ndjson():
+        # I documenti escono man mano che arrivano i batch da MongoDB
+        async for post in dao.export_posts(status=status_filter, social_target=social_target):
+            yield json.dumps(post, default=str) + "\n"
+
+    return StreamingResponse(_ndjson(), media_type="application/x-ndjson")
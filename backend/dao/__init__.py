@@ -3,10 +3,22 @@ DAO Package
 Issue #16: Creazione DAO per gestione dati
 """
 
-from .base_dao import BaseDAO
+from .base_dao import BaseDAO, BulkOperation, BulkWriteSummary, VersionConflictError, document_version
 from .post_dao import PostDAO
+from .media_dao import MediaDAO
+from .query_cache import QueryCache, query_cache
+from .sync_dao import SyncBaseDAO, SyncPostDAO
 
 __all__ = [
     "BaseDAO",
-    "PostDAO"
+    "BulkOperation",
+    "BulkWriteSummary",
+    "PostDAO",
+    "MediaDAO",
+    "QueryCache",
+    "query_cache",
+    "SyncBaseDAO",
+    "SyncPostDAO",
+    "VersionConflictError",
+    "document_version",
 ]
@@ -6,13 +6,150 @@ Questa classe base fornisce metodi CRUD generici per tutte le entità.
 Ogni DAO specifico estende questa classe.
 """
 
-from typing import TypeVar, Generic, List, Dict, Any, Optional
+from typing import TypeVar, Generic, List, Dict, Any, Optional, Tuple, AsyncIterator, TypedDict
 from motor.motor_asyncio import AsyncIOMotorCollection
-from bson import ObjectId
+from pymongo import DeleteMany, DeleteOne, IndexModel, InsertOne, ReturnDocument, UpdateMany, UpdateOne
+from pymongo.errors import BulkWriteError
+from pymongo.write_concern import WriteConcern
+from bson import ObjectId, json_util
+from bson.errors import InvalidId
 from datetime import datetime
+import base64
+
+from .json_codec import JSON_CODEC_OPTIONS, encode_json
+from .query_cache import MISSING, QueryCache
 
 T = TypeVar('T')
 
+# Incrementato ad ogni aggiornamento: base per il compare-and-swap
+VERSION_FIELD = "version"
+# Versione dei documenti creati prima del versioning (campo assente)
+LEGACY_VERSION = 0
+
+
+def document_version(document: Dict[str, Any]) -> int:
+    """
+    Versione da passare come expected_version (0 se il documento non ha version)
+    """
+    return document.get(VERSION_FIELD) or LEGACY_VERSION
+
+
+class VersionConflictError(Exception):
+    """
+    Il documento e stato modificato da altri dopo la lettura
+    (la versione attesa non corrisponde a quella salvata)
+    """
+
+    def __init__(self, document_id: Any, expected_version: int, current_version: Optional[int]):
+        self.document_id = document_id
+        self.expected_version = expected_version
+        self.current_version = current_version
+        super().__init__(
+            f"Conflitto di versione su {document_id}: "
+            f"attesa {expected_version}, attuale {current_version}"
+        )
+
+
+class BulkOperation(TypedDict, total=False):
+    """
+    Operazione per BaseDAO.bulk_write
+
+    op: "insert" | "update" | "upsert" | "delete"
+    document: documento da inserire (insert)
+    filter: filtro (update, upsert, delete)
+    update: campi da impostare ($set) oppure documento con operatori ($inc, ...)
+    many: applica a tutti i documenti del filtro (update, delete)
+    """
+    op: str
+    document: Dict[str, Any]
+    filter: Dict[str, Any]
+    update: Dict[str, Any]
+    many: bool
+
+
+class BulkWriteSummary(TypedDict):
+    inserted: int
+    matched: int
+    modified: int
+    upserted: int
+    deleted: int
+    errors: List[Dict[str, Any]]
+
+
+# Paginazione keyset (cursor-based)
+# Il token di continuazione contiene i valori delle chiavi di ordinamento
+# (piu _id) dell'ultimo documento della pagina precedente.
+
+def keyset_sort(sort: Optional[List[tuple]]) -> List[tuple]:
+    """
+    Ordinamento completo per keyset: aggiunge _id come spareggio
+    """
+    sort = list(sort or [])
+    if not any(field == "_id" for field, _ in sort):
+        direction = sort[-1][1] if sort else 1
+        sort.append(("_id", direction))
+    return sort
+
+
+def _get_path(document: Dict[str, Any], field: str) -> Any:
+    value: Any = document
+    for part in field.split("."):
+        value = value.get(part) if isinstance(value, dict) else None
+    return value
+
+
+def encode_page_token(document: Dict[str, Any], sort: List[tuple]) -> str:
+    values = [_get_path(document, field) for field, _ in sort]
+    raw = json_util.dumps(values, json_options=json_util.CANONICAL_JSON_OPTIONS)
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_page_token(token: str, sort: List[tuple]) -> List[Any]:
+    """
+    Raises:
+        ValueError: token non valido o di un ordinamento diverso
+    """
+    try:
+        values = json_util.loads(base64.urlsafe_b64decode(token.encode()).decode())
+    except Exception:
+        raise ValueError("Page token non valido")
+    if not isinstance(values, list) or len(values) != len(sort):
+        raise ValueError("Page token non valido")
+    return values
+
+
+def keyset_projection(
+    projection: Optional[Dict[str, Any]],
+    sort: List[tuple]
+) -> Optional[Dict[str, Any]]:
+    """
+    Garantisce che la proiezione includa i campi di ordinamento
+    (servono per costruire il token della pagina successiva)
+    """
+    if not projection:
+        return projection
+    projection = dict(projection)
+    exclusion = all(value in (0, False) for key, value in projection.items() if key != "_id")
+    for field, _ in sort:
+        if exclusion:
+            projection.pop(field, None)
+        else:
+            projection[field] = 1
+    return projection
+
+
+def keyset_filter(sort: List[tuple], values: List[Any]) -> Dict[str, Any]:
+    """
+    Filtro "dopo l'ultimo documento" per un ordinamento su piu campi:
+    (k1 > v1) OR (k1 = v1 AND k2 > v2) OR ... (con < per campi discendenti)
+    """
+    clauses = []
+    for i, (field, direction) in enumerate(sort):
+        clause = {prev_field: values[j] for j, (prev_field, _) in enumerate(sort[:i])}
+        clause[field] = {"$gt" if direction == 1 else "$lt": values[i]}
+        clauses.append(clause)
+    return {"$or": clauses}
+
 
 class BaseDAO(Generic[T]):
     """
@@ -21,19 +158,70 @@ class BaseDAO(Generic[T]):
     Issue #20: Definire struttura DAO per gestione dati
     TODO:
     - Aggiungere validazione con Pydantic
-    - Implementare paginazione
-    - Aggiungere cache per query frequenti
     - Logging operazioni
     """
+
+    # Indici richiesti dalle query del DAO (creati da ensure_indexes)
+    INDEXES: List[IndexModel] = []
     
-    def __init__(self, collection: AsyncIOMotorCollection):
+    def __init__(self, collection: AsyncIOMotorCollection, cache: Optional[QueryCache] = None):
         """
         Inizializza DAO con collection MongoDB
         
         Args:
             collection: Collection MongoDB
-        """-
+            cache: Cache dei risultati di find_one/find_many/find_page/count
+                (None = nessuna cache); le scritture del DAO la invalidano
+        """
         self.collection = collection
+        self.cache = cache
+        # Stessa collection, decodifica con _id e date gia in stringa
+        self.json_collection = collection.with_options(codec_options=JSON_CODEC_OPTIONS)
+    
+    
+    async def _cached_read(
+        self,
+        operation: str,
+        loader,
+        filter_query: Optional[Dict[str, Any]] = None,
+        sort: Optional[List[tuple]] = None,
+        positional: bool = False,
+        **params: Any
+    ) -> Any:
+        if self.cache is None:
+            return await loader()
+        
+        name = self.collection.name
+        key = QueryCache.make_key(name, operation, filter=filter_query, sort=sort, **params)
+        value = self.cache.get(key)
+        if value is not MISSING:
+            return value
+        
+        generation = self.cache.generation(name)
+        value = await loader()
+        self.cache.put(key, value, generation, filter_query, sort, positional)
+        return value
+    
+    
+    @staticmethod
+    def _target_id(filter_query: Dict[str, Any]) -> Any:
+        # _id del documento se il filtro e {"_id": valore}, altrimenti None
+        if list(filter_query) == ["_id"] and not isinstance(filter_query["_id"], dict):
+            return filter_query["_id"]
+        return None
+    
+    
+    async def ensure_indexes(self) -> List[str]:
+        """
+        Crea gli indici dichiarati in INDEXES (idempotente: quelli esistenti
+        con la stessa definizione vengono ignorati da MongoDB)
+        
+        Returns:
+            List[str]: Nomi degli indici
+        """
+        if not self.INDEXES:
+            return []
+        return await self.collection.create_indexes(self.INDEXES)
     
     
     # Issue #21: Implementare metodi per inserire documenti
@@ -49,13 +237,16 @@ class BaseDAO(Generic[T]):
             
         TODO:
         - Validare documento prima di inserire
-        - Aggiungere timestamp automatici (created_at)
         - Gestire duplicati
         """
         if "created_at" not in document:
             document["created_at"] = datetime.utcnow()
+        document.setdefault("updated_at", document["created_at"])
+        document.setdefault(VERSION_FIELD, 1)
         
         result = await self.collection.insert_one(document)
+        if self.cache is not None:
+            self.cache.invalidate_insert(self.collection.name, [document])
         return str(result.inserted_id)
     
     
@@ -76,46 +267,58 @@ class BaseDAO(Generic[T]):
         for doc in documents:
             if "created_at" not in doc:
                 doc["created_at"] = datetime.utcnow()
+            doc.setdefault("updated_at", doc["created_at"])
+            doc.setdefault(VERSION_FIELD, 1)
         
         result = await self.collection.insert_many(documents)
+        if self.cache is not None:
+            self.cache.invalidate_insert(self.collection.name, documents)
         return [str(id) for id in result.inserted_ids]
     
     
     # Issue #22: Implementare metodi per leggere documenti (filtri, query)
-    async def find_one(self, filter_query: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    async def find_one(
+        self,
+        filter_query: Dict[str, Any],
+        projection: Optional[Dict[str, Any]] = None
+    ) -> Optional[Dict[str, Any]]:
         """
         Trova un documento
         
         Args:
             filter_query: Filtro MongoDB
+            projection: Campi da restituire (None = documento completo)
             
         Returns:
             Optional[Dict]: Documento trovato o None
-            
-        TODO:
-        - Convertire _id in string
-        - Proiezione campi
-        - Cache risultati
         """
-        document = await self.collection.find_one(filter_query)
-        if document and "_id" in document:
-            document["_id"] = str(document["_id"])
-        return document
+        async def load():
+            document = await self.collection.find_one(filter_query, projection)
+            if document and "_id" in document:
+                document["_id"] = str(document["_id"])
+            return document
+        
+        return await self._cached_read("find_one", load, filter_query, projection=projection)
     
     
-    async def find_by_id(self, document_id: str) -> Optional[Dict[str, Any]]:
+    async def find_by_id(
+        self,
+        document_id: str,
+        projection: Optional[Dict[str, Any]] = None
+    ) -> Optional[Dict[str, Any]]:
         """
         Trova documento per ID
         
         Args:
             document_id: ID del documento
+            projection: Campi da restituire (None = documento completo)
             
         Returns:
             Optional[Dict]: Documento o None
         """
         try:
             obj_id = ObjectId(document_id)
-            return await self.find_one({"_id": obj_id})
+            return await self.find_one({"_id": obj_id}, projection)
         except Exception as e:
             print(f"Errore conversione ID: {e}")
             return None
@@ -126,7 +329,8 @@ class BaseDAO(Generic[T]):
         filter_query: Dict[str, Any] = None,
         limit: int = 100,
         skip: int = 0,
-        sort: List[tuple] = None
+        sort: List[tuple] = None,
+        projection: Optional[Dict[str, Any]] = None
     ) -> List[Dict[str, Any]]:
         """
         Trova multipli documenti con filtri
@@ -136,124 +340,472 @@ class BaseDAO(Generic[T]):
             limit: Limite risultati
             skip: Skip risultati (paginazione)
             sort: Ordinamento [(campo, direzione), ...]
+            projection: Campi da restituire (None = documenti completi)
             
         Returns:
             List[Dict]: Lista documenti
             
         TODO:
-        - Implementare paginazione cursor-based
         - Aggiungere aggregation pipeline
         - Full-text search
+        
+        Nota:
+            skip costa O(offset) lato server: per scorrere molte pagine
+            usare find_page
         """
         if filter_query is None:
             filter_query = {}
         
-        cursor = self.collection.find(filter_query).limit(limit).skip(skip)
+        async def load():
+            cursor = self.collection.find(filter_query, projection)
+            
+            if sort:
+                cursor = cursor.sort(sort)
+            
+            cursor = cursor.skip(skip).limit(limit)
+            
+            documents = await cursor.to_list(length=limit)
+            
+            # Converti ObjectId in string
+            for doc in documents:
+                if "_id" in doc:
+                    doc["_id"] = str(doc["_id"])
+            
+            return documents
+        
+        return await self._cached_read(
+            "find_many", load, filter_query, sort, positional=skip > 0,
+            projection=projection, limit=limit, skip=skip,
+        )
+    
+    
+    async def find_many_json(
+        self,
+        filter_query: Dict[str, Any] = None,
+        limit: int = 100,
+        skip: int = 0,
+        sort: List[tuple] = None,
+        projection: Optional[Dict[str, Any]] = None
+    ) -> bytes:
+        """
+        Come find_many, ma restituisce direttamente il JSON (array) per le
+        risposte API: ObjectId e datetime sono convertiti dal decoder BSON
+        
+        Returns:
+            bytes: Array JSON UTF-8 (date in ISO 8601)
+        """
+        filter_query = filter_query or {}
+        
+        async def load():
+            cursor = self.json_collection.find(filter_query, projection)
+            
+            if sort:
+                cursor = cursor.sort(sort)
+            
+            cursor = cursor.skip(skip).limit(limit)
+            
+            return await cursor.to_list(length=limit)
+        
+        # In cache i documenti (con _id per l'invalidazione), non il JSON
+        documents = await self._cached_read(
+            "find_many_json", load, filter_query, sort, positional=skip > 0,
+            projection=projection, limit=limit, skip=skip,
+        )
+        return encode_json(documents)
+    
+    
+    async def iter_many(
+        self,
+        filter_query: Dict[str, Any] = None,
+        sort: List[tuple] = None,
+        projection: Optional[Dict[str, Any]] = None,
+        batch_size: int = 500,
+        limit: int = 0,
+        json_ready: bool = False
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Scorre i documenti man mano che arrivano i batch dal server
+        
+        A differenza di find_many non carica tutto il risultato in memoria:
+        adatto a export e report su molti documenti.
+        
+        Args:
+            filter_query: Filtro MongoDB
+            sort: Ordinamento [(campo, direzione), ...]
+            projection: Campi da restituire (None = documenti completi)
+            batch_size: Documenti per batch di rete
+            limit: Massimo documenti (0 = nessun limite)
+            json_ready: Decodifica con JSON_CODEC_OPTIONS (tutti gli ObjectId
+                e le date gia in stringa, pronti per json.dumps)
+            
+        Yields:
+            Dict: Documento con _id convertito in string
+        """
+        collection = self.json_collection if json_ready else self.collection
+        cursor = collection.find(filter_query or {}, projection, batch_size=batch_size)
         
         if sort:
             cursor = cursor.sort(sort)
+        if limit:
+            cursor = cursor.limit(limit)
         
-        documents = await cursor.to_list(length=limit)
-        
-        # Converti ObjectId in string
-        for doc in documents:
-            if "_id" in doc:
+        async for doc in cursor:
+            if not json_ready and "_id" in doc:
                 doc["_id"] = str(doc["_id"])
+            yield doc
+    
+    
+    async def find_page(
+        self,
+        filter_query: Dict[str, Any] = None,
+        sort: List[tuple] = None,
+        limit: int = 50,
+        page_token: Optional[str] = None,
+        projection: Optional[Dict[str, Any]] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Paginazione keyset: costo costante per pagina, indipendente dalla profondita
         
-        return documents
+        Args:
+            filter_query: Filtro MongoDB
+            sort: Ordinamento [(campo, direzione), ...] (_id aggiunto come spareggio);
+                i campi di ordinamento devono essere presenti in tutti i documenti
+            limit: Documenti per pagina
+            page_token: Token restituito dalla pagina precedente (None = prima pagina)
+            projection: Campi da restituire (i campi di ordinamento sono sempre inclusi)
+            
+        Returns:
+            Tuple: (documenti, token pagina successiva o None se ultima pagina)
+            
+        Raises:
+            ValueError: page_token non valido
+        """
+        sort = keyset_sort(sort)
+        query = dict(filter_query or {})
+        
+        if page_token:
+            after = keyset_filter(sort, decode_page_token(page_token, sort))
+            query = {"$and": [query, after]} if query else after
+        
+        async def load():
+            # Un documento in piu per sapere se esiste una pagina successiva
+            cursor = self.collection.find(query, keyset_projection(projection, sort))
+            cursor = cursor.sort(sort).limit(limit + 1)
+            documents = await cursor.to_list(length=limit + 1)
+            
+            next_token = None
+            if len(documents) > limit:
+                documents = documents[:limit]
+                next_token = encode_page_token(documents[-1], sort)
+            
+            for doc in documents:
+                if "_id" in doc:
+                    doc["_id"] = str(doc["_id"])
+            
+            return documents, next_token
+        
+        # positional: il token dipende dal documento oltre il limite
+        return await self._cached_read(
+            "find_page", load, query, sort, positional=True,
+            projection=projection, limit=limit,
+        )
     
     
-    async def count(self, filter_query: Dict[str, Any] = None) -> int:
+    async def count(self, filter_query: Dict[str, Any] = None, limit: int = 0) -> int:
         """
         Conta documenti che matchano filtro
         
         Args:
             filter_query: Filtro MongoDB
+            limit: Smette di contare a `limit` documenti (0 = conta tutto);
+                per badge tipo "99+" o controlli "almeno N"
             
         Returns:
             int: Numero documenti
+            
+        Nota:
+            Senza filtro ne limit usa estimated_document_count, che legge i
+            metadati della collection invece di scorrere l'indice _id
+            (puo essere approssimato dopo uno shutdown non pulito)
         """
         if filter_query is None:
             filter_query = {}
         
-        return await self.collection.count_documents(filter_query)
+        if not filter_query and not limit:
+            loader = self.collection.estimated_document_count
+        elif limit:
+            loader = lambda: self.collection.count_documents(filter_query, limit=limit)
+        else:
+            loader = lambda: self.collection.count_documents(filter_query)
+        
+        return await self._cached_read("count", loader, filter_query, limit=limit)
     
     
     # Issue #23: Implementare metodi per aggiornare documenti esistenti
+    @staticmethod
+    def _changed_fields(update_doc: Dict[str, Any]) -> List[str]:
+        return [field for fields in update_doc.values() for field in fields]
+    
+    
+    def _invalidate_update(self, filter_query: Dict[str, Any], update_doc: Dict[str, Any]) -> None:
+        if self.cache is None:
+            return
+        document_id = self._target_id(filter_query)
+        if document_id is None:
+            self.cache.invalidate_collection(self.collection.name)
+        else:
+            self.cache.invalidate_update(
+                self.collection.name, document_id, self._changed_fields(update_doc)
+            )
+    
+    
+    async def _raise_if_conflict(self, filter_query: Dict[str, Any], expected_version: int) -> None:
+        # Nessun match con la versione attesa: conflitto se il documento esiste
+        current = await self.collection.find_one(filter_query, {VERSION_FIELD: 1})
+        if current is not None:
+            raise VersionConflictError(
+                current.get("_id"), expected_version, document_version(current)
+            )
+    
+    
+    @staticmethod
+    def _versioned_filter(filter_query: Dict[str, Any], expected_version: Optional[int]) -> Dict[str, Any]:
+        if expected_version is None:
+            return filter_query
+        if expected_version == LEGACY_VERSION:
+            # None trova anche i documenti senza campo version
+            return {**filter_query, VERSION_FIELD: {"$in": [LEGACY_VERSION, None]}}
+        return {**filter_query, VERSION_FIELD: expected_version}
+    
+    
     async def update_one(
         self, 
         filter_query: Dict[str, Any], 
-        update_data: Dict[str, Any]
+        update_data: Dict[str, Any],
+        expected_version: Optional[int] = None,
+        bump_version: bool = True
     ) -> bool:
         """
         Aggiorna un documento
         
         Args:
             filter_query: Filtro per trovare documento
-            update_data: Dati da aggiornare
+            update_data: Campi da impostare ($set) oppure documento con operatori;
+                non viene modificato (updated_at e version sono aggiunti a una copia)
+            expected_version: Aggiorna solo se il documento e a questa versione
+            bump_version: False per scritture di sistema (metriche, campi
+                tecnici) che non devono invalidare la versione vista da un editor
             
         Returns:
             bool: True se aggiornato, False altrimenti
             
+        Raises:
+            VersionConflictError: expected_version diversa da quella salvata
+            
         TODO:
-        - Aggiungere updated_at automatico
         - Validare update_data
-        - Versioning dei documenti
         """
-        update_data["updated_at"] = datetime.utcnow()
+        update_doc = self._stamped_update(
+            update_data, datetime.utcnow(), upsert=False, bump_version=bump_version
+        )
         
         result = await self.collection.update_one(
-            filter_query,
-            {"$set": update_data}
+            self._versioned_filter(filter_query, expected_version),
+            update_doc
         )
         
+        if result.matched_count == 0 and expected_version is not None:
+            await self._raise_if_conflict(filter_query, expected_version)
+        
+        self._invalidate_update(filter_query, update_doc)
+        
         return result.modified_count > 0
     
     
-    async def update_by_id(self, document_id: str, update_data: Dict[str, Any]) -> bool:
+    async def update_by_id(
+        self,
+        document_id: str,
+        update_data: Dict[str, Any],
+        expected_version: Optional[int] = None,
+        bump_version: bool = True
+    ) -> bool:
         """
         Aggiorna documento per ID
         
         Args:
             document_id: ID documento
             update_data: Dati da aggiornare
+            expected_version: Aggiorna solo se il documento e a questa versione
+            bump_version: False per non incrementare version (vedi update_one)
             
         Returns:
             bool: True se aggiornato
+            
+        Raises:
+            VersionConflictError: expected_version diversa da quella salvata
         """
         try:
             obj_id = ObjectId(document_id)
-            return await self.update_one({"_id": obj_id}, update_data)
-        except Exception as e:
+        except (InvalidId, TypeError) as e:
             print(f"Errore aggiornamento: {e}")
             return False
+        return await self.update_one({"_id": obj_id}, update_data, expected_version, bump_version)
     
     
     async def update_many(
         self, 
         filter_query: Dict[str, Any], 
-        update_data: Dict[str, Any]
+        update_data: Dict[str, Any],
+        bump_version: bool = True
     ) -> int:
         """
         Aggiorna multipli documenti
         
         Args:
             filter_query: Filtro
-            update_data: Dati da aggiornare
+            update_data: Dati da aggiornare (non modificato)
+            bump_version: False per non incrementare version (vedi update_one)
             
         Returns:
             int: Numero documenti aggiornati
         """
-        update_data["updated_at"] = datetime.utcnow()
-        
-        result = await self.collection.update_many(
-            filter_query,
-            {"$set": update_data}
+        update_doc = self._stamped_update(
+            update_data, datetime.utcnow(), upsert=False, bump_version=bump_version
         )
         
+        result = await self.collection.update_many(filter_query, update_doc)
+        
+        if self.cache is not None:
+            self.cache.invalidate_collection(self.collection.name)
+        
         return result.modified_count
     
     
+    async def find_one_and_update(
+        self,
+        filter_query: Dict[str, Any],
+        update_data: Dict[str, Any],
+        projection: Optional[Dict[str, Any]] = None,
+        expected_version: Optional[int] = None,
+        upsert: bool = False,
+        return_document: bool = ReturnDocument.AFTER,
+        sort: Optional[List[tuple]] = None,
+        bump_version: bool = True
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Aggiorna un documento e lo restituisce in un solo round-trip atomico
+        
+        Args:
+            filter_query: Filtro
+            update_data: Campi da impostare ($set) oppure documento con operatori
+            projection: Campi da restituire (None = documento completo)
+            expected_version: Aggiorna solo se il documento e a questa versione
+            upsert: Crea il documento se non esiste
+            return_document: ReturnDocument.AFTER (default) o BEFORE
+            sort: Quale documento aggiornare se il filtro ne trova piu di uno
+            bump_version: False per non incrementare version (vedi update_one)
+            
+        Returns:
+            Optional[Dict]: Documento dopo (o prima) dell'aggiornamento, None se non trovato
+            
+        Raises:
+            VersionConflictError: expected_version diversa da quella salvata
+        """
+        update_doc = self._stamped_update(update_data, datetime.utcnow(), upsert, bump_version)
+        
+        document = await self.collection.find_one_and_update(
+            self._versioned_filter(filter_query, expected_version),
+            update_doc,
+            projection=projection,
+            upsert=upsert,
+            return_document=return_document,
+            sort=sort,
+        )
+        
+        if document is None:
+            if expected_version is not None:
+                await self._raise_if_conflict(filter_query, expected_version)
+            if not upsert:
+                return None
+        
+        if self.cache is not None:
+            if upsert:
+                self.cache.invalidate_collection(self.collection.name)
+            else:
+                self.cache.invalidate_update(
+                    self.collection.name, document["_id"], self._changed_fields(update_doc)
+                )
+        
+        if document and "_id" in document:
+            document["_id"] = str(document["_id"])
+        return document
+    
+    
+    async def find_one_and_replace(
+        self,
+        filter_query: Dict[str, Any],
+        replacement: Dict[str, Any],
+        projection: Optional[Dict[str, Any]] = None,
+        expected_version: Optional[int] = None,
+        upsert: bool = False
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Sostituisce un documento e restituisce la nuova versione (atomico)
+        
+        _id e created_at del documento esistente vengono mantenuti, version
+        incrementata e updated_at aggiornato (richiede MongoDB >= 4.2).
+        
+        Args:
+            filter_query: Filtro
+            replacement: Nuovo contenuto (senza operatori; non viene modificato)
+            projection: Campi da restituire (None = documento completo)
+            expected_version: Sostituisce solo se il documento e a questa versione
+            upsert: Crea il documento se non esiste
+            
+        Returns:
+            Optional[Dict]: Documento dopo la sostituzione, None se non trovato
+            
+        Raises:
+            VersionConflictError: expected_version diversa da quella salvata
+        """
+        now = datetime.utcnow()
+        replacement = {
+            key: value for key, value in replacement.items()
+            if key not in ("_id", "created_at", VERSION_FIELD)
+        }
+        # Pipeline di update: la sostituzione puo leggere i campi esistenti
+        # ($literal: i valori che iniziano con "$" non sono path di campo)
+        pipeline = [{"$replaceWith": {"$mergeObjects": [
+            {"$literal": replacement},
+            {
+                "_id": "$_id",
+                "created_at": {"$ifNull": ["$created_at", now]},
+                "updated_at": now,
+                VERSION_FIELD: {"$add": [{"$ifNull": [f"${VERSION_FIELD}", 0]}, 1]},
+            },
+        ]}}]
+        
+        document = await self.collection.find_one_and_update(
+            self._versioned_filter(filter_query, expected_version),
+            pipeline,
+            projection=projection,
+            upsert=upsert,
+            return_document=ReturnDocument.AFTER,
+        )
+        
+        if document is None:
+            if expected_version is not None:
+                await self._raise_if_conflict(filter_query, expected_version)
+            return None
+        
+        if self.cache is not None:
+            self.cache.invalidate_collection(self.collection.name)
+        
+        if "_id" in document:
+            document["_id"] = str(document["_id"])
+        return document
+    
+    
     # Issue #24, #25: Implementare metodi per cancellare documenti
     async def delete_one(self, filter_query: Dict[str, Any]) -> bool:
         """
@@ -271,6 +823,14 @@ class BaseDAO(Generic[T]):
         - Cascade delete per relazioni
         """
         result = await self.collection.delete_one(filter_query)
+        
+        if self.cache is not None:
+            document_id = self._target_id(filter_query)
+            if document_id is None:
+                self.cache.invalidate_collection(self.collection.name)
+            else:
+                self.cache.invalidate_delete(self.collection.name, document_id)
+        
         return result.deleted_count > 0
     
     
@@ -307,9 +867,138 @@ class BaseDAO(Generic[T]):
         - Log audit di cancellazioni
         """
         result = await self.collection.delete_many(filter_query)
+        
+        if self.cache is not None:
+            self.cache.invalidate_collection(self.collection.name)
+        
         return result.deleted_count
     
     
+    # Scritture in blocco
+    @staticmethod
+    def _stamped_update(
+        update: Dict[str, Any],
+        now: datetime,
+        upsert: bool,
+        bump_version: bool = True
+    ) -> Dict[str, Any]:
+        if any(key.startswith("$") for key in update):
+            update_doc = {key: dict(value) for key, value in update.items()}
+        else:
+            update_doc = {"$set": dict(update)}
+        update_doc.setdefault("$set", {})["updated_at"] = now
+        if VERSION_FIELD not in update_doc["$set"]:
+            if bump_version:
+                # Su un upsert che inserisce, $inc crea version = 1
+                update_doc.setdefault("$inc", {})[VERSION_FIELD] = 1
+            elif upsert:
+                update_doc.setdefault("$setOnInsert", {})[VERSION_FIELD] = 1
+        if upsert and "created_at" not in update_doc["$set"]:
+            update_doc.setdefault("$setOnInsert", {})["created_at"] = now
+        return update_doc
+    
+    
+    def _to_write_model(self, operation: BulkOperation, now: datetime, bump_version: bool = True):
+        op = operation.get("op")
+        many = operation.get("many", False)
+        
+        if op == "insert":
+            # Copia: pymongo aggiunge _id al documento passato
+            document = dict(operation["document"])
+            document.setdefault("created_at", now)
+            document.setdefault("updated_at", now)
+            document.setdefault(VERSION_FIELD, 1)
+            return InsertOne(document)
+        
+        if op in ("update", "upsert"):
+            upsert = op == "upsert"
+            update_doc = self._stamped_update(operation["update"], now, upsert, bump_version)
+            model = UpdateMany if many else UpdateOne
+            return model(operation["filter"], update_doc, upsert=upsert)
+        
+        if op == "delete":
+            model = DeleteMany if many else DeleteOne
+            return model(operation["filter"])
+        
+        raise ValueError(f"Operazione bulk non valida: {op!r}")
+    
+    
+    async def bulk_write(
+        self,
+        operations: List[BulkOperation],
+        chunk_size: int = 1000,
+        ordered: bool = False,
+        write_concern: Optional[WriteConcern] = None,
+        bump_version: bool = True
+    ) -> BulkWriteSummary:
+        """
+        Esegue insert/update/upsert/delete misti in pochi round-trip
+        
+        Args:
+            operations: Lista di BulkOperation
+            chunk_size: Operazioni per comando bulkWrite inviato al server
+            ordered: False (default) = il server puo eseguire in parallelo e
+                prosegue dopo un errore; True = si ferma al primo errore
+            write_concern: Write concern per questa chiamata (es. WriteConcern(w=1))
+            bump_version: False per update/upsert di sistema che non incrementano
+                version (metriche, backfill)
+            
+        Returns:
+            BulkWriteSummary: Conteggi aggregati ed errori per operazione
+                (index = posizione in `operations`)
+            
+        Raises:
+            ValueError: Operazione non valida (prima di scrivere qualsiasi cosa)
+        """
+        summary: BulkWriteSummary = {
+            "inserted": 0, "matched": 0, "modified": 0,
+            "upserted": 0, "deleted": 0, "errors": [],
+        }
+        if not operations:
+            return summary
+        
+        now = datetime.utcnow()
+        requests = [self._to_write_model(operation, now, bump_version) for operation in operations]
+        
+        collection = self.collection
+        if write_concern is not None:
+            collection = collection.with_options(write_concern=write_concern)
+        
+        for start in range(0, len(requests), chunk_size):
+            chunk = requests[start:start + chunk_size]
+            try:
+                result = await collection.bulk_write(chunk, ordered=ordered)
+                details = result.bulk_api_result if result.acknowledged else {}
+            except BulkWriteError as e:
+                details = e.details
+                for error in details.get("writeErrors", []):
+                    summary["errors"].append({
+                        "index": start + error["index"],
+                        "code": error.get("code"),
+                        "message": error.get("errmsg"),
+                    })
+                for error in details.get("writeConcernErrors", []):
+                    summary["errors"].append({
+                        "index": None,
+                        "code": error.get("code"),
+                        "message": error.get("errmsg"),
+                    })
+            
+            summary["inserted"] += details.get("nInserted", 0)
+            summary["matched"] += details.get("nMatched", 0)
+            summary["modified"] += details.get("nModified", 0)
+            summary["upserted"] += details.get("nUpserted", 0)
+            summary["deleted"] += details.get("nRemoved", 0)
+            
+            if ordered and summary["errors"]:
+                break
+        
+        if self.cache is not None:
+            self.cache.invalidate_collection(self.collection.name)
+        
+        return summary
+    
+    
     # Utility methods
     async def exists(self, filter_query: Dict[str, Any]) -> bool:
         """
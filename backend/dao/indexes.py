@@ -0,0 +1,114 @@
+"""
+Bootstrap indici e index advisor
+
+- ensure_all_indexes: crea gli indici dichiarati dai DAO (idempotente),
+  lanciato in background all'avvio delle API
+- advise_post_queries: esegue explain() sulle query di PostDAO e segnala
+  COLLSCAN e ordinamenti in memoria
+
+Esecuzione manuale:
+    python -m backend.dao.indexes            # crea indici
+    python -m backend.dao.indexes --advise   # crea indici + report query
+"""
+
+import asyncio
+import sys
+from typing import Any, Dict, List
+
+from .base_dao import BaseDAO
+from .lease_dao import LeaseDAO
+from .media_dao import MediaDAO
+from .post_dao import PostDAO
+from .rollup_dao import PostRollupDAO
+from ..database import close_mongodb_connection, connect_to_mongodb
+
+
+DAO_CLASSES = [PostDAO, MediaDAO, LeaseDAO, PostRollupDAO]
+
+
+async def ensure_all_indexes() -> Dict[str, List[str]]:
+    """
+    Crea gli indici di tutti i DAO
+
+    Returns:
+        Dict: nome collection -> indici
+    """
+    created: Dict[str, List[str]] = {}
+    for dao_class in DAO_CLASSES:
+        dao: BaseDAO = dao_class()
+        try:
+            created[dao.collection.name] = await dao.ensure_indexes()
+        except Exception as e:
+            print(f"❌ Creazione indici {dao.collection.name} fallita: {e}")
+    print(f"🗂 Indici verificati: {created}")
+    return created
+
+
+def _plan_stages(plan: Dict[str, Any]) -> List[Dict[str, Any]]:
+    # I piani sono alberi: inputStage singolo o inputStages per OR/merge
+    stages = [plan]
+    children = list(plan.get("inputStages", []))
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            children.append(plan[key])
+    for child in children:
+        stages.extend(_plan_stages(child))
+    return stages
+
+
+async def explain_query(dao: BaseDAO, shape: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Analizza il piano vincente di una query
+
+    Returns:
+        Dict: name, indexes usati, collscan, in_memory_sort
+    """
+    cursor = dao.collection.find(shape["filter"]).limit(100)
+    if shape.get("sort"):
+        cursor = cursor.sort(shape["sort"])
+    explain = await cursor.explain()
+
+    winning_plan = explain.get("queryPlanner", {}).get("winningPlan", {})
+    stages = _plan_stages(winning_plan)
+    names = [stage.get("stage") for stage in stages]
+
+    return {
+        "name": shape["name"],
+        "indexes": [stage["indexName"] for stage in stages if "indexName" in stage],
+        "collscan": "COLLSCAN" in names,
+        # SORT (o SORT_KEY_GENERATOR) nel piano = ordinamento fatto in memoria
+        "in_memory_sort": any(name and name.startswith("SORT") for name in names),
+    }
+
+
+async def advise_post_queries(dao: PostDAO | None = None) -> List[Dict[str, Any]]:
+    """
+    Report dei piani di esecuzione per ogni forma di query di PostDAO
+    """
+    dao = dao or PostDAO()
+    report = [await explain_query(dao, shape) for shape in dao.query_shapes()]
+
+    for entry in report:
+        problems = []
+        if entry["collscan"]:
+            problems.append("COLLSCAN")
+        if entry["in_memory_sort"]:
+            problems.append("sort in memoria")
+        status = "⚠️ " + ", ".join(problems) if problems else "✅ ok"
+        print(f"{entry['name']}: {status} (indici: {entry['indexes'] or '-'})")
+
+    return report
+
+
+async def main():
+    await connect_to_mongodb()
+    try:
+        await ensure_all_indexes()
+        if "--advise" in sys.argv:
+            await advise_post_queries()
+    finally:
+        await close_mongodb_connection()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
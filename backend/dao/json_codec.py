@@ -0,0 +1,46 @@
+"""
+Lettura "JSON-ready" dei documenti MongoDB
+
+Le risposte API che restituiscono documenti cosi come sono non hanno
+bisogno di ObjectId e datetime: con JSON_CODEC_OPTIONS il decoder BSON
+produce direttamente stringhe, senza il giro documento -> loop Python
+sugli _id -> encoder JSON con fallback per tipo.
+"""
+
+import json
+from datetime import datetime, timezone
+from typing import Any
+
+from bson import ObjectId
+from bson.codec_options import CodecOptions, TypeDecoder, TypeRegistry
+
+
+class _ObjectIdAsString(TypeDecoder):
+    bson_type = ObjectId
+
+    def transform_bson(self, value: ObjectId) -> str:
+        return str(value)
+
+
+class _DatetimeAsISO(TypeDecoder):
+    bson_type = datetime
+
+    def transform_bson(self, value: datetime) -> str:
+        return value.isoformat()
+
+
+# ObjectId -> str, datetime -> ISO 8601 con offset (+00:00: BSON salva in UTC)
+JSON_CODEC_OPTIONS = CodecOptions(
+    tz_aware=True,
+    tzinfo=timezone.utc,
+    type_registry=TypeRegistry([_ObjectIdAsString(), _DatetimeAsISO()]),
+)
+
+
+def encode_json(value: Any) -> bytes:
+    """
+    Serializza documenti letti con JSON_CODEC_OPTIONS (compatto, UTF-8)
+
+    default=str copre i tipi BSON rari non convertiti dal codec (Decimal128, ...)
+    """
+    return json.dumps(value, default=str, ensure_ascii=False, separators=(",", ":")).encode()
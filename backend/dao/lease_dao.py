@@ -0,0 +1,99 @@
+"""
+Lease DAO - Lock distribuiti con scadenza su MongoDB
+
+Una lease e un documento {_id: nome, owner, expires_at}: la prende chi
+riesce a scriverlo quando e libera o scaduta, e resta sua finche la rinnova
+(heartbeat) prima di expires_at. Se il processo muore la lease scade da
+sola e un altro processo puo prenderla; l'indice TTL ripulisce i documenti
+scaduti.
+
+Le scadenze usano l'orologio dei nodi: gli orologi vanno tenuti
+sincronizzati (NTP) e il TTL deve essere molto piu grande del drift.
+"""
+
+import re
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import DuplicateKeyError
+
+from .base_dao import BaseDAO
+from ..database import get_database
+
+
+LEASES_COLLECTION = "leases"
+
+
+class LeaseDAO(BaseDAO):
+    """
+    DAO per lease/lock con scadenza (leader election, registro worker)
+    """
+
+    INDEXES = [
+        # Pulizia automatica delle lease scadute (il monitor TTL gira ogni ~60s:
+        # la validita si controlla sempre su expires_at, non sull'esistenza)
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ]
+
+    def __init__(self):
+        db = get_database()
+        super().__init__(db[LEASES_COLLECTION])
+
+    async def acquire(
+        self,
+        name: str,
+        owner: str,
+        ttl_seconds: float,
+        data: Optional[Dict[str, Any]] = None,
+    ) -> bool:
+        """
+        Prende o rinnova la lease `name` per `ttl_seconds`
+
+        Returns:
+            bool: True se ora la lease e di `owner`, False se e di un altro
+                owner non scaduto
+        """
+        now = datetime.utcnow()
+        try:
+            # Match solo se e gia nostra o scaduta; altrimenti l'upsert prova
+            # a inserire lo stesso _id e fallisce con DuplicateKeyError
+            await self.collection.update_one(
+                {"_id": name, "$or": [{"owner": owner}, {"expires_at": {"$lte": now}}]},
+                {"$set": {
+                    **(data or {}),
+                    "owner": owner,
+                    "expires_at": now + timedelta(seconds=ttl_seconds),
+                    "renewed_at": now,
+                }},
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            return False
+        return True
+
+    async def release(self, name: str, owner: str) -> bool:
+        """
+        Rilascia la lease se e ancora di `owner`
+        """
+        result = await self.collection.delete_one({"_id": name, "owner": owner})
+        return result.deleted_count > 0
+
+    async def holder(self, name: str) -> Optional[str]:
+        """
+        Owner attuale della lease (None se libera o scaduta)
+        """
+        lease = await self.collection.find_one(
+            {"_id": name, "expires_at": {"$gt": datetime.utcnow()}}, {"owner": 1}
+        )
+        return lease["owner"] if lease else None
+
+    async def live(self, prefix: str) -> List[Dict[str, Any]]:
+        """
+        Lease valide il cui nome inizia con `prefix`, ordinate per nome
+        (regex ancorata: usa l'indice _id)
+        """
+        cursor = self.collection.find(
+            {"_id": {"$regex": f"^{re.escape(prefix)}"}, "expires_at": {"$gt": datetime.utcnow()}}
+        ).sort("_id", ASCENDING)
+        return await cursor.to_list(length=None)
@@ -0,0 +1,129 @@
+"""
+Media DAO - Copia locale dei media Instagram
+
+I media letti da Graph API vengono salvati nella collection `instagram_media`
+(con l'ID Instagram come _id) cosi le letture non passano da Graph.
+
+Lo stato del sync per account e in `media_sync_state`:
+- cursor: timestamp del media piu recente dell'ultimo giro completato
+- pending_newest/pending_oldest: intervallo gia salvato dal giro in corso
+  (o interrotto), aggiornato dopo ogni blocco
+"""
+
+from typing import List, Dict, Any, Optional, TypedDict
+from datetime import datetime, timezone
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+from .base_dao import BaseDAO, BulkOperation
+from .query_cache import QueryCache
+from ..database import get_database
+
+
+class InstagramMedia(TypedDict, total=False):
+    _id: str
+    user_id: str
+    caption: str
+    media_url: str
+    timestamp: datetime
+    synced_at: datetime
+
+
+class MediaDAO(BaseDAO):
+    """
+    DAO per il mirror dei media Instagram
+    """
+
+    INDEXES = [
+        # get_media
+        IndexModel([("user_id", ASCENDING), ("timestamp", DESCENDING)], name="user_timestamp"),
+    ]
+
+    def __init__(self, cache: Optional[QueryCache] = None):
+        db = get_database()
+        super().__init__(db["instagram_media"], cache=cache)
+        self.sync_state = db["media_sync_state"]
+
+    async def upsert_media(self, user_id: str, items: List[Dict[str, Any]]) -> int:
+        """
+        Inserisce/aggiorna media Graph con un'unica bulk write
+
+        Args:
+            user_id: account Instagram
+            items: media come restituiti da Graph (id, caption, media_url, timestamp)
+
+        Returns:
+            int: Numero media nuovi o modificati
+        """
+        now = datetime.utcnow()
+        operations: List[BulkOperation] = []
+        for item in items:
+            media: InstagramMedia = {
+                "user_id": user_id,
+                "caption": item.get("caption", ""),
+                "media_url": item.get("media_url", ""),
+                "synced_at": now,
+            }
+            if "timestamp" in item:
+                media["timestamp"] = item["timestamp"]
+            operations.append({"op": "upsert", "filter": {"_id": item["id"]}, "update": media})
+
+        summary = await self.bulk_write(operations)
+        for error in summary["errors"]:
+            print(f"❌ Upsert media fallito: {error['message']}")
+        return summary["upserted"] + summary["modified"]
+
+    async def get_sync_state(self, user_id: str) -> Dict[str, Any]:
+        """
+        Stato del sync di un account (date timezone-aware, {} se mai sincronizzato)
+        """
+        state = await self.sync_state.find_one({"_id": user_id}) or {}
+        return {
+            key: value.replace(tzinfo=timezone.utc) if isinstance(value, datetime) else value
+            for key, value in state.items()
+        }
+
+    async def record_sync_progress(self, user_id: str, newest: datetime, oldest: datetime) -> None:
+        """
+        Allarga l'intervallo salvato dal giro in corso (dopo ogni blocco)
+        """
+        await self.sync_state.update_one(
+            {"_id": user_id},
+            {"$max": {"pending_newest": newest}, "$min": {"pending_oldest": oldest}},
+            upsert=True,
+        )
+
+    async def complete_sync(self, user_id: str) -> None:
+        """
+        Giro completato: il cursore avanza al media piu recente salvato
+        """
+        await self.sync_state.update_one(
+            {"_id": user_id},
+            [
+                {"$set": {
+                    "cursor": {"$max": ["$cursor", "$pending_newest"]},
+                    "completed_at": datetime.utcnow(),
+                }},
+                {"$unset": ["pending_newest", "pending_oldest"]},
+            ],
+            upsert=True,
+        )
+
+    async def get_media(self, user_id: str, limit: int = 50, skip: int = 0) -> List[Dict[str, Any]]:
+        return await self.find_many(
+            filter_query={"user_id": user_id},
+            limit=limit,
+            skip=skip,
+            sort=[("timestamp", -1)],
+        )
+
+    async def get_media_json(self, user_id: str, limit: int = 50, skip: int = 0) -> bytes:
+        """
+        Come get_media, gia serializzato in JSON per la risposta API
+        """
+        return await self.find_many_json(
+            filter_query={"user_id": user_id},
+            limit=limit,
+            skip=skip,
+            sort=[("timestamp", -1)],
+        )
@@ -5,17 +5,26 @@ Issue #16, #20-25: Implementazione CRUD per Post
 Estende BaseDAO con metodi specifici per Post
 """
 
-from typing import List, Dict, Any, Optional, TypedDict
-from datetime import datetime
+from typing import List, Dict, Any, Optional, Tuple, TypedDict, AsyncIterator
+from datetime import datetime, timedelta
 from enum import Enum
+import zlib
 
-from .base_dao import BaseDAO
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import ASCENDING, DESCENDING, DeleteMany, IndexModel, ReturnDocument, UpdateOne
+
+from .base_dao import BaseDAO, BulkOperation
+from .query_cache import QueryCache
+from .rollup_dao import ROLLUP_MAX_AGE, PostRollupDAO
 from ..database import get_database
 
 
 class PostStatus(str, Enum):
     DRAFT = "draft"
     SCHEDULED = "scheduled"
+    # In pubblicazione: preso in carico dallo scheduler (lease_owner/lease_expires)
+    PUBLISHING = "publishing"
     PUBLISHED = "published"
     FAILED = "failed"
 
@@ -36,7 +45,251 @@ class MediaPost(TypedDict, total=False):
     updated_at: datetime
     data_programmazione: datetime
     published_at: datetime
+    media_id: str
     metadata: PostMetadata
+    metadata_updated_at: datetime
+    # Pubblicazione programmata su Instagram
+    url_risorsa: str
+    user_id: str
+    attempts: int
+    last_error: str
+    lease_owner: str
+    lease_expires: datetime
+    # Container Graph del tentativo in corso: un nuovo tentativo lo controlla
+    # invece di crearne (e pubblicarne) un altro
+    creation_id: str
+    shard: int
+
+
+# Ordinamento liste post: _id come spareggio per la paginazione keyset
+POSTS_RECENT_SORT = [("created_at", -1), ("_id", -1)]
+
+# Social che lo scheduler sa pubblicare (via Graph API)
+PUBLISHABLE_SOCIAL_TARGETS = ["instagram", "Instagram"]
+
+# Bucket di sharding: ogni worker scheduler serve i post con
+# shard % numero_worker == indice_worker
+POST_SHARD_BUCKETS = 1024
+
+
+def shard_for(post_id: Any) -> int:
+    """
+    Bucket di sharding di un post (hash stabile dell'_id)
+    """
+    return zlib.crc32(str(post_id).encode()) % POST_SHARD_BUCKETS
+
+
+def _shard_filter(shard: Optional[Tuple[int, int]]) -> Dict[str, Any]:
+    # shard = (indice worker, numero worker); con un solo worker nessun filtro
+    if shard is None or shard[1] <= 1:
+        return {}
+    index, count = shard
+    return {"shard": {"$mod": [count, index]}}
+
+
+# Proiezioni per viste leggere: niente testo completo ne metadata
+CALENDAR_SUMMARY_PROJECTION = {
+    "social_target": 1,
+    "status": 1,
+    "data_programmazione": 1,
+    "published_at": 1,
+}
+LIST_SUMMARY_PROJECTION = {
+    "social_target": 1,
+    "status": 1,
+    "created_at": 1,
+    "data_programmazione": 1,
+    # Anteprima calcolata dal server: il testo completo non viaggia in rete
+    "anteprima": {"$substrCP": ["$testo", 0, 80]},
+}
+
+
+def build_post(
+    testo: str,
+    social_target: str,
+    data_programmazione: Optional[datetime] = None,
+    status: PostStatus = PostStatus.DRAFT,
+    url_risorsa: Optional[str] = None,
+    user_id: Optional[str] = None,
+) -> MediaPost:
+    """
+    Valida i dati e costruisce il documento di un nuovo post
+    (condiviso da PostDAO e SyncPostDAO)
+
+    Raises:
+        ValueError: testo/social target vuoti o testo troppo lungo
+    """
+    testo = testo.strip()
+    social_target = social_target.strip()
+
+    if not testo:
+        raise ValueError("Testo vuoto")
+
+    if not social_target:
+        raise ValueError("Social target vuoto")
+
+    if len(testo) >= 2200:
+        raise ValueError("Testo troppo lungo per Instagram, valore massimo: 2200 caratteri")
+
+    now = datetime.utcnow()
+    # _id generato qui per calcolare lo shard senza una seconda scrittura
+    post_id = ObjectId()
+    post_data: MediaPost = {
+        "_id": post_id,
+        "shard": shard_for(post_id),
+        "testo": testo,
+        "social_target": social_target,
+        "status": status,
+        "created_at": now,
+        "updated_at": now,
+    }
+
+    if data_programmazione:
+        post_data["data_programmazione"] = data_programmazione
+        if status == PostStatus.DRAFT:
+            post_data["status"] = PostStatus.SCHEDULED
+
+    if url_risorsa:
+        post_data["url_risorsa"] = url_risorsa
+    if user_id:
+        post_data["user_id"] = user_id
+
+    return post_data
+
+
+def scheduled_filter(
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+) -> Dict[str, Any]:
+    """
+    Filtro dei post programmati in un intervallo di date
+    """
+    filter_query: Dict[str, Any] = {"status": PostStatus.SCHEDULED}
+
+    if start_date or end_date:
+        date_filter: Dict[str, Any] = {}
+        if start_date:
+            date_filter["$gte"] = start_date
+        if end_date:
+            date_filter["$lte"] = end_date
+        filter_query["data_programmazione"] = date_filter
+
+    return filter_query
+
+
+# Contatori post per (social_target, status), aggiornati con $inc ad ogni
+# scrittura di PostDAO: i totali della dashboard leggono pochi documenti
+# invece di aggregare tutta la collection posts
+POST_COUNTERS_COLLECTION = "post_counters"
+
+COUNTERS_PIPELINE = [
+    {"$group": {
+        "_id": {"social_target": "$social_target", "status": "$status"},
+        "count": {"$sum": 1},
+    }},
+]
+
+CounterChanges = Dict[Tuple[str, str], int]
+
+
+def _counter_id(social_target: str, status: str) -> str:
+    status = getattr(status, "value", status)
+    return f"{social_target}|{status}"
+
+
+def counter_updates(changes: CounterChanges) -> List[UpdateOne]:
+    """
+    Operazioni $inc sui contatori per le variazioni {(social, status): delta}
+    """
+    now = datetime.utcnow()
+    return [
+        UpdateOne(
+            {"_id": _counter_id(social_target, status)},
+            {
+                "$inc": {"count": delta},
+                "$set": {"updated_at": now},
+                "$setOnInsert": {
+                    "social_target": social_target,
+                    "status": getattr(status, "value", status),
+                },
+            },
+            upsert=True,
+        )
+        for (social_target, status), delta in changes.items()
+        if delta
+    ]
+
+
+def status_change(before: Optional[Dict[str, Any]], new_status: str) -> CounterChanges:
+    """
+    Variazioni dei contatori per un cambio di status (before = documento
+    prima dell'aggiornamento, con social_target e status)
+    """
+    if not before or before.get("status") == new_status:
+        return {}
+    social_target = before.get("social_target")
+    return {
+        (social_target, before.get("status")): -1,
+        (social_target, new_status): 1,
+    }
+
+
+def rebuild_counter_operations(groups: List[Dict[str, Any]]) -> list:
+    """
+    Operazioni che riallineano i contatori ai conteggi di COUNTERS_PIPELINE
+    """
+    now = datetime.utcnow()
+    operations: list = []
+    ids = []
+    for group in groups:
+        social_target = group["_id"].get("social_target")
+        status = group["_id"].get("status")
+        counter_id = _counter_id(social_target, status)
+        ids.append(counter_id)
+        operations.append(UpdateOne(
+            {"_id": counter_id},
+            {"$set": {
+                "social_target": social_target,
+                "status": status,
+                "count": group["count"],
+                "updated_at": now,
+            }},
+            upsert=True,
+        ))
+    operations.append(DeleteMany({"_id": {"$nin": ids}}))
+    return operations
+
+
+def counters_from_groups(groups: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Documenti contatore dai gruppi di COUNTERS_PIPELINE
+    """
+    return [{**group["_id"], "count": group["count"]} for group in groups]
+
+
+def summarize_counters(
+    counters: List[Dict[str, Any]],
+    social_target: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Totali complessivi, per status e per social dai documenti contatore
+    """
+    by_status: Dict[str, int] = {}
+    by_social: Dict[str, int] = {}
+    for counter in counters:
+        if social_target and counter.get("social_target") != social_target:
+            continue
+        count = counter.get("count", 0)
+        if count <= 0:
+            continue
+        by_status[counter["status"]] = by_status.get(counter["status"], 0) + count
+        by_social[counter["social_target"]] = by_social.get(counter["social_target"], 0) + count
+
+    return {
+        "total": sum(by_status.values()),
+        "by_status": by_status,
+        "by_social": by_social,
+    }
 
 
 class PostDAO(BaseDAO):
@@ -44,9 +297,80 @@ class PostDAO(BaseDAO):
     DAO per gestione Post social
     """
 
-    def __init__(self):
+    INDEXES = [
+        # get_posts_by_status, iter_published_media_ids (keyset: created_at + _id)
+        IndexModel(
+            [("status", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+            name="status_created_at_id",
+        ),
+        # get_posts_by_social (keyset: created_at + _id)
+        IndexModel(
+            [("social_target", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+            name="social_created_at_id",
+        ),
+        # export_posts senza filtri: stream gia ordinato, nessun SORT bloccante
+        IndexModel([("created_at", DESCENDING), ("_id", DESCENDING)], name="created_at_id"),
+        # get_scheduled_posts
+        IndexModel(
+            [("status", ASCENDING), ("data_programmazione", ASCENDING)],
+            name="status_data_programmazione",
+        ),
+        # bulk_update_metadata
+        IndexModel([("media_id", ASCENDING)], name="media_id", sparse=True),
+        # PostRollupDAO.refresh: post modificati dall'ultimo giro
+        IndexModel([("updated_at", ASCENDING)], name="updated_at"),
+        # claim_due_post: lease scadute dei post in pubblicazione (parziale:
+        # contiene solo i post PUBLISHING, pochi rispetto alla collection)
+        IndexModel(
+            [("lease_expires", ASCENDING)],
+            name="publishing_lease_expires",
+            partialFilterExpression={"status": PostStatus.PUBLISHING.value},
+        ),
+    ]
+
+    def __init__(self, cache: Optional[QueryCache] = None):
         db = get_database()
-        super().__init__(db["posts"])
+        super().__init__(db["posts"], cache=cache)
+        self.counters = db[POST_COUNTERS_COLLECTION]
+
+    async def _apply_counters(self, changes: CounterChanges) -> None:
+        operations = counter_updates(changes)
+        if operations:
+            await self.counters.bulk_write(operations, ordered=False)
+
+    async def _set_status(
+        self,
+        post_id: str,
+        update_data: Dict[str, Any],
+        expected_version: Optional[int] = None,
+    ) -> bool:
+        """
+        Aggiorna lo status di un post e i contatori
+
+        find_one_and_update restituisce lo status precedente in modo atomico:
+        due aggiornamenti concorrenti non contano due volte la stessa transizione.
+
+        Raises:
+            VersionConflictError: expected_version diversa da quella salvata
+        """
+        try:
+            obj_id = ObjectId(post_id)
+        except (InvalidId, TypeError) as e:
+            print(f"Errore aggiornamento: {e}")
+            return False
+
+        before = await self.find_one_and_update(
+            {"_id": obj_id},
+            update_data,
+            projection={"social_target": 1, "status": 1},
+            expected_version=expected_version,
+            return_document=ReturnDocument.BEFORE,
+        )
+        if before is None:
+            return False
+
+        await self._apply_counters(status_change(before, update_data["status"]))
+        return True
 
     async def create_post(
         self,
@@ -54,104 +378,507 @@ class PostDAO(BaseDAO):
         social_target: str,
         data_programmazione: Optional[datetime] = None,
         status: PostStatus = PostStatus.DRAFT,
+        url_risorsa: Optional[str] = None,
+        user_id: Optional[str] = None,
     ) -> str:
         """
         Issue #21: Crea nuovo post
-        """
-        testo = testo.strip()
-        social_target = social_target.strip()
-
-        if not testo:
-            raise ValueError("Testo vuoto")
 
-        if not social_target:
-            raise ValueError("Social target vuoto")
+        url_risorsa e user_id servono allo scheduler per pubblicare su Instagram
+        """
+        post_data = build_post(
+            testo, social_target, data_programmazione, status, url_risorsa, user_id
+        )
+        post_id = await self.insert_one(post_data)
+        await self._apply_counters({(post_data["social_target"], post_data["status"]): 1})
+        return post_id
 
-        if len(testo) >= 2200:
-            raise ValueError("Testo troppo lungo per Instagram, valore massimo: 2200 caratteri")
+    async def get_posts_by_social(
+        self,
+        social_target: str,
+        limit: int = 50,
+        page_token: Optional[str] = None,
+        projection: Optional[Dict[str, Any]] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Post di un social, dal piu recente, a pagine (keyset)
 
-        now = datetime.utcnow()
-        post_data: MediaPost = {
-            "testo": testo,
-            "social_target": social_target,
-            "status": status,
-            "created_at": now,
-            "updated_at": now,
-        }
+        Returns:
+            Tuple: (post, token pagina successiva)
+        """
+        return await self.find_page(
+            filter_query={"social_target": social_target},
+            sort=POSTS_RECENT_SORT,
+            limit=limit,
+            page_token=page_token,
+            projection=projection,
+        )
 
-        if data_programmazione:
-            post_data["data_programmazione"] = data_programmazione
-            if status == PostStatus.DRAFT:
-                post_data["status"] = PostStatus.SCHEDULED
+    async def get_posts_by_status(
+        self,
+        status: PostStatus,
+        limit: int = 50,
+        page_token: Optional[str] = None,
+        projection: Optional[Dict[str, Any]] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Post con un dato status, dal piu recente, a pagine (keyset)
 
-        return await self.insert_one(post_data)
+        Returns:
+            Tuple: (post, token pagina successiva)
+        """
+        return await self.find_page(
+            filter_query={"status": status},
+            sort=POSTS_RECENT_SORT,
+            limit=limit,
+            page_token=page_token,
+            projection=projection,
+        )
 
-    async def get_posts_by_social(self, social_target: str) -> List[Dict[str, Any]]:
-        return await self.find_many(
-            filter_query={"social_target": social_target},
-            sort=[("created_at", -1)],
+    async def get_posts_list_summary(
+        self,
+        status: PostStatus,
+        limit: int = 50,
+        page_token: Optional[str] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Vista lista: solo id, date, status e anteprima del testo
+        """
+        return await self.get_posts_by_status(
+            status, limit=limit, page_token=page_token, projection=LIST_SUMMARY_PROJECTION
         )
 
-    async def get_posts_by_status(self, status: PostStatus) -> List[Dict[str, Any]]:
+    async def get_scheduled_posts(
+        self,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        projection: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict[str, Any]]:
         return await self.find_many(
-            filter_query={"status": status},
-            sort=[("created_at", -1)],
+            filter_query=scheduled_filter(start_date, end_date),
+            sort=[("data_programmazione", 1)],
+            projection=projection,
         )
 
-    async def get_scheduled_posts(
+    async def get_calendar_summary(
         self,
         start_date: Optional[datetime] = None,
         end_date: Optional[datetime] = None,
     ) -> List[Dict[str, Any]]:
-        filter_query: Dict[str, Any] = {"status": PostStatus.SCHEDULED}
+        """
+        Vista calendario: post programmati senza testo ne metadata
+        """
+        return await self.get_scheduled_posts(
+            start_date, end_date, projection=CALENDAR_SUMMARY_PROJECTION
+        )
 
-        if start_date or end_date:
-            date_filter: Dict[str, Any] = {}
-            if start_date:
-                date_filter["$gte"] = start_date
-            if end_date:
-                date_filter["$lte"] = end_date
-            filter_query["data_programmazione"] = date_filter
+    async def update_post_status(
+        self,
+        post_id: str,
+        new_status: PostStatus,
+        expected_version: Optional[int] = None,
+    ) -> bool:
+        return await self._set_status(post_id, {"status": new_status}, expected_version)
 
-        return await self.find_many(
-            filter_query=filter_query,
-            sort=[("data_programmazione", 1)],
+    async def publish_post(
+        self,
+        post_id: str,
+        media_id: Optional[str] = None,
+        expected_version: Optional[int] = None,
+    ) -> bool:
+        update_data: Dict[str, Any] = {
+            "status": PostStatus.PUBLISHED,
+            "published_at": datetime.utcnow(),
+        }
+        if media_id:
+            update_data["media_id"] = media_id
+        return await self._set_status(post_id, update_data, expected_version)
+
+    async def claim_due_post(
+        self,
+        owner: str,
+        lease_seconds: float,
+        social_targets: List[str] = PUBLISHABLE_SOCIAL_TARGETS,
+        now: Optional[datetime] = None,
+        shard: Optional[Tuple[int, int]] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Prende in carico (in modo atomico) il prossimo post da pubblicare
+
+        Prima i post PUBLISHING con lease scaduta (worker morto), poi i
+        SCHEDULED gia dovuti, dal meno recente. Il post passa a PUBLISHING
+        con lease_owner/lease_expires: nessun altro worker puo prenderlo
+        finche la lease e valida.
+
+        Args:
+            shard: (indice, numero worker): solo i post del proprio shard.
+                Lo sharding riduce la contesa tra worker; l'esclusivita e
+                garantita comunque dal claim atomico.
+
+        Returns:
+            Optional[Dict]: Post (attempts gia incrementato) o None se non ce ne sono
+        """
+        now = now or datetime.utcnow()
+        shard_filter = _shard_filter(shard)
+        update = {
+            "$set": {
+                "status": PostStatus.PUBLISHING,
+                "lease_owner": owner,
+                "lease_expires": now + timedelta(seconds=lease_seconds),
+            },
+            "$inc": {"attempts": 1},
+        }
+        claims = [
+            (
+                {"status": PostStatus.PUBLISHING, "lease_expires": {"$lte": now}, **shard_filter},
+                [("lease_expires", 1)],
+            ),
+            (
+                {
+                    "status": PostStatus.SCHEDULED,
+                    "data_programmazione": {"$lte": now},
+                    "social_target": {"$in": social_targets},
+                    **shard_filter,
+                },
+                [("data_programmazione", 1)],
+            ),
+        ]
+        for filter_query, sort in claims:
+            before = await self.find_one_and_update(
+                filter_query, update, sort=sort, return_document=ReturnDocument.BEFORE
+            )
+            if before is not None:
+                await self._apply_counters(status_change(before, PostStatus.PUBLISHING))
+                before["attempts"] = before.get("attempts", 0) + 1
+                return before
+        return None
+
+    async def _leased_update(self, post_id: str, owner: str, update_data: Dict[str, Any]) -> bool:
+        # Scrittura tecnica sul post in pubblicazione, solo se la lease e di owner
+        document = await self.find_one_and_update(
+            {"_id": ObjectId(post_id), "status": PostStatus.PUBLISHING, "lease_owner": owner},
+            update_data,
+            projection={"_id": 1},
+            bump_version=False,
         )
+        return document is not None
+
+    async def renew_lease(self, post_id: str, owner: str, lease_seconds: float) -> bool:
+        """
+        Prolunga la lease di `owner` (heartbeat durante la pubblicazione)
+
+        Usata anche come controllo atomico prima di pubblicare: False se la
+        lease e scaduta e il post e stato preso da un altro worker.
+        """
+        return await self._leased_update(
+            post_id, owner, {"lease_expires": datetime.utcnow() + timedelta(seconds=lease_seconds)}
+        )
+
+    async def record_container(self, post_id: str, owner: str, creation_id: str) -> bool:
+        """
+        Salva il container Graph del tentativo in corso (se la lease e di owner)
+        """
+        return await self._leased_update(post_id, owner, {"creation_id": creation_id})
 
-    async def update_post_status(self, post_id: str, new_status: PostStatus) -> bool:
-        return await self.update_by_id(
-            post_id,
-            {"status": new_status, "updated_at": datetime.utcnow()},
+    async def _release(self, post_id: str, owner: str, update: Dict[str, Any]) -> bool:
+        # Solo il proprietario della lease puo chiudere la pubblicazione
+        update = {**update, "$unset": {"lease_owner": "", "lease_expires": ""}}
+        before = await self.find_one_and_update(
+            {"_id": ObjectId(post_id), "status": PostStatus.PUBLISHING, "lease_owner": owner},
+            update,
+            projection={"social_target": 1, "status": 1},
+            return_document=ReturnDocument.BEFORE,
         )
+        if before is None:
+            print(f"⚠️ Lease del post {post_id} non piu di {owner}")
+            return False
+        await self._apply_counters(status_change(before, update["$set"]["status"]))
+        return True
 
-    async def publish_post(self, post_id: str) -> bool:
-        return await self.update_by_id(
-            post_id,
+    async def complete_publication(
+        self,
+        post_id: str,
+        owner: str,
+        media_id: Optional[str] = None,
+    ) -> bool:
+        """
+        PUBLISHING -> PUBLISHED (se la lease e ancora di `owner`)
+
+        media_id None: pubblicato da un tentativo precedente di cui non si e
+        ricevuta la risposta (container gia PUBLISHED)
+        """
+        update: Dict[str, Any] = {
+            "status": PostStatus.PUBLISHED,
+            "published_at": datetime.utcnow(),
+        }
+        if media_id:
+            update["media_id"] = media_id
+        return await self._release(post_id, owner, {"$set": update})
+
+    async def fail_publication(
+        self,
+        post_id: str,
+        owner: str,
+        error: str,
+        retry_at: Optional[datetime] = None,
+    ) -> bool:
+        """
+        PUBLISHING -> SCHEDULED a retry_at (nuovo tentativo) o FAILED (definitivo)
+        """
+        update: Dict[str, Any] = {"status": PostStatus.FAILED, "last_error": error}
+        if retry_at is not None:
+            update = {
+                "status": PostStatus.SCHEDULED,
+                "last_error": error,
+                "data_programmazione": retry_at,
+            }
+        return await self._release(post_id, owner, {"$set": update})
+
+    async def next_due_time(
+        self,
+        social_targets: List[str] = PUBLISHABLE_SOCIAL_TARGETS,
+        shard: Optional[Tuple[int, int]] = None,
+    ) -> Optional[datetime]:
+        """
+        Prossima data_programmazione tra i post SCHEDULED (None se nessuno)
+        """
+        cursor = self.collection.find(
             {
-                "status": PostStatus.PUBLISHED,
-                "published_at": datetime.utcnow(),
-                "updated_at": datetime.utcnow(),
+                "status": PostStatus.SCHEDULED,
+                "social_target": {"$in": social_targets},
+                **_shard_filter(shard),
             },
+            {"data_programmazione": 1},
+        ).sort([("data_programmazione", 1)]).limit(1)
+        for doc in await cursor.to_list(length=1):
+            return doc.get("data_programmazione")
+        return None
+
+    async def backfill_shards(self, batch_size: int = 1000) -> int:
+        """
+        Assegna lo shard ai post programmati creati prima dello sharding
+
+        Anche i PUBLISHING: un post rimasto in pubblicazione senza shard (worker
+        morto prima dello sharding) con piu worker non verrebbe mai ripreso.
+
+        Returns:
+            int: Post aggiornati
+        """
+        operations: List[BulkOperation] = []
+        updated = 0
+        async for doc in self.iter_many(
+            {
+                "status": {"$in": [PostStatus.SCHEDULED, PostStatus.PUBLISHING]},
+                "shard": {"$exists": False},
+            },
+            projection={"_id": 1},
+            batch_size=batch_size,
+        ):
+            operations.append({
+                "op": "update",
+                "filter": {"_id": ObjectId(doc["_id"])},
+                "update": {"shard": shard_for(doc["_id"])},
+            })
+            if len(operations) >= batch_size:
+                updated += (await self.bulk_write(operations, bump_version=False))["modified"]
+                operations = []
+        if operations:
+            updated += (await self.bulk_write(operations, bump_version=False))["modified"]
+        return updated
+
+    async def delete_by_id(self, document_id: str) -> bool:
+        try:
+            obj_id = ObjectId(document_id)
+        except (InvalidId, TypeError) as e:
+            print(f"Errore cancellazione: {e}")
+            return False
+
+        deleted = await self.collection.find_one_and_delete(
+            {"_id": obj_id},
+            projection={"social_target": 1, "status": 1, "created_at": 1},
         )
+        if deleted is None:
+            return False
+
+        if self.cache is not None:
+            self.cache.invalidate_delete(self.collection.name, obj_id)
+        await self._apply_counters({(deleted.get("social_target"), deleted.get("status")): -1})
+        await PostRollupDAO().mark_dirty(deleted.get("created_at"), deleted.get("social_target"))
+        return True
+
+    async def iter_published_media_ids(self, page_size: int = 500) -> AsyncIterator[str]:
+        """
+        ID Instagram dei post pubblicati (per l'ingestion degli insights)
+
+        Una query keyset per pagina invece di un cursore aperto: chi consuma
+        puo attendere le chiamate Graph tra una pagina e l'altra senza che il
+        server chiuda il cursore inattivo (CursorNotFound dopo 10 minuti).
+        """
+        page_token = None
+        while True:
+            page, page_token = await self.find_page(
+                {"status": PostStatus.PUBLISHED, "media_id": {"$exists": True}},
+                sort=POSTS_RECENT_SORT,
+                limit=page_size,
+                page_token=page_token,
+                projection={"media_id": 1},
+            )
+            for doc in page:
+                yield doc["media_id"]
+            if page_token is None:
+                return
+
+    async def export_posts(
+        self,
+        status: Optional[PostStatus] = None,
+        social_target: Optional[str] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Tutti i post (opzionalmente filtrati), dal piu recente, in streaming
+
+        I documenti sono JSON-ready: ObjectId e date gia convertiti in stringa
+        """
+        filter_query: Dict[str, Any] = {}
+        if status:
+            filter_query["status"] = status
+        if social_target:
+            filter_query["social_target"] = social_target
+
+        async for doc in self.iter_many(filter_query, sort=POSTS_RECENT_SORT, json_ready=True):
+            yield doc
+
+    async def bulk_update_metadata(self, metrics: Dict[str, PostMetadata]) -> int:
+        """
+        Scrive le metriche di piu post in un'unica bulk write
+
+        Args:
+            metrics: media_id -> metriche
+
+        Returns:
+            int: Numero documenti aggiornati
+        """
+        now = datetime.utcnow()
+        operations: List[BulkOperation] = [
+            {
+                "op": "update",
+                "filter": {"media_id": media_id},
+                "update": {"metadata": values, "metadata_updated_at": now},
+            }
+            for media_id, values in metrics.items()
+        ]
+        # Metriche di sistema: version resta quella vista dagli editor
+        summary = await self.bulk_write(operations, bump_version=False)
+        for error in summary["errors"]:
+            print(f"❌ Aggiornamento metriche fallito: {error['message']}")
+        return summary["modified"]
 
     async def search_posts(self, search_text: str) -> List[Dict[str, Any]]:
         filter_query = {"testo": {"$regex": search_text, "$options": "i"}}
         return await self.find_many(filter_query)
 
-    async def get_analytics_data(self, social_target: Optional[str] = None) -> Dict[str, Any]:
-        match_stage: Dict[str, Any] = {}
-        if social_target:
-            match_stage = {"social_target": social_target}
-
-        pipeline = [
-            {"$match": match_stage},
-            {"$group": {"_id": "$status", "count": {"$sum": 1}}},
+    @staticmethod
+    def query_shapes() -> List[Dict[str, Any]]:
+        """
+        Forme delle query dei metodi del DAO, con valori d'esempio
+        (usate dall'index advisor per verificare i piani di esecuzione)
+        """
+        now = datetime.utcnow()
+        return [
+            {
+                "name": "get_posts_by_social",
+                "filter": {"social_target": "instagram"},
+                "sort": POSTS_RECENT_SORT,
+            },
+            {
+                "name": "get_posts_by_status",
+                "filter": {"status": PostStatus.DRAFT},
+                "sort": POSTS_RECENT_SORT,
+            },
+            {
+                "name": "get_scheduled_posts",
+                "filter": {"status": PostStatus.SCHEDULED, "data_programmazione": {"$lte": now}},
+                "sort": [("data_programmazione", 1)],
+            },
+            {
+                "name": "claim_due_post",
+                "filter": {
+                    "status": PostStatus.SCHEDULED,
+                    "data_programmazione": {"$lte": now},
+                    "social_target": {"$in": PUBLISHABLE_SOCIAL_TARGETS},
+                },
+                "sort": [("data_programmazione", 1)],
+            },
+            {
+                "name": "claim_expired_lease",
+                "filter": {"status": PostStatus.PUBLISHING, "lease_expires": {"$lte": now}},
+                "sort": [("lease_expires", 1)],
+            },
+            {
+                "name": "iter_published_media_ids",
+                "filter": {"status": PostStatus.PUBLISHED, "media_id": {"$exists": True}},
+                "sort": POSTS_RECENT_SORT,
+            },
+            {
+                "name": "export_posts",
+                "filter": {},
+                "sort": POSTS_RECENT_SORT,
+            },
+            {
+                "name": "search_posts",
+                "filter": {"testo": {"$regex": "esempio", "$options": "i"}},
+                "sort": None,
+            },
         ]
 
-        cursor = self.collection.aggregate(pipeline)
-        results = await cursor.to_list(length=None)
+    async def rebuild_counters(self) -> Dict[str, Any]:
+        """
+        Ricalcola i contatori da zero aggregando la collection posts
 
-        return {
-            "by_status": results,
-            "total": sum(r["count"] for r in results),
-        }
+        Serve dopo scritture che non passano da PostDAO (update_many,
+        delete_many, script) o al primo avvio. Le scritture concorrenti
+        durante il ricalcolo possono andare perse: eseguirlo a sistema fermo
+        (`python -m backend.services.counters`), mai da un percorso di lettura.
+        """
+        groups = await self.collection.aggregate(COUNTERS_PIPELINE).to_list(length=None)
+        await self.counters.bulk_write(rebuild_counter_operations(groups), ordered=True)
+        return summarize_counters(counters_from_groups(groups))
+
+    async def get_totals(self, social_target: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Totali post (complessivo, per status, per social) dai contatori
+
+        Senza contatori (mai ricostruiti) i totali vengono aggregati da posts
+        in sola lettura: il ricalcolo resta un passo di manutenzione esplicito.
+
+        Returns:
+            Dict: {"total": int, "by_status": {status: n}, "by_social": {social: n}}
+        """
+        counters = await self.counters.find({}).to_list(length=None)
+        if not counters:
+            groups = await self.collection.aggregate(COUNTERS_PIPELINE).to_list(length=None)
+            counters = counters_from_groups(groups)
+            if counters:
+                print("⚠️ post_counters vuota: eseguire python -m backend.services.counters")
+        return summarize_counters(counters, social_target)
+
+    async def get_analytics_data(
+        self,
+        social_target: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> Dict[str, Any]:
+        """
+        Post per status ed engagement dai rollup giornalieri (PostRollupDAO)
+
+        Il costo non dipende dal numero di post: si aggregano i rollup cosi
+        come sono. Se l'ultimo giro e piu vecchio di ROLLUP_MAX_AGE ne parte
+        uno in background; finche il primo giro non termina i totali vengono
+        aggregati direttamente da posts.
+
+        Args:
+            social_target: solo un social
+            since/until: giorni di creazione (UTC, inclusi)
+        """
+        rollups = PostRollupDAO()
+        rollups.refresh_in_background(max_age=ROLLUP_MAX_AGE)
+        return await rollups.get_analytics(social_target, since, until)
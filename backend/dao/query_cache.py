@@ -0,0 +1,244 @@
+"""
+Cache dei risultati delle query per BaseDAO e SyncBaseDAO
+
+Cache LRU con TTL, condivisa tra istanze DAO (i DAO vengono creati per
+richiesta): la usano la lista media dell'API (/api/media) e SyncPostDAO
+in Streamlit. Le scritture fatte attraverso un DAO con la stessa cache
+invalidano solo le voci che possono esserne toccate:
+
+- insert: voci il cui filtro puo matchare il nuovo documento
+- update per _id: voci che contengono il documento o che filtrano/ordinano
+  sui campi modificati
+- delete per _id: voci che contengono il documento, conteggi e pagine
+  (skip o keyset)
+- scritture con filtri generici (update_many, delete_many, bulk_write):
+  tutta la collection
+
+Le scritture fatte da altri processi non vengono viste: il TTL limita
+quanto a lungo un risultato puo restare vecchio.
+"""
+
+import copy
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from bson import json_util
+
+
+QUERY_CACHE_TTL = float(os.getenv("DAO_CACHE_TTL", "30"))
+QUERY_CACHE_MAX_ENTRIES = int(os.getenv("DAO_CACHE_MAX_ENTRIES", "1024"))
+
+MISSING = object()
+
+
+def _top_field(path: str) -> str:
+    return path.split(".", 1)[0]
+
+
+def filter_fields(filter_query: Optional[Dict[str, Any]]) -> Set[str]:
+    """
+    Campi (primo livello) referenziati da un filtro, anche dentro $and/$or/$nor
+    """
+    fields: Set[str] = set()
+    for key, value in (filter_query or {}).items():
+        if key in ("$and", "$or", "$nor"):
+            for clause in value:
+                fields |= filter_fields(clause)
+        elif not key.startswith("$"):
+            fields.add(_top_field(key))
+    return fields
+
+
+def _get_path(document: Dict[str, Any], path: str) -> Any:
+    value: Any = document
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return MISSING
+        value = value[part]
+    return value
+
+
+def _equals(value: Any, expected: Any) -> bool:
+    if value is MISSING:
+        return expected is None
+    if isinstance(value, list) and not isinstance(expected, list):
+        return expected in value
+    return value == expected
+
+
+def may_match(filter_query: Optional[Dict[str, Any]], document: Dict[str, Any]) -> bool:
+    """
+    Valutazione conservativa di un filtro su un documento: False solo se
+    un'uguaglianza ($eq, $in o valore diretto) e sicuramente falsa.
+    Gli altri operatori sono considerati sempre soddisfatti.
+    """
+    for key, condition in (filter_query or {}).items():
+        if key == "$and":
+            if not all(may_match(clause, document) for clause in condition):
+                return False
+        elif key == "$or":
+            if not any(may_match(clause, document) for clause in condition):
+                return False
+        elif key.startswith("$"):
+            continue
+        else:
+            value = _get_path(document, key)
+            is_operator = isinstance(condition, dict) and any(k.startswith("$") for k in condition)
+            if not is_operator:
+                if not _equals(value, condition):
+                    return False
+            elif "$eq" in condition and not _equals(value, condition["$eq"]):
+                return False
+            elif "$in" in condition and not any(_equals(value, v) for v in condition["$in"]):
+                return False
+    return True
+
+
+@dataclass
+class _Entry:
+    value: Any
+    stored_at: float
+    filter_query: Dict[str, Any]
+    # Campi di filtro e ordinamento: se cambiano, il risultato puo cambiare
+    fields: Set[str]
+    # _id dei documenti restituiti (None = conteggio, nessun documento)
+    ids: Optional[Set[str]]
+    # Risultato dipendente da documenti non restituiti (skip, token keyset)
+    positional: bool
+
+
+class QueryCache:
+    """
+    Cache LRU + TTL dei risultati delle letture DAO.
+
+    Thread-safe: nessuna operazione si sospende, quindi puo essere usata
+    sia dall'event loop sia da thread diversi.
+
+    Args:
+        ttl: secondi di validita di un risultato
+        max_entries: numero massimo di risultati (si scarta il meno usato)
+    """
+
+    def __init__(self, ttl: float = QUERY_CACHE_TTL, max_entries: int = QUERY_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple[str, str], _Entry]" = OrderedDict()
+        # Contatore scritture per collection: un risultato letto prima di
+        # una scrittura non viene salvato dopo
+        self._generations: Dict[str, int] = {}
+        # Incrementato da clear(): vale anche per collection mai scritte
+        self._epoch = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(collection: str, operation: str, **params: Any) -> Tuple[str, str]:
+        return collection, json_util.dumps([operation, sorted(params.items())])
+
+    def generation(self, collection: str) -> int:
+        return self._epoch + self._generations.get(collection, 0)
+
+    def get(self, key: Tuple[str, str]) -> Any:
+        """
+        Restituisce una copia del risultato o MISSING
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry.stored_at >= self.ttl:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return MISSING
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return copy.deepcopy(entry.value)
+
+    def put(
+        self,
+        key: Tuple[str, str],
+        value: Any,
+        generation: int,
+        filter_query: Optional[Dict[str, Any]] = None,
+        sort: Optional[List[tuple]] = None,
+        positional: bool = False,
+    ) -> None:
+        collection = key[0]
+        # find_page restituisce (documenti, token)
+        documents = value[0] if isinstance(value, tuple) else value
+        if isinstance(documents, dict):
+            documents = [documents]
+        if isinstance(documents, list):
+            # Senza _id (proiezione {"_id": 0}) non si saprebbe cosa invalidare
+            if any("_id" not in doc for doc in documents):
+                return
+            ids: Optional[Set[str]] = {str(doc["_id"]) for doc in documents}
+        elif documents is None:
+            ids = set()
+        else:
+            ids = None
+
+        fields = filter_fields(filter_query) | {_top_field(field) for field, _ in sort or []}
+        entry = _Entry(
+            value=copy.deepcopy(value),
+            stored_at=time.monotonic(),
+            filter_query=copy.deepcopy(filter_query or {}),
+            fields=fields,
+            ids=ids,
+            positional=positional,
+        )
+        with self._lock:
+            if self.generation(collection) != generation:
+                return
+            self._entries.pop(key, None)
+            self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _drop(self, collection: str, predicate) -> None:
+        with self._lock:
+            self._generations[collection] = self._generations.get(collection, 0) + 1
+            for key in [k for k, e in self._entries.items() if k[0] == collection and predicate(e)]:
+                del self._entries[key]
+
+    def invalidate_collection(self, collection: str) -> None:
+        self._drop(collection, lambda entry: True)
+
+    def invalidate_insert(self, collection: str, documents: Iterable[Dict[str, Any]]) -> None:
+        documents = list(documents)
+        self._drop(
+            collection,
+            lambda entry: any(may_match(entry.filter_query, doc) for doc in documents),
+        )
+
+    def invalidate_update(self, collection: str, document_id: Any, changed: Iterable[str]) -> None:
+        document_id = str(document_id)
+        changed = {_top_field(field) for field in changed}
+        self._drop(
+            collection,
+            lambda entry: (entry.ids is not None and document_id in entry.ids)
+            or bool(entry.fields & changed),
+        )
+
+    def invalidate_delete(self, collection: str, document_id: Any) -> None:
+        document_id = str(document_id)
+        self._drop(
+            collection,
+            lambda entry: entry.ids is None or document_id in entry.ids or entry.positional,
+        )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._epoch += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+# Cache condivisa dai DAO creati con cache=query_cache
+query_cache = QueryCache()
@@ -0,0 +1,373 @@
+"""
+Rollup DAO - Analytics pre-aggregate dei post
+
+post_rollups contiene un documento per giorno (created_at, UTC) x
+social_target x status, con il numero di post e le somme di engagement
+(metadata): le analytics della dashboard aggregano questi documenti, che
+crescono con i giorni e non con i post.
+
+I rollup vengono aggiornati da refresh() (housekeeping del leader dello
+scheduler, `python -m backend.services.rollups` o in background da
+get_analytics_data, che non aspetta mai il giro):
+- i post con updated_at >= watermark indicano le partizioni
+  (giorno, social_target) cambiate dall'ultimo giro
+- ogni partizione cambiata viene ricalcolata per intero con $group + $merge,
+  poi si cancellano i suoi rollup non riscritti (status non piu presenti)
+- PostDAO.delete_by_id segna la partizione del post cancellato in `dirty`
+
+Finche lo stato dei rollup non esiste (primo giro non ancora terminato,
+stato perso) le analytics vengono aggregate direttamente da posts.
+
+Le scritture che non aggiornano updated_at, le cancellazioni fuori da
+PostDAO (delete_many, script) e i cambi di social_target richiedono
+refresh(full=True).
+"""
+
+import asyncio
+import os
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from pymongo import ASCENDING, IndexModel
+
+from .base_dao import BaseDAO
+from .lease_dao import LeaseDAO
+from ..database import get_database
+
+
+POST_ROLLUPS_COLLECTION = "post_rollups"
+POST_ROLLUPS_STATE_COLLECTION = "post_rollups_state"
+ROLLUP_STATE_ID = "posts"
+ROLLUP_LEASE = "job:post_rollups"
+
+# Margine sul watermark: scritture ancora in volo e orologi non allineati
+ROLLUP_WATERMARK_LAG = float(os.getenv("POST_ROLLUPS_WATERMARK_LAG", "60"))
+# Durata massima di un giro (lease del job)
+ROLLUP_LOCK_TTL = float(os.getenv("POST_ROLLUPS_LOCK_TTL", "600"))
+# get_analytics_data avvia un giro in background se l'ultimo e piu vecchio
+ROLLUP_MAX_AGE = float(os.getenv("POST_ROLLUPS_MAX_AGE", "300"))
+# Partizioni ricalcolate per ogni $merge
+ROLLUP_BATCH_SIZE = int(os.getenv("POST_ROLLUPS_BATCH_SIZE", "200"))
+
+ENGAGEMENT_FIELDS = ("views", "likes", "comments", "shares")
+
+_DAY_FORMAT = "%Y-%m-%d"
+_DAY_EXPRESSION = {"$dateToString": {"format": _DAY_FORMAT, "date": "$created_at"}}
+
+Partition = Tuple[Optional[str], Optional[str]]
+
+# Giro avviato da refresh_in_background (al massimo uno per processo)
+_background_refresh: Optional[asyncio.Task] = None
+
+
+def rollup_day(created_at: Any) -> Optional[str]:
+    """
+    Giorno (UTC) di un post come nei rollup, None se created_at manca
+    """
+    return created_at.strftime(_DAY_FORMAT) if isinstance(created_at, datetime) else None
+
+
+def dirty_update(created_at: Any, social_target: Optional[str]) -> Dict[str, Any]:
+    """
+    Update sullo stato dei rollup che segna da ricalcolare la partizione
+    di un post cancellato (condiviso da PostDAO e SyncPostDAO)
+    """
+    return {"$addToSet": {"dirty": {"day": rollup_day(created_at), "social_target": social_target}}}
+
+
+def _partition_filter(partitions: Iterable[Partition]) -> Dict[str, Any]:
+    # Range su created_at invece del giorno calcolato: usa gli indici
+    clauses = []
+    for day, social_target in partitions:
+        if day is None:
+            clauses.append({"social_target": social_target, "created_at": None})
+            continue
+        start = datetime.strptime(day, _DAY_FORMAT)
+        clauses.append({
+            "social_target": social_target,
+            "created_at": {"$gte": start, "$lt": start + timedelta(days=1)},
+        })
+    return {"$or": clauses}
+
+
+def rollup_pipeline(match: Dict[str, Any], computed_at: datetime) -> List[Dict[str, Any]]:
+    """
+    Aggrega i post di `match` per giorno x social x status e scrive il
+    risultato in post_rollups (sostituendo i rollup esistenti)
+    """
+    return [
+        {"$match": match},
+        {"$group": {
+            "_id": {
+                "day": _DAY_EXPRESSION,
+                "social_target": "$social_target",
+                "status": "$status",
+            },
+            "count": {"$sum": 1},
+            **{
+                field: {"$sum": {"$ifNull": [f"$metadata.{field}", 0]}}
+                for field in ENGAGEMENT_FIELDS
+            },
+        }},
+        {"$set": {
+            "day": "$_id.day",
+            "social_target": "$_id.social_target",
+            "status": "$_id.status",
+            "computed_at": computed_at,
+        }},
+        {"$merge": {
+            "into": POST_ROLLUPS_COLLECTION,
+            "on": "_id",
+            "whenMatched": "replace",
+            "whenNotMatched": "insert",
+        }},
+    ]
+
+
+def changed_partitions_pipeline(watermark: datetime) -> List[Dict[str, Any]]:
+    """
+    Partizioni (giorno, social) dei post modificati da `watermark`
+    """
+    return [
+        {"$match": {"updated_at": {"$gte": watermark}}},
+        {"$group": {"_id": {"day": _DAY_EXPRESSION, "social_target": "$social_target"}}},
+    ]
+
+
+def analytics_pipeline(
+    social_target: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Totali per status dai rollup (giorni since/until inclusi)
+    """
+    match: Dict[str, Any] = {}
+    if social_target:
+        match["social_target"] = social_target
+    if since or until:
+        day_filter: Dict[str, Any] = {}
+        if since:
+            day_filter["$gte"] = rollup_day(since)
+        if until:
+            day_filter["$lte"] = rollup_day(until)
+        match["day"] = day_filter
+
+    return [
+        {"$match": match},
+        {"$group": {
+            "_id": "$status",
+            "count": {"$sum": "$count"},
+            **{field: {"$sum": f"${field}"} for field in ENGAGEMENT_FIELDS},
+        }},
+        {"$sort": {"_id": 1}},
+    ]
+
+
+def posts_analytics_pipeline(
+    social_target: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Stessi gruppi di analytics_pipeline calcolati direttamente su posts
+    (stessi giorni UTC inclusi), finche i rollup non sono pronti
+    """
+    match: Dict[str, Any] = {}
+    if social_target:
+        match["social_target"] = social_target
+    if since or until:
+        created_filter: Dict[str, Any] = {}
+        if since:
+            created_filter["$gte"] = datetime.strptime(rollup_day(since), _DAY_FORMAT)
+        if until:
+            created_filter["$lt"] = datetime.strptime(rollup_day(until), _DAY_FORMAT) + timedelta(days=1)
+        match["created_at"] = created_filter
+
+    return [
+        {"$match": match},
+        {"$group": {
+            "_id": "$status",
+            "count": {"$sum": 1},
+            **{
+                field: {"$sum": {"$ifNull": [f"$metadata.{field}", 0]}}
+                for field in ENGAGEMENT_FIELDS
+            },
+        }},
+        {"$sort": {"_id": 1}},
+    ]
+
+
+def summarize_rollups(groups: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Risultato di get_analytics_data dai gruppi di analytics_pipeline
+    """
+    by_status = [
+        {"_id": group["_id"], "count": group["count"]}
+        for group in groups
+        if group.get("count", 0) > 0
+    ]
+    return {
+        "by_status": by_status,
+        "total": sum(group["count"] for group in by_status),
+        "engagement": {
+            field: sum(group.get(field, 0) for group in groups)
+            for field in ENGAGEMENT_FIELDS
+        },
+    }
+
+
+class PostRollupDAO(BaseDAO):
+    """
+    DAO per i rollup analytics dei post
+    """
+
+    INDEXES = [
+        # Ricalcolo partizioni (cancellazione rollup vecchi) e filtri per giorno
+        IndexModel(
+            [("day", ASCENDING), ("social_target", ASCENDING)],
+            name="day_social",
+        ),
+    ]
+
+    def __init__(self):
+        db = get_database()
+        super().__init__(db[POST_ROLLUPS_COLLECTION])
+        self.posts = db["posts"]
+        self.state = db[POST_ROLLUPS_STATE_COLLECTION]
+
+    async def mark_dirty(self, created_at: Any, social_target: Optional[str]) -> None:
+        """
+        Segna da ricalcolare la partizione di un post cancellato
+
+        Senza stato (rollup mai costruiti) non serve: il primo giro e completo.
+        """
+        await self.state.update_one({"_id": ROLLUP_STATE_ID}, dirty_update(created_at, social_target))
+
+    async def _recompute(self, partitions: List[Partition]) -> None:
+        computed_at = datetime.utcnow()
+        await self.posts.aggregate(
+            rollup_pipeline(_partition_filter(partitions), computed_at)
+        ).to_list(length=None)
+        # Status che non hanno piu post nella partizione
+        await self.collection.delete_many({
+            "$or": [{"day": day, "social_target": social} for day, social in partitions],
+            "computed_at": {"$lt": computed_at},
+        })
+
+    async def _rebuild(self) -> int:
+        computed_at = datetime.utcnow()
+        await self.posts.aggregate(rollup_pipeline({}, computed_at)).to_list(length=None)
+        result = await self.collection.delete_many({"computed_at": {"$lt": computed_at}})
+        return result.deleted_count
+
+    async def _refresh(self, full: bool) -> Dict[str, Any]:
+        started = datetime.utcnow()
+        state = await self.state.find_one({"_id": ROLLUP_STATE_ID})
+        dirty = state.get("dirty", []) if state else []
+
+        if state is None or full:
+            await self._rebuild()
+            partitions: List[Partition] = []
+        else:
+            changed = await self.posts.aggregate(
+                changed_partitions_pipeline(state["watermark"])
+            ).to_list(length=None)
+            keys = {(group["_id"].get("day"), group["_id"].get("social_target")) for group in changed}
+            keys |= {(entry.get("day"), entry.get("social_target")) for entry in dirty}
+            partitions = sorted(keys, key=lambda key: (key[0] or "", key[1] or ""))
+            for i in range(0, len(partitions), ROLLUP_BATCH_SIZE):
+                await self._recompute(partitions[i:i + ROLLUP_BATCH_SIZE])
+
+        # $pullAll: le partizioni segnate durante il giro restano per il prossimo
+        await self.state.update_one(
+            {"_id": ROLLUP_STATE_ID},
+            {
+                "$set": {
+                    "watermark": started - timedelta(seconds=ROLLUP_WATERMARK_LAG),
+                    "refreshed_at": started,
+                },
+                "$pullAll": {"dirty": dirty},
+            },
+            upsert=True,
+        )
+        return {
+            "full": state is None or full,
+            "partitions": len(partitions),
+            "seconds": round((datetime.utcnow() - started).total_seconds(), 3),
+        }
+
+    async def refresh(
+        self,
+        full: bool = False,
+        max_age: Optional[float] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Aggiorna i rollup (incrementale; completo al primo giro o con full)
+
+        Un solo giro alla volta tra tutti i processi (lease ROLLUP_LEASE):
+        due $merge concorrenti potrebbero riscrivere rollup piu vecchi.
+
+        Args:
+            full: ricalcola tutti i rollup
+            max_age: aggiorna solo se l'ultimo giro e piu vecchio di max_age secondi
+
+        Returns:
+            Optional[Dict]: {"full", "partitions", "seconds"}, None se il giro
+                non era necessario o e gia in corso altrove
+        """
+        if max_age is not None and not full:
+            state = await self.state.find_one({"_id": ROLLUP_STATE_ID}, {"refreshed_at": 1})
+            if state and datetime.utcnow() - state["refreshed_at"] < timedelta(seconds=max_age):
+                return None
+
+        leases = LeaseDAO()
+        owner = uuid.uuid4().hex
+        if not await leases.acquire(ROLLUP_LEASE, owner, ROLLUP_LOCK_TTL):
+            return None
+        try:
+            return await self._refresh(full)
+        finally:
+            await leases.release(ROLLUP_LEASE, owner)
+
+    def refresh_in_background(self, max_age: Optional[float] = None) -> None:
+        """
+        Avvia refresh(max_age=...) senza attenderlo: chi legge riceve subito
+        i rollup esistenti (vuoti prima del primo giro)
+        """
+        global _background_refresh
+        if _background_refresh is not None and not _background_refresh.done():
+            return
+        _background_refresh = asyncio.create_task(self._refresh_logged(max_age))
+
+    async def _refresh_logged(self, max_age: Optional[float]) -> None:
+        try:
+            result = await self.refresh(max_age=max_age)
+        except Exception as e:
+            print(f"⚠️ Aggiornamento rollup fallito: {e}")
+            return
+        if result is not None:
+            print(f"📊 Rollup aggiornati: {result}")
+
+    async def get_analytics(
+        self,
+        social_target: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> Dict[str, Any]:
+        """
+        Post per status ed engagement totale dai rollup
+
+        Senza stato dei rollup (mai costruiti o stato perso) aggrega posts:
+        piu lento, ma la dashboard non mostra zeri in attesa del primo giro.
+
+        Returns:
+            Dict: {"by_status": [{"_id": status, "count": n}], "total": int,
+                "engagement": {views, likes, comments, shares}}
+        """
+        if await self.state.find_one({"_id": ROLLUP_STATE_ID}, {"_id": 1}) is None:
+            cursor = self.posts.aggregate(posts_analytics_pipeline(social_target, since, until))
+        else:
+            cursor = self.collection.aggregate(analytics_pipeline(social_target, since, until))
+        return summarize_rollups(await cursor.to_list(length=None))
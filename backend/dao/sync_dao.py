@@ -0,0 +1,553 @@
+"""
+DAO sincroni (pymongo) per Streamlit e script
+
+Stessa API di BaseDAO/PostDAO ma con metodi sincroni, sul client pymongo
+condiviso di get_database_sync(): nessuna connessione nuova ad ogni rerun
+e nessuno stato in comune con il client Motor delle API.
+"""
+
+from typing import List, Dict, Any, Optional, Tuple
+from datetime import datetime
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import ReturnDocument
+from pymongo.collection import Collection
+
+from .base_dao import (
+    VERSION_FIELD,
+    BaseDAO,
+    VersionConflictError,
+    decode_page_token,
+    document_version,
+    encode_page_token,
+    keyset_filter,
+    keyset_projection,
+    keyset_sort,
+)
+from .post_dao import (
+    CALENDAR_SUMMARY_PROJECTION,
+    COUNTERS_PIPELINE,
+    LIST_SUMMARY_PROJECTION,
+    POST_COUNTERS_COLLECTION,
+    POSTS_RECENT_SORT,
+    CounterChanges,
+    PostDAO,
+    PostStatus,
+    build_post,
+    counter_updates,
+    counters_from_groups,
+    rebuild_counter_operations,
+    scheduled_filter,
+    status_change,
+    summarize_counters,
+)
+from .query_cache import MISSING, QueryCache
+from .rollup_dao import (
+    POST_ROLLUPS_COLLECTION,
+    POST_ROLLUPS_STATE_COLLECTION,
+    ROLLUP_STATE_ID,
+    analytics_pipeline,
+    dirty_update,
+    posts_analytics_pipeline,
+    summarize_rollups,
+)
+from ..database import get_database_sync
+
+
+class SyncBaseDAO:
+    """
+    Versione sincrona di BaseDAO
+    """
+
+    INDEXES = []
+
+    def __init__(self, collection: Collection, cache: Optional[QueryCache] = None):
+        self.collection = collection
+        # Stessa semantica di BaseDAO: la cache puo essere condivisa con i DAO async
+        self.cache = cache
+
+    def _cached_read(
+        self,
+        operation: str,
+        loader,
+        filter_query: Optional[Dict[str, Any]] = None,
+        sort: Optional[List[tuple]] = None,
+        positional: bool = False,
+        **params: Any
+    ) -> Any:
+        if self.cache is None:
+            return loader()
+
+        name = self.collection.name
+        key = QueryCache.make_key(name, operation, filter=filter_query, sort=sort, **params)
+        value = self.cache.get(key)
+        if value is not MISSING:
+            return value
+
+        generation = self.cache.generation(name)
+        value = loader()
+        self.cache.put(key, value, generation, filter_query, sort, positional)
+        return value
+
+    def _invalidate_update(self, filter_query: Dict[str, Any], update_doc: Dict[str, Any]) -> None:
+        if self.cache is None:
+            return
+        document_id = BaseDAO._target_id(filter_query)
+        if document_id is None:
+            self.cache.invalidate_collection(self.collection.name)
+        else:
+            self.cache.invalidate_update(
+                self.collection.name, document_id, BaseDAO._changed_fields(update_doc)
+            )
+
+    def ensure_indexes(self) -> List[str]:
+        if not self.INDEXES:
+            return []
+        return self.collection.create_indexes(self.INDEXES)
+
+    def insert_one(self, document: Dict[str, Any]) -> str:
+        if "created_at" not in document:
+            document["created_at"] = datetime.utcnow()
+        document.setdefault("updated_at", document["created_at"])
+        document.setdefault(VERSION_FIELD, 1)
+
+        result = self.collection.insert_one(document)
+        if self.cache is not None:
+            self.cache.invalidate_insert(self.collection.name, [document])
+        return str(result.inserted_id)
+
+    def insert_many(self, documents: List[Dict[str, Any]]) -> List[str]:
+        for doc in documents:
+            if "created_at" not in doc:
+                doc["created_at"] = datetime.utcnow()
+            doc.setdefault("updated_at", doc["created_at"])
+            doc.setdefault(VERSION_FIELD, 1)
+
+        result = self.collection.insert_many(documents)
+        if self.cache is not None:
+            self.cache.invalidate_insert(self.collection.name, documents)
+        return [str(id) for id in result.inserted_ids]
+
+    def find_one(
+        self,
+        filter_query: Dict[str, Any],
+        projection: Optional[Dict[str, Any]] = None
+    ) -> Optional[Dict[str, Any]]:
+        def load():
+            document = self.collection.find_one(filter_query, projection)
+            if document and "_id" in document:
+                document["_id"] = str(document["_id"])
+            return document
+
+        return self._cached_read("find_one", load, filter_query, projection=projection)
+
+    def find_by_id(
+        self,
+        document_id: str,
+        projection: Optional[Dict[str, Any]] = None
+    ) -> Optional[Dict[str, Any]]:
+        try:
+            obj_id = ObjectId(document_id)
+            return self.find_one({"_id": obj_id}, projection)
+        except Exception as e:
+            print(f"Errore conversione ID: {e}")
+            return None
+
+    def find_many(
+        self,
+        filter_query: Dict[str, Any] = None,
+        limit: int = 100,
+        skip: int = 0,
+        sort: List[tuple] = None,
+        projection: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        if filter_query is None:
+            filter_query = {}
+
+        def load():
+            cursor = self.collection.find(filter_query, projection)
+
+            if sort:
+                cursor = cursor.sort(sort)
+
+            documents = list(cursor.skip(skip).limit(limit))
+
+            for doc in documents:
+                if "_id" in doc:
+                    doc["_id"] = str(doc["_id"])
+
+            return documents
+
+        return self._cached_read(
+            "find_many", load, filter_query, sort, positional=skip > 0,
+            projection=projection, limit=limit, skip=skip,
+        )
+
+    def find_page(
+        self,
+        filter_query: Dict[str, Any] = None,
+        sort: List[tuple] = None,
+        limit: int = 50,
+        page_token: Optional[str] = None,
+        projection: Optional[Dict[str, Any]] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        sort = keyset_sort(sort)
+        query = dict(filter_query or {})
+
+        if page_token:
+            after = keyset_filter(sort, decode_page_token(page_token, sort))
+            query = {"$and": [query, after]} if query else after
+
+        def load():
+            cursor = self.collection.find(query, keyset_projection(projection, sort))
+            documents = list(cursor.sort(sort).limit(limit + 1))
+
+            next_token = None
+            if len(documents) > limit:
+                documents = documents[:limit]
+                next_token = encode_page_token(documents[-1], sort)
+
+            for doc in documents:
+                if "_id" in doc:
+                    doc["_id"] = str(doc["_id"])
+
+            return documents, next_token
+
+        return self._cached_read(
+            "find_page", load, query, sort, positional=True,
+            projection=projection, limit=limit,
+        )
+
+    def count(self, filter_query: Dict[str, Any] = None, limit: int = 0) -> int:
+        if filter_query is None:
+            filter_query = {}
+
+        if not filter_query and not limit:
+            loader = self.collection.estimated_document_count
+        elif limit:
+            loader = lambda: self.collection.count_documents(filter_query, limit=limit)
+        else:
+            loader = lambda: self.collection.count_documents(filter_query)
+
+        return self._cached_read("count", loader, filter_query, limit=limit)
+
+    def update_one(
+        self,
+        filter_query: Dict[str, Any],
+        update_data: Dict[str, Any],
+        expected_version: Optional[int] = None,
+        bump_version: bool = True
+    ) -> bool:
+        update_doc = BaseDAO._stamped_update(
+            update_data, datetime.utcnow(), upsert=False, bump_version=bump_version
+        )
+
+        result = self.collection.update_one(
+            BaseDAO._versioned_filter(filter_query, expected_version), update_doc
+        )
+        if result.matched_count == 0 and expected_version is not None:
+            self._raise_if_conflict(filter_query, expected_version)
+        self._invalidate_update(filter_query, update_doc)
+        return result.modified_count > 0
+
+    def update_by_id(
+        self,
+        document_id: str,
+        update_data: Dict[str, Any],
+        expected_version: Optional[int] = None,
+        bump_version: bool = True
+    ) -> bool:
+        try:
+            obj_id = ObjectId(document_id)
+        except (InvalidId, TypeError) as e:
+            print(f"Errore aggiornamento: {e}")
+            return False
+        return self.update_one({"_id": obj_id}, update_data, expected_version, bump_version)
+
+    def update_many(
+        self,
+        filter_query: Dict[str, Any],
+        update_data: Dict[str, Any],
+        bump_version: bool = True
+    ) -> int:
+        update_doc = BaseDAO._stamped_update(
+            update_data, datetime.utcnow(), upsert=False, bump_version=bump_version
+        )
+
+        result = self.collection.update_many(filter_query, update_doc)
+        if self.cache is not None:
+            self.cache.invalidate_collection(self.collection.name)
+        return result.modified_count
+
+    def _raise_if_conflict(self, filter_query: Dict[str, Any], expected_version: int) -> None:
+        current = self.collection.find_one(filter_query, {VERSION_FIELD: 1})
+        if current is not None:
+            raise VersionConflictError(
+                current.get("_id"), expected_version, document_version(current)
+            )
+
+    def find_one_and_update(
+        self,
+        filter_query: Dict[str, Any],
+        update_data: Dict[str, Any],
+        projection: Optional[Dict[str, Any]] = None,
+        expected_version: Optional[int] = None,
+        upsert: bool = False,
+        return_document: bool = ReturnDocument.AFTER,
+        sort: Optional[List[tuple]] = None,
+        bump_version: bool = True
+    ) -> Optional[Dict[str, Any]]:
+        update_doc = BaseDAO._stamped_update(update_data, datetime.utcnow(), upsert, bump_version)
+
+        document = self.collection.find_one_and_update(
+            BaseDAO._versioned_filter(filter_query, expected_version),
+            update_doc,
+            projection=projection,
+            upsert=upsert,
+            return_document=return_document,
+            sort=sort,
+        )
+        if document is None:
+            if expected_version is not None:
+                self._raise_if_conflict(filter_query, expected_version)
+            if not upsert:
+                return None
+
+        if self.cache is not None:
+            if upsert:
+                self.cache.invalidate_collection(self.collection.name)
+            else:
+                self.cache.invalidate_update(
+                    self.collection.name, document["_id"], BaseDAO._changed_fields(update_doc)
+                )
+
+        if document and "_id" in document:
+            document["_id"] = str(document["_id"])
+        return document
+
+    def delete_one(self, filter_query: Dict[str, Any]) -> bool:
+        result = self.collection.delete_one(filter_query)
+        if self.cache is not None:
+            document_id = BaseDAO._target_id(filter_query)
+            if document_id is None:
+                self.cache.invalidate_collection(self.collection.name)
+            else:
+                self.cache.invalidate_delete(self.collection.name, document_id)
+        return result.deleted_count > 0
+
+    def delete_by_id(self, document_id: str) -> bool:
+        try:
+            obj_id = ObjectId(document_id)
+            return self.delete_one({"_id": obj_id})
+        except Exception as e:
+            print(f"Errore cancellazione: {e}")
+            return False
+
+    def delete_many(self, filter_query: Dict[str, Any]) -> int:
+        result = self.collection.delete_many(filter_query)
+        if self.cache is not None:
+            self.cache.invalidate_collection(self.collection.name)
+        return result.deleted_count
+
+    def exists(self, filter_query: Dict[str, Any]) -> bool:
+        return self.collection.count_documents(filter_query, limit=1) > 0
+
+
+class SyncPostDAO(SyncBaseDAO):
+    """
+    Versione sincrona di PostDAO
+    """
+
+    INDEXES = PostDAO.INDEXES
+
+    def __init__(self, cache: Optional[QueryCache] = None):
+        db = get_database_sync()
+        super().__init__(db["posts"], cache=cache)
+        self.counters = db[POST_COUNTERS_COLLECTION]
+        self.rollups = db[POST_ROLLUPS_COLLECTION]
+        self.rollup_state = db[POST_ROLLUPS_STATE_COLLECTION]
+
+    def _apply_counters(self, changes: CounterChanges) -> None:
+        operations = counter_updates(changes)
+        if operations:
+            self.counters.bulk_write(operations, ordered=False)
+
+    def _set_status(
+        self,
+        post_id: str,
+        update_data: Dict[str, Any],
+        expected_version: Optional[int] = None,
+    ) -> bool:
+        try:
+            obj_id = ObjectId(post_id)
+        except (InvalidId, TypeError) as e:
+            print(f"Errore aggiornamento: {e}")
+            return False
+
+        before = self.find_one_and_update(
+            {"_id": obj_id},
+            update_data,
+            projection={"social_target": 1, "status": 1},
+            expected_version=expected_version,
+            return_document=ReturnDocument.BEFORE,
+        )
+        if before is None:
+            return False
+
+        self._apply_counters(status_change(before, update_data["status"]))
+        return True
+
+    def create_post(
+        self,
+        testo: str,
+        social_target: str,
+        data_programmazione: Optional[datetime] = None,
+        status: PostStatus = PostStatus.DRAFT,
+        url_risorsa: Optional[str] = None,
+        user_id: Optional[str] = None,
+    ) -> str:
+        post_data = build_post(
+            testo, social_target, data_programmazione, status, url_risorsa, user_id
+        )
+        post_id = self.insert_one(post_data)
+        self._apply_counters({(post_data["social_target"], post_data["status"]): 1})
+        return post_id
+
+    def get_posts_by_social(
+        self,
+        social_target: str,
+        limit: int = 50,
+        page_token: Optional[str] = None,
+        projection: Optional[Dict[str, Any]] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        return self.find_page(
+            filter_query={"social_target": social_target},
+            sort=POSTS_RECENT_SORT,
+            limit=limit,
+            page_token=page_token,
+            projection=projection,
+        )
+
+    def get_posts_by_status(
+        self,
+        status: PostStatus,
+        limit: int = 50,
+        page_token: Optional[str] = None,
+        projection: Optional[Dict[str, Any]] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        return self.find_page(
+            filter_query={"status": status},
+            sort=POSTS_RECENT_SORT,
+            limit=limit,
+            page_token=page_token,
+            projection=projection,
+        )
+
+    def get_posts_list_summary(
+        self,
+        status: PostStatus,
+        limit: int = 50,
+        page_token: Optional[str] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        return self.get_posts_by_status(
+            status, limit=limit, page_token=page_token, projection=LIST_SUMMARY_PROJECTION
+        )
+
+    def get_scheduled_posts(
+        self,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        projection: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict[str, Any]]:
+        return self.find_many(
+            filter_query=scheduled_filter(start_date, end_date),
+            sort=[("data_programmazione", 1)],
+            projection=projection,
+        )
+
+    def get_calendar_summary(
+        self,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+    ) -> List[Dict[str, Any]]:
+        return self.get_scheduled_posts(
+            start_date, end_date, projection=CALENDAR_SUMMARY_PROJECTION
+        )
+
+    def update_post_status(
+        self,
+        post_id: str,
+        new_status: PostStatus,
+        expected_version: Optional[int] = None,
+    ) -> bool:
+        return self._set_status(post_id, {"status": new_status}, expected_version)
+
+    def publish_post(
+        self,
+        post_id: str,
+        media_id: Optional[str] = None,
+        expected_version: Optional[int] = None,
+    ) -> bool:
+        update_data: Dict[str, Any] = {
+            "status": PostStatus.PUBLISHED,
+            "published_at": datetime.utcnow(),
+        }
+        if media_id:
+            update_data["media_id"] = media_id
+        return self._set_status(post_id, update_data, expected_version)
+
+    def delete_by_id(self, document_id: str) -> bool:
+        try:
+            obj_id = ObjectId(document_id)
+        except (InvalidId, TypeError) as e:
+            print(f"Errore cancellazione: {e}")
+            return False
+
+        deleted = self.collection.find_one_and_delete(
+            {"_id": obj_id},
+            projection={"social_target": 1, "status": 1, "created_at": 1},
+        )
+        if deleted is None:
+            return False
+
+        if self.cache is not None:
+            self.cache.invalidate_delete(self.collection.name, obj_id)
+        self._apply_counters({(deleted.get("social_target"), deleted.get("status")): -1})
+        self.rollup_state.update_one(
+            {"_id": ROLLUP_STATE_ID},
+            dirty_update(deleted.get("created_at"), deleted.get("social_target")),
+        )
+        return True
+
+    def search_posts(self, search_text: str) -> List[Dict[str, Any]]:
+        filter_query = {"testo": {"$regex": search_text, "$options": "i"}}
+        return self.find_many(filter_query)
+
+    def rebuild_counters(self) -> Dict[str, Any]:
+        groups = list(self.collection.aggregate(COUNTERS_PIPELINE))
+        self.counters.bulk_write(rebuild_counter_operations(groups), ordered=True)
+        return summarize_counters(counters_from_groups(groups))
+
+    def get_totals(self, social_target: Optional[str] = None) -> Dict[str, Any]:
+        # Come PostDAO.get_totals: senza contatori si aggrega, non si ricostruisce
+        counters = list(self.counters.find({}))
+        if not counters:
+            counters = counters_from_groups(list(self.collection.aggregate(COUNTERS_PIPELINE)))
+            if counters:
+                print("⚠️ post_counters vuota: eseguire python -m backend.services.counters")
+        return summarize_counters(counters, social_target)
+
+    def get_analytics_data(
+        self,
+        social_target: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> Dict[str, Any]:
+        # Come PostRollupDAO.get_analytics: i rollup li aggiorna il job async
+        # (PostRollupDAO.refresh), prima del primo giro si aggrega posts
+        if self.rollup_state.find_one({"_id": ROLLUP_STATE_ID}, {"_id": 1}) is None:
+            groups = self.collection.aggregate(posts_analytics_pipeline(social_target, since, until))
+        else:
+            groups = self.rollups.aggregate(analytics_pipeline(social_target, since, until))
+        return summarize_rollups(list(groups))
@@ -8,13 +8,19 @@ from .connection import (
     close_mongodb_connection,
     get_database,
     verify_connection,
-    get_database_sync
+    get_database_sync,
+    get_sync_client,
+    close_sync_client
 )
+from .monitoring import get_mongo_metrics
 
 __all__ = [
     "connect_to_mongodb",
     "close_mongodb_connection",
     "get_database",
     "verify_connection",
-    "get_database_sync"
+    "get_database_sync",
+    "get_sync_client",
+    "close_sync_client",
+    "get_mongo_metrics"
 ]
@@ -0,0 +1,234 @@
+"""
+Monitoraggio comandi MongoDB
+
+Listener pymongo registrati sul client:
+- CommandMonitor: istogrammi di latenza per (comando, collection) e log
+  dei comandi oltre MONGO_SLOW_QUERY_MS con la forma del filtro
+- PoolMonitor: tempi di attesa per ottenere una connessione dal pool
+
+I listener sono chiamati dai thread del driver: lo stato e protetto da lock.
+"""
+
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import monitoring
+
+
+SLOW_QUERY_MS = float(os.getenv("MONGO_SLOW_QUERY_MS", "100"))
+
+# Limiti superiori dei bucket in millisecondi (l'ultimo raccoglie il resto)
+HISTOGRAM_BUCKETS_MS = [1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000]
+
+# Comandi di servizio del driver, non interessanti per le performance dei DAO
+_IGNORED_COMMANDS = {
+    "hello", "ismaster", "isMaster", "ping", "buildInfo", "saslStart",
+    "saslContinue", "endSessions", "killCursors",
+}
+
+
+class LatencyHistogram:
+    """Istogramma a bucket fissi con count, somma e massimo."""
+
+    def __init__(self):
+        self.buckets = [0] * (len(HISTOGRAM_BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.failures = 0
+
+    def observe(self, duration_ms: float) -> None:
+        index = len(HISTOGRAM_BUCKETS_MS)
+        for i, bound in enumerate(HISTOGRAM_BUCKETS_MS):
+            if duration_ms <= bound:
+                index = i
+                break
+        self.buckets[index] += 1
+        self.count += 1
+        self.total_ms += duration_ms
+        self.max_ms = max(self.max_ms, duration_ms)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Stima del percentile q (0-1): limite superiore del bucket che lo contiene."""
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.buckets):
+            seen += bucket_count
+            if seen >= target:
+                return float(HISTOGRAM_BUCKETS_MS[i]) if i < len(HISTOGRAM_BUCKETS_MS) else self.max_ms
+        return self.max_ms
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "failures": self.failures,
+            "avg_ms": round(self.total_ms / self.count, 3) if self.count else None,
+            "p50_ms": self.percentile(0.50),
+            "p95_ms": self.percentile(0.95),
+            "p99_ms": self.percentile(0.99),
+            "max_ms": round(self.max_ms, 3),
+            "buckets_ms": dict(zip([*map(str, HISTOGRAM_BUCKETS_MS), "inf"], self.buckets)),
+        }
+
+
+def filter_shape(value: Any) -> Any:
+    """
+    Forma di un filtro: stessi campi e operatori, valori sostituiti da 1
+    (come i "query shape" del profiler MongoDB, senza dati utente nei log)
+    """
+    if isinstance(value, dict):
+        return {key: filter_shape(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [filter_shape(item) for item in value[:3]]
+    return 1
+
+
+def _command_target(command_name: str, command: Dict[str, Any]) -> Tuple[str, Any]:
+    """
+    Collection e filtro di un comando (find, update, delete, aggregate, ...)
+    """
+    collection = command.get(command_name)
+    if command_name == "getMore":
+        collection = command.get("collection")
+    if not isinstance(collection, str):
+        collection = "-"
+
+    query = command.get("filter") or command.get("query")
+    if query is None and command_name in ("update", "delete"):
+        statements = command.get("updates") or command.get("deletes") or []
+        query = statements[0].get("q") if statements else None
+    if query is None and command_name == "aggregate":
+        pipeline = command.get("pipeline") or []
+        if pipeline and "$match" in pipeline[0]:
+            query = pipeline[0]["$match"]
+
+    return collection, filter_shape(query) if query is not None else None
+
+
+class CommandMonitor(monitoring.CommandListener):
+    """Latenze per (comando, collection) e slow-query log."""
+
+    def __init__(self, slow_query_ms: float = SLOW_QUERY_MS):
+        self.slow_query_ms = slow_query_ms
+        self._lock = threading.Lock()
+        self._pending: Dict[Tuple[Any, int], Tuple[str, Any]] = {}
+        self._histograms: Dict[Tuple[str, str], LatencyHistogram] = {}
+
+    def _finish(self, event, failed: bool) -> None:
+        if event.command_name in _IGNORED_COMMANDS:
+            return
+        duration_ms = event.duration_micros / 1000
+        with self._lock:
+            collection, shape = self._pending.pop(
+                (event.connection_id, event.request_id), ("-", None)
+            )
+            key = (event.command_name, collection)
+            histogram = self._histograms.setdefault(key, LatencyHistogram())
+            histogram.observe(duration_ms)
+            if failed:
+                histogram.failures += 1
+
+        if duration_ms >= self.slow_query_ms:
+            print(
+                f"🐢 Query lenta {event.command_name} {event.database_name}.{collection} "
+                f"{duration_ms:.1f} ms filtro={shape}"
+            )
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        if event.command_name in _IGNORED_COMMANDS:
+            return
+        target = _command_target(event.command_name, event.command)
+        with self._lock:
+            self._pending[(event.connection_id, event.request_id)] = target
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        self._finish(event, failed=False)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        self._finish(event, failed=True)
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [
+                {"command": command, "collection": collection, **histogram.snapshot()}
+                for (command, collection), histogram in sorted(self._histograms.items())
+            ]
+
+
+class PoolMonitor(monitoring.ConnectionPoolListener):
+    """Tempo di attesa per il checkout di una connessione dal pool."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkout_wait = LatencyHistogram()
+        self.connections_created = 0
+        self.connections_closed = 0
+
+    def connection_checked_out(self, event: monitoring.ConnectionCheckedOutEvent) -> None:
+        if event.duration is not None:
+            with self._lock:
+                self.checkout_wait.observe(event.duration * 1000)
+
+    def connection_check_out_failed(self, event: monitoring.ConnectionCheckOutFailedEvent) -> None:
+        with self._lock:
+            if event.duration is not None:
+                self.checkout_wait.observe(event.duration * 1000)
+            self.checkout_wait.failures += 1
+
+    def connection_created(self, event: monitoring.ConnectionCreatedEvent) -> None:
+        with self._lock:
+            self.connections_created += 1
+
+    def connection_closed(self, event: monitoring.ConnectionClosedEvent) -> None:
+        with self._lock:
+            self.connections_closed += 1
+
+    # Eventi non usati (i metodi base sollevano NotImplementedError)
+    def pool_created(self, event: monitoring.PoolCreatedEvent) -> None:
+        pass
+
+    def pool_ready(self, event: monitoring.PoolReadyEvent) -> None:
+        pass
+
+    def pool_cleared(self, event: monitoring.PoolClearedEvent) -> None:
+        pass
+
+    def pool_closed(self, event: monitoring.PoolClosedEvent) -> None:
+        pass
+
+    def connection_ready(self, event: monitoring.ConnectionReadyEvent) -> None:
+        pass
+
+    def connection_check_out_started(self, event: monitoring.ConnectionCheckOutStartedEvent) -> None:
+        pass
+
+    def connection_checked_in(self, event: monitoring.ConnectionCheckedInEvent) -> None:
+        pass
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "checkout_wait": self.checkout_wait.snapshot(),
+                "connections_created": self.connections_created,
+                "connections_closed": self.connections_closed,
+            }
+
+
+command_monitor = CommandMonitor()
+pool_monitor = PoolMonitor()
+
+
+def get_mongo_metrics() -> Dict[str, Any]:
+    """
+    Snapshot delle metriche raccolte dall'avvio del processo
+    """
+    return {
+        "timestamp": time.time(),
+        "slow_query_ms": command_monitor.slow_query_ms,
+        "commands": command_monitor.snapshot(),
+        "pool": pool_monitor.snapshot(),
+    }
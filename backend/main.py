@@ -1,8 +1,12 @@
+import asyncio
 import os
+from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+import anyio.to_thread
+from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 
+from backend.app.richieste import close_http_client, open_http_client
 from backend.app.routes import router as api_router
 
 
@@ -11,7 +15,51 @@ def _get_cors_origins() -> list[str]:
     return [origin.strip() for origin in raw_origins.split(",") if origin.strip()]
 
 
-app = FastAPI(title="Social Manager API", version="0.2.0")
+def _configure_threadpool() -> None:
+    # I route sono async: il threadpool serve solo al codice ancora bloccante
+    size = int(os.getenv("API_THREADPOOL_SIZE", "40"))
+    anyio.to_thread.current_default_thread_limiter().total_tokens = size
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    _configure_threadpool()
+    # Un solo client HTTP (keep-alive) per tutte le chiamate Graph API
+    await open_http_client()
+    # Un solo client Motor (pool riscaldato) condiviso da tutti i DAO
+    index_task = None
+    scheduler = scheduler_task = None
+    close_mongodb = None
+    try:
+        # motor/pymongo sono extra (requirements-full.txt): senza, API senza database
+        from backend.dao.indexes import ensure_all_indexes
+        from backend.database import close_mongodb_connection, connect_to_mongodb
+        from backend.services.scheduler import SCHEDULER_ENABLED, PostScheduler
+
+        close_mongodb = close_mongodb_connection
+        await connect_to_mongodb()
+        # Gli indici si creano in background: l'avvio non aspetta le build
+        index_task = asyncio.create_task(ensure_all_indexes())
+        if SCHEDULER_ENABLED:
+            # Pubblicazione dei post programmati nello stesso processo delle API
+            scheduler = PostScheduler()
+            scheduler_task = asyncio.create_task(scheduler.run())
+    except Exception as e:
+        print(f"⚠️ MongoDB non disponibile, API avviata senza database: {e}")
+    try:
+        yield
+    finally:
+        if index_task:
+            index_task.cancel()
+        if scheduler_task:
+            scheduler_task.cancel()
+            await scheduler.stop()
+        if close_mongodb:
+            await close_mongodb()
+        await close_http_client()
+
+
+app = FastAPI(title="Social Manager API", version="0.2.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -23,8 +71,18 @@ app.add_middleware(
 
 
 @app.get("/")
-def health_check() -> dict:
+async def health_check() -> dict:
     return {"status": "ok", "service": "social-manager-api"}
 
 
+@app.get("/metrics/mongo")
+async def mongo_metrics() -> dict:
+    # Latenze per comando/collection e attese sul pool dall'avvio del processo
+    try:
+        from backend.database import get_mongo_metrics
+    except ImportError:
+        raise HTTPException(status_code=503, detail="MongoDB non installato (requirements-full.txt)")
+    return get_mongo_metrics()
+
+
 app.include_router(api_router, prefix="/api", tags=["Social"])
\ No newline at end of file
@@ -0,0 +1,4 @@
+"""
+Services package
+Job in background che collegano Graph API e database
+"""
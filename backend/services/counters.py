@@ -0,0 +1,29 @@
+"""
+Ricalcolo dei contatori dei post (post_counters)
+
+I contatori sono mantenuti con $inc dalle scritture di PostDAO: il ricalcolo
+serve al primo avvio o dopo scritture che non passano dal DAO (update_many,
+delete_many, script). Eseguirlo a sistema fermo (API e scheduler spenti):
+gli $inc concorrenti durante il ricalcolo andrebbero persi.
+
+Esecuzione:
+    python -m backend.services.counters
+"""
+
+import asyncio
+
+from backend.dao.post_dao import PostDAO
+from backend.database import close_mongodb_connection, connect_to_mongodb
+
+
+async def main() -> None:
+    await connect_to_mongodb()
+    try:
+        totals = await PostDAO().rebuild_counters()
+        print(f"🔢 Contatori ricalcolati: {totals}")
+    finally:
+        await close_mongodb_connection()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
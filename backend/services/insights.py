@@ -0,0 +1,112 @@
+"""
+Ingestion insights Instagram in PostMetadata
+
+Legge gli insights (views, likes, comments, shares) dei post pubblicati con
+chiamate Graph concorrenti (fan-out limitato) e li scrive in `posts.metadata`
+con una bulk write per blocco di post: la memoria resta costante anche con
+migliaia di post.
+
+Esecuzione manuale:
+    python -m backend.services.insights
+"""
+
+import asyncio
+import os
+from typing import Dict, Iterable, List, Optional
+
+from backend.app.errors import GraphAPIError
+from backend.app.richieste import RichiesteClient, close_http_client, open_http_client
+from backend.dao.post_dao import PostDAO, PostMetadata
+from backend.database import close_mongodb_connection, connect_to_mongodb
+
+
+INSIGHTS_CONCURRENCY = int(os.getenv("INSIGHTS_CONCURRENCY", "10"))
+INSIGHTS_CHUNK_SIZE = 500
+
+
+def _parse_insights(response: dict) -> PostMetadata:
+    values = {"views": 0, "likes": 0, "comments": 0, "shares": 0}
+    for metric in response.get("data", []):
+        name = metric.get("name")
+        if name not in values:
+            continue
+        if "total_value" in metric:
+            values[name] = int(metric["total_value"].get("value", 0))
+        elif metric.get("values"):
+            values[name] = int(metric["values"][0].get("value", 0))
+    return PostMetadata(**values)
+
+
+async def fetch_insights(
+    media_ids: Iterable[str],
+    concurrency: int = INSIGHTS_CONCURRENCY,
+    user_id: Optional[str] = None,
+) -> Dict[str, PostMetadata]:
+    """
+    Scarica gli insights di piu media in parallelo
+
+    Returns:
+        Dict: media_id -> metriche (i media in errore vengono saltati)
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _fetch(media_id: str):
+        async with semaphore:
+            try:
+                response = await RichiesteClient.get_media_insights(media_id, user_id)
+            except GraphAPIError as e:
+                print(f"⚠️ Insights non disponibili per {media_id}: {e}")
+                return media_id, None
+        return media_id, _parse_insights(response) if response else None
+
+    results = await asyncio.gather(*(_fetch(media_id) for media_id in media_ids))
+    return {media_id: metrics for media_id, metrics in results if metrics is not None}
+
+
+async def ingest_insights(
+    dao: Optional[PostDAO] = None,
+    concurrency: int = INSIGHTS_CONCURRENCY,
+    chunk_size: int = INSIGHTS_CHUNK_SIZE,
+) -> int:
+    """
+    Aggiorna le metriche di tutti i post pubblicati
+
+    Returns:
+        int: Numero post aggiornati
+    """
+    dao = dao or PostDAO()
+    total = fetched = updated = 0
+
+    async def _flush(chunk: List[str]) -> None:
+        nonlocal fetched, updated
+        metrics = await fetch_insights(chunk, concurrency=concurrency)
+        fetched += len(metrics)
+        updated += await dao.bulk_update_metadata(metrics)
+
+    chunk: List[str] = []
+    # Pagine grandi quanto un blocco: nessun cursore resta aperto durante _flush
+    async for media_id in dao.iter_published_media_ids(page_size=chunk_size):
+        chunk.append(media_id)
+        total += 1
+        if len(chunk) >= chunk_size:
+            await _flush(chunk)
+            chunk = []
+    if chunk:
+        await _flush(chunk)
+
+    print(f"📊 Insights: {fetched}/{total} letti, {updated} post aggiornati")
+    return updated
+
+
+async def main():
+    await connect_to_mongodb()
+    await open_http_client()
+    try:
+        await ingest_insights()
+    finally:
+        await close_http_client()
+        await close_mongodb_connection()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,133 @@
+"""
+Registro worker, leader election e sharding per i processi scheduler
+
+Ogni processo scheduler:
+- tiene viva la propria lease `worker:<gruppo>:<owner>` con un heartbeat
+  ogni WORKER_HEARTBEAT_INTERVAL secondi (scade dopo WORKER_TTL)
+- ricava il proprio shard (indice, numero) dalla lista ordinata dei worker
+  vivi: i post vengono divisi tra i worker con shard % numero == indice
+- prova a prendere la lease `leader:<gruppo>`: il leader esegue i lavori
+  di manutenzione (housekeeping) che devono girare su un solo nodo, in un
+  task separato, cosi un lavoro lungo non ferma gli heartbeat (le lease
+  scadrebbero e shard e leadership passerebbero ad altri a meta lavoro)
+
+Se un worker muore la sua lease scade, gli altri ricalcolano gli shard al
+giro successivo e i suoi post passano a loro. Durante il ricalcolo due
+worker possono vedere lo stesso shard: nessun doppio invio, perche la presa
+in carico dei post resta atomica (PostDAO.claim_due_post).
+"""
+
+import asyncio
+import os
+from typing import Awaitable, Callable, Optional, Tuple
+
+from backend.dao.lease_dao import LeaseDAO
+
+
+WORKER_TTL = float(os.getenv("SCHEDULER_WORKER_TTL", "30"))
+WORKER_HEARTBEAT_INTERVAL = float(os.getenv("SCHEDULER_HEARTBEAT_INTERVAL", "10"))
+HOUSEKEEPING_INTERVAL = float(os.getenv("SCHEDULER_HOUSEKEEPING_INTERVAL", "300"))
+
+
+class WorkerRegistry:
+    """
+    Appartenenza di un processo a un gruppo di worker.
+
+    Args:
+        owner: identificativo univoco del processo
+        group: nome del gruppo (es. "scheduler")
+        housekeeping: coroutine eseguita dal solo leader ogni `housekeeping_interval`
+        dao: LeaseDAO (default: nuovo LeaseDAO)
+    """
+
+    def __init__(
+        self,
+        owner: str,
+        group: str = "scheduler",
+        housekeeping: Optional[Callable[[], Awaitable[object]]] = None,
+        dao: Optional[LeaseDAO] = None,
+        ttl: float = WORKER_TTL,
+        heartbeat_interval: float = WORKER_HEARTBEAT_INTERVAL,
+        housekeeping_interval: float = HOUSEKEEPING_INTERVAL,
+    ):
+        self.owner = owner
+        self.dao = dao or LeaseDAO()
+        self.ttl = ttl
+        self.heartbeat_interval = heartbeat_interval
+        self.housekeeping = housekeeping
+        self.housekeeping_interval = housekeeping_interval
+        self.worker_prefix = f"worker:{group}:"
+        self.leader_lease = f"leader:{group}"
+        # Finche non si conoscono gli altri worker si serve tutto
+        self.shard: Tuple[int, int] = (0, 1)
+        self.is_leader = False
+        self._task: Optional[asyncio.Task] = None
+        self._housekeeping_task: Optional[asyncio.Task] = None
+        self._last_housekeeping: Optional[float] = None
+
+    async def heartbeat(self) -> None:
+        """
+        Rinnova la lease del worker, ricalcola lo shard e la leadership
+        """
+        await self.dao.acquire(self.worker_prefix + self.owner, self.owner, self.ttl)
+
+        workers = [lease["owner"] for lease in await self.dao.live(self.worker_prefix)]
+        if self.owner in workers:
+            shard = (workers.index(self.owner), len(workers))
+            if shard != self.shard:
+                print(f"🔀 Shard {shard[0] + 1}/{shard[1]} ({self.owner})")
+            self.shard = shard
+
+        was_leader = self.is_leader
+        self.is_leader = await self.dao.acquire(self.leader_lease, self.owner, self.ttl)
+        if self.is_leader and not was_leader:
+            print(f"👑 Leader: {self.owner}")
+
+        if self.is_leader and self.housekeeping is not None:
+            loop = asyncio.get_running_loop()
+            running = self._housekeeping_task is not None and not self._housekeeping_task.done()
+            if not running and (
+                self._last_housekeeping is None
+                or loop.time() - self._last_housekeeping >= self.housekeeping_interval
+            ):
+                self._last_housekeeping = loop.time()
+                self._housekeeping_task = asyncio.create_task(self._run_housekeeping())
+
+    async def _run_housekeeping(self) -> None:
+        try:
+            await self.housekeeping()
+        except Exception as e:
+            print(f"❌ Housekeeping {self.owner} fallito: {e}")
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                await self.heartbeat()
+            except Exception as e:
+                # Lo shard precedente resta valido; se la lease scade gli altri
+                # worker si prendono anche i nostri post
+                print(f"⚠️ Heartbeat {self.owner} fallito: {e}")
+
+    async def start(self) -> None:
+        await self.heartbeat()
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        """
+        Ferma l'heartbeat e rilascia subito le lease (gli altri worker
+        ricalcolano gli shard senza aspettare la scadenza)
+        """
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        if self._housekeeping_task:
+            self._housekeeping_task.cancel()
+            self._housekeeping_task = None
+        try:
+            await self.dao.release(self.worker_prefix + self.owner, self.owner)
+            if self.is_leader:
+                await self.dao.release(self.leader_lease, self.owner)
+        except Exception as e:
+            print(f"⚠️ Rilascio lease {self.owner} fallito: {e}")
+        self.is_leader = False
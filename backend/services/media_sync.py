@@ -0,0 +1,106 @@
+"""
+Sync incrementale dei media Instagram nel mirror Mongo
+
+Scarica da Graph solo i media piu recenti del cursore (ultimo giro
+completato) e li salva con bulk upsert a blocchi, senza tenere in memoria
+l'intero account.
+
+Graph restituisce i media dal piu recente: il cursore avanza solo a giro
+finito. Se un giro si interrompe (errore Graph, circuit breaker, crash) il
+successivo riprende dal media piu vecchio gia salvato fino al cursore,
+poi riparte dall'inizio.
+
+Esecuzione manuale:
+    python -m backend.services.media_sync <user_id>
+"""
+
+import asyncio
+import os
+import sys
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from backend.app.richieste import RichiesteClient, close_http_client, open_http_client, parse_graph_timestamp
+from backend.dao.media_dao import MediaDAO
+from backend.database import close_mongodb_connection, connect_to_mongodb
+
+
+SYNC_CHUNK_SIZE = 500
+
+
+async def _save_chunk(dao: MediaDAO, user_id: str, chunk: List[Dict[str, Any]]) -> int:
+    if not chunk:
+        return 0
+    changed = await dao.upsert_media(user_id, chunk)
+    timestamps = [media["timestamp"] for media in chunk if "timestamp" in media]
+    if timestamps:
+        await dao.record_sync_progress(user_id, max(timestamps), min(timestamps))
+    return changed
+
+
+async def _mirror(
+    user_id: str,
+    dao: MediaDAO,
+    chunk_size: int,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> int:
+    changed = 0
+    chunk: List[Dict[str, Any]] = []
+    # since/until inclusi: i media ai limiti vengono riletti, l'upsert e idempotente
+    async for media in RichiesteClient.iter_all_posts(user_id, since=since, until=until):
+        if "timestamp" in media:
+            media["timestamp"] = parse_graph_timestamp(media["timestamp"])
+        chunk.append(media)
+        if len(chunk) >= chunk_size:
+            changed += await _save_chunk(dao, user_id, chunk)
+            chunk = []
+    return changed + await _save_chunk(dao, user_id, chunk)
+
+
+async def sync_media(
+    user_id: str,
+    dao: Optional[MediaDAO] = None,
+    chunk_size: int = SYNC_CHUNK_SIZE,
+) -> int:
+    """
+    Allinea il mirror con Graph per un account
+
+    Returns:
+        int: Numero media nuovi o modificati
+    """
+    dao = dao or MediaDAO()
+    state = await dao.get_sync_state(user_id)
+    since = state.get("cursor")
+
+    changed = 0
+    if state.get("pending_oldest"):
+        # Giro interrotto: i media tra il cursore e il piu vecchio salvato mancano
+        print(f"↩️ Sync media {user_id}: riprendo da {state['pending_oldest']}")
+        changed += await _mirror(user_id, dao, chunk_size, since=since, until=state["pending_oldest"])
+        await dao.complete_sync(user_id)
+        since = (await dao.get_sync_state(user_id)).get("cursor")
+
+    changed += await _mirror(user_id, dao, chunk_size, since=since)
+    await dao.complete_sync(user_id)
+    print(f"🔄 Sync media {user_id}: {changed} nuovi/aggiornati (da {since or 'inizio'})")
+    return changed
+
+
+async def main():
+    user_id = sys.argv[1] if len(sys.argv) > 1 else os.getenv("INSTAGRAM_USER_ID", "")
+    if not user_id:
+        print("Uso: python -m backend.services.media_sync <user_id>")
+        return
+
+    await connect_to_mongodb()
+    await open_http_client()
+    try:
+        await sync_media(user_id)
+    finally:
+        await close_http_client()
+        await close_mongodb_connection()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,50 @@
+"""
+Job dei rollup analytics dei post (PostRollupDAO)
+
+Un giro incrementale ricalcola solo le partizioni (giorno, social) dei post
+cambiati dall'ultimo giro; --full ricalcola tutto (dopo script o
+delete_many sulla collection posts). Il leader dello scheduler esegue gia
+un giro incrementale ad ogni housekeeping: questo comando serve senza
+scheduler o da cron.
+
+Esecuzione:
+    python -m backend.services.rollups                 # un giro incrementale
+    python -m backend.services.rollups --full          # ricalcolo completo
+    python -m backend.services.rollups --loop 60       # un giro ogni 60s
+"""
+
+import argparse
+import asyncio
+
+from backend.dao.rollup_dao import PostRollupDAO
+from backend.database import close_mongodb_connection, connect_to_mongodb
+
+
+async def refresh_rollups(full: bool = False) -> None:
+    result = await PostRollupDAO().refresh(full=full)
+    if result is None:
+        print("⏭ Rollup gia in aggiornamento su un altro processo")
+    else:
+        print(f"📊 Rollup aggiornati: {result}")
+
+
+async def main(full: bool = False, loop: float = 0) -> None:
+    await connect_to_mongodb()
+    try:
+        await refresh_rollups(full)
+        while loop > 0:
+            await asyncio.sleep(loop)
+            try:
+                await refresh_rollups()
+            except Exception as e:
+                print(f"❌ Errore rollup: {e}")
+    finally:
+        await close_mongodb_connection()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Aggiorna i rollup analytics dei post")
+    parser.add_argument("--full", action="store_true", help="ricalcola tutti i rollup")
+    parser.add_argument("--loop", type=float, default=0, help="ripeti ogni N secondi")
+    args = parser.parse_args()
+    asyncio.run(main(args.full, args.loop))
@@ -0,0 +1,345 @@
+"""
+Scheduler dei post programmati
+
+Pubblica su Instagram i post SCHEDULED quando arriva la loro
+`data_programmazione`:
+
+1. claim atomico (find_one_and_update SCHEDULED -> PUBLISHING con lease):
+   piu processi scheduler possono girare insieme senza pubblicare due
+   volte lo stesso post
+2. pool di worker asyncio limitato (SCHEDULER_CONCURRENCY) che esegue
+   create -> wait -> publish via Graph API
+3. esito: PUBLISHED con media_id, oppure nuovo tentativo con backoff
+   (torna SCHEDULED) fino a SCHEDULER_MAX_ATTEMPTS, poi FAILED
+
+Tra un giro e l'altro lo scheduler dorme fino al prossimo post dovuto
+(al massimo SCHEDULER_MAX_SLEEP, per vedere i post creati da altri processi).
+
+Nessuna doppia pubblicazione:
+- la lease viene rinnovata ogni lease/3 finche la pubblicazione e in corso
+  (le code del rate limiter possono durare piu di una lease); se un worker
+  muore il post torna disponibile alla scadenza
+- subito prima di media_publish la lease viene ricontrollata in modo atomico
+- il creation_id del container e salvato sul post: un nuovo tentativo (es.
+  dopo un timeout sulla risposta di media_publish) controlla il container e,
+  se e gia PUBLISHED, chiude il post senza pubblicarlo di nuovo
+
+Con piu repliche (SCHEDULER_SHARDING) ogni processo si registra in
+WorkerRegistry e serve solo il proprio shard dei post; il leader assegna
+lo shard ai post programmati che ne sono privi e aggiorna i rollup analytics.
+
+Esecuzione:
+    python -m backend.services.scheduler
+"""
+
+import asyncio
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Set
+
+from backend.app.errors import GraphAPIError, GraphRateLimitError, GraphRequestError
+from backend.app.pubblicazione import (
+    PublishError,
+    container_status,
+    create_container,
+    publish_container,
+    wait_until_ready,
+)
+from backend.app.richieste import close_http_client, open_http_client
+from backend.dao.post_dao import PostDAO
+from backend.dao.rollup_dao import PostRollupDAO
+from backend.database import close_mongodb_connection, connect_to_mongodb
+from backend.services.leases import WorkerRegistry
+
+
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "false").lower() in ("1", "true", "yes")
+SCHEDULER_CONCURRENCY = int(os.getenv("SCHEDULER_CONCURRENCY", "10"))
+SCHEDULER_LEASE_SECONDS = float(os.getenv("SCHEDULER_LEASE_SECONDS", "300"))
+SCHEDULER_MAX_ATTEMPTS = int(os.getenv("SCHEDULER_MAX_ATTEMPTS", "3"))
+SCHEDULER_RETRY_DELAY = float(os.getenv("SCHEDULER_RETRY_DELAY", "60"))
+SCHEDULER_MAX_SLEEP = float(os.getenv("SCHEDULER_MAX_SLEEP", "30"))
+SCHEDULER_SHARDING = os.getenv("SCHEDULER_SHARDING", "true").lower() in ("1", "true", "yes")
+# Attesa massima delle pubblicazioni in corso allo spegnimento
+SCHEDULER_STOP_TIMEOUT = float(os.getenv("SCHEDULER_STOP_TIMEOUT", "20"))
+
+
+def _default_owner() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def _is_permanent(error: PublishError) -> bool:
+    # Un 4xx di Graph (immagine non valida, permessi, ...) non migliora riprovando
+    cause = error.__cause__
+    return isinstance(cause, GraphRequestError) and not isinstance(cause, GraphRateLimitError)
+
+
+class PostScheduler:
+    """
+    Pubblica i post dovuti con un pool di worker limitato.
+
+    Args:
+        dao: PostDAO (default: nuovo PostDAO)
+        concurrency: pubblicazioni contemporanee
+        lease_seconds: durata della presa in carico di un post
+        max_attempts: tentativi prima di FAILED
+        retry_delay: attesa prima del secondo tentativo (poi raddoppia)
+        owner: identificativo del processo (default host:pid:random)
+        sharding: registra il processo tra i worker e serve solo il suo shard
+    """
+
+    def __init__(
+        self,
+        dao: Optional[PostDAO] = None,
+        concurrency: int = SCHEDULER_CONCURRENCY,
+        lease_seconds: float = SCHEDULER_LEASE_SECONDS,
+        max_attempts: int = SCHEDULER_MAX_ATTEMPTS,
+        retry_delay: float = SCHEDULER_RETRY_DELAY,
+        owner: Optional[str] = None,
+        sharding: bool = SCHEDULER_SHARDING,
+    ):
+        self.dao = dao or PostDAO()
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.owner = owner or _default_owner()
+        self._slots = asyncio.Semaphore(concurrency)
+        self._tasks: Set[asyncio.Task] = set()
+        self._wake = asyncio.Event()
+        self._stopping = False
+        self.registry: Optional[WorkerRegistry] = None
+        if sharding:
+            self.registry = WorkerRegistry(self.owner, housekeeping=self._housekeeping)
+
+    def wake(self) -> None:
+        """Anticipa il prossimo giro (es. dopo aver programmato un post)."""
+        self._wake.set()
+
+    async def _housekeeping(self) -> None:
+        # Lavori da un solo nodo (il leader)
+        await self.dao.backfill_shards()
+        await PostRollupDAO().refresh()
+
+    async def run_once(self) -> int:
+        """
+        Prende in carico i post dovuti finche ce ne sono, un worker per post
+
+        Se tutti i worker sono occupati attende che se ne liberi uno: non si
+        prendono lease che non si possono servire subito.
+
+        Returns:
+            int: Post presi in carico
+        """
+        dispatched = 0
+        while not self._stopping:
+            await self._slots.acquire()
+            try:
+                post = await self.dao.claim_due_post(
+                    self.owner,
+                    self.lease_seconds,
+                    shard=self.registry.shard if self.registry else None,
+                )
+            except Exception:
+                self._slots.release()
+                raise
+            if post is None:
+                self._slots.release()
+                break
+
+            task = asyncio.create_task(self._process(post))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+            dispatched += 1
+        return dispatched
+
+    async def _keep_lease(self, post_id: str) -> None:
+        # Termina quando la lease non e piu nostra
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                if not await self.dao.renew_lease(post_id, self.owner, self.lease_seconds):
+                    return
+            except Exception as e:
+                # Si riprova al giro dopo; prima di pubblicare la lease viene ricontrollata
+                print(f"⚠️ Rinnovo lease del post {post_id} fallito: {e}")
+
+    @staticmethod
+    async def _stop_renewal(lease: asyncio.Task) -> None:
+        # Prima di rilasciare la lease: un rinnovo dopo il cambio di status
+        # fallirebbe e _process annullerebbe la scrittura finale a meta
+        lease.cancel()
+        await asyncio.wait({lease})
+
+    async def _process(self, post: Dict[str, Any]) -> None:
+        post_id = post["_id"]
+        lease = asyncio.create_task(self._keep_lease(post_id))
+        publish = asyncio.create_task(self._publish(post, lease))
+        try:
+            await asyncio.wait({lease, publish}, return_when=asyncio.FIRST_COMPLETED)
+            if not publish.done() and lease.cancelled():
+                # Rinnovo fermato da _publish: sta scrivendo l'esito
+                await asyncio.wait({publish})
+            if publish.done():
+                publish.result()
+            else:
+                # Lease persa (es. processo bloccato oltre la scadenza): il post e di un altro
+                print(f"⚠️ Lease del post {post_id} persa: pubblicazione annullata")
+        except Exception as e:
+            # La lease scade e il post verra ripreso da un altro giro
+            print(f"❌ Errore scheduler sul post {post_id}: {e}")
+        finally:
+            lease.cancel()
+            publish.cancel()
+            self._slots.release()
+
+    async def _publish(self, post: Dict[str, Any], lease: asyncio.Task) -> None:
+        post_id = post["_id"]
+        if not post.get("url_risorsa") or not post.get("user_id"):
+            await self._stop_renewal(lease)
+            await self.dao.fail_publication(post_id, self.owner, "url_risorsa o user_id mancante")
+            return
+
+        try:
+            creation_id = await self._ready_container(post, lease)
+            if creation_id is None:
+                return
+            # Controllo atomico subito prima dell'unico passo non idempotente
+            if not await self.dao.renew_lease(post_id, self.owner, self.lease_seconds):
+                print(f"⚠️ Lease del post {post_id} persa: non pubblico")
+                return
+            media_id = await publish_container(post["user_id"], creation_id)
+        except PublishError as e:
+            await self._stop_renewal(lease)
+            await self._handle_failure(post, e)
+            return
+
+        await self._stop_renewal(lease)
+        await self.dao.complete_publication(post_id, self.owner, media_id)
+        print(f"✅ Post {post_id} pubblicato ({media_id})")
+
+    async def _ready_container(self, post: Dict[str, Any], lease: asyncio.Task) -> Optional[str]:
+        """
+        Container pronto da pubblicare, None se non c'e altro da fare
+
+        Il container di un tentativo precedente viene riusato; se e gia
+        PUBLISHED (risposta di media_publish persa) il post viene chiuso come
+        pubblicato invece di pubblicarlo una seconda volta.
+        """
+        post_id = post["_id"]
+        creation_id = post.get("creation_id")
+        status = None
+        if creation_id:
+            try:
+                status = await container_status(creation_id)
+            except PublishError as e:
+                # 4xx: container non piu leggibile (scaduto), se ne crea uno nuovo;
+                # Graph non raggiungibile: stato sconosciuto, si riprova piu tardi
+                if not _is_permanent(e):
+                    raise
+
+        if status == "PUBLISHED":
+            await self._stop_renewal(lease)
+            await self.dao.complete_publication(post_id, self.owner)
+            print(f"✅ Post {post_id} gia pubblicato dal tentativo precedente")
+            return None
+
+        if status not in ("FINISHED", "IN_PROGRESS"):
+            creation_id = await create_container(
+                post["url_risorsa"], post.get("testo", ""), post["user_id"]
+            )
+            if not await self.dao.record_container(post_id, self.owner, creation_id):
+                print(f"⚠️ Lease del post {post_id} persa: container {creation_id} non usato")
+                return None
+
+        if status != "FINISHED":
+            try:
+                await wait_until_ready(creation_id)
+            except GraphAPIError as e:
+                raise PublishError(str(e)) from e
+        return creation_id
+
+    async def _handle_failure(self, post: Dict[str, Any], error: PublishError) -> None:
+        attempts = post.get("attempts", 1)
+        if _is_permanent(error) or attempts >= self.max_attempts:
+            await self.dao.fail_publication(post["_id"], self.owner, str(error))
+            print(f"❌ Post {post['_id']} fallito dopo {attempts} tentativi: {error}")
+            return
+
+        delay = self.retry_delay * 2 ** (attempts - 1)
+        retry_at = datetime.utcnow() + timedelta(seconds=delay)
+        await self.dao.fail_publication(post["_id"], self.owner, str(error), retry_at=retry_at)
+        print(f"⚠️ Post {post['_id']}: tentativo {attempts} fallito, riprovo tra {delay:.0f}s")
+
+    async def _sleep_until_next(self) -> None:
+        timeout = SCHEDULER_MAX_SLEEP
+        next_due = await self.dao.next_due_time(
+            shard=self.registry.shard if self.registry else None
+        )
+        if next_due is not None:
+            # Minimo 0.5s: un post dovuto ma non prendibile (es. senza shard)
+            # non deve far girare il ciclo a vuoto
+            timeout = min(timeout, max(0.5, (next_due - datetime.utcnow()).total_seconds()))
+
+        self._wake.clear()
+        try:
+            await asyncio.wait_for(self._wake.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def run(self) -> None:
+        """
+        Ciclo principale: pubblica i post dovuti, poi dorme fino al prossimo
+        """
+        print(f"⏰ Scheduler avviato ({self.owner})")
+        if self.registry:
+            try:
+                await self.registry.start()
+            except Exception as e:
+                # Senza registro si serve tutto: i claim restano atomici
+                print(f"⚠️ Registro worker non disponibile: {e}")
+        while not self._stopping:
+            try:
+                await self.run_once()
+                await self._sleep_until_next()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"❌ Errore scheduler: {e}")
+                await asyncio.sleep(SCHEDULER_MAX_SLEEP)
+
+    async def stop(self, timeout: float = SCHEDULER_STOP_TIMEOUT) -> None:
+        """
+        Smette di prendere post e attende le pubblicazioni in corso
+
+        Dopo `timeout` secondi (es. worker in coda sul rate limiter di
+        pubblicazione) i worker vengono annullati: le loro lease scadono e i
+        post vengono ripresi, senza doppia pubblicazione grazie al creation_id.
+        """
+        self._stopping = True
+        self._wake.set()
+        if self._tasks:
+            _, pending = await asyncio.wait(set(self._tasks), timeout=timeout)
+            if pending:
+                print(f"⚠️ {len(pending)} pubblicazioni annullate allo spegnimento")
+                for task in pending:
+                    task.cancel()
+                await asyncio.wait(pending)
+        if self.registry:
+            await self.registry.stop()
+
+
+async def main():
+    await connect_to_mongodb()
+    await open_http_client()
+    scheduler = PostScheduler()
+    try:
+        await scheduler.run()
+    finally:
+        await scheduler.stop()
+        await close_http_client()
+        await close_mongodb_connection()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,201 @@
+"""
+Collection Motor (e pymongo, SyncFakeCollection) finte in memoria per i test dei DAO
+
+Supporta solo i filtri usati dai DAO nei test: uguaglianza (anche su
+campi annidati), $and, $or, $gt, $gte, $lt, $lte, $in, $ne, $exists;
+gli update solo con $set, $inc, $setOnInsert e $unset (upsert solo in
+bulk_write). Ogni operazione e atomica: nessun await tra lettura e scrittura.
+"""
+
+import copy
+from types import SimpleNamespace
+
+from bson import ObjectId
+
+
+def _get_path(document, field):
+    value = document
+    for part in field.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return None
+        value = value[part]
+    return value
+
+
+def _has_path(document, field):
+    value = document
+    for part in field.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return False
+        value = value[part]
+    return True
+
+
+def _set_path(document, field, value):
+    parts = field.split(".")
+    for part in parts[:-1]:
+        document = document.setdefault(part, {})
+    document[parts[-1]] = value
+
+
+def apply_update(document, update, inserted=False):
+    for operator, fields in update.items():
+        for field, value in fields.items():
+            if operator == "$set" or (operator == "$setOnInsert" and inserted):
+                _set_path(document, field, value)
+            elif operator == "$inc":
+                _set_path(document, field, (_get_path(document, field) or 0) + value)
+            elif operator == "$unset":
+                document.pop(field, None)
+            elif operator != "$setOnInsert":
+                raise NotImplementedError(operator)
+
+
+def _match_condition(document, field, condition):
+    value = _get_path(document, field)
+    if not (isinstance(condition, dict) and any(key.startswith("$") for key in condition)):
+        return value == condition
+    for operator, operand in condition.items():
+        if operator == "$exists":
+            ok = _has_path(document, field) == bool(operand)
+        elif operator == "$in":
+            ok = value in operand
+        elif operator == "$ne":
+            ok = value != operand
+        elif value is None:
+            ok = False
+        elif operator == "$gt":
+            ok = value > operand
+        elif operator == "$gte":
+            ok = value >= operand
+        elif operator == "$lt":
+            ok = value < operand
+        elif operator == "$lte":
+            ok = value <= operand
+        else:
+            raise NotImplementedError(operator)
+        if not ok:
+            return False
+    return True
+
+
+def matches(query, document):
+    for key, condition in (query or {}).items():
+        if key == "$and":
+            if not all(matches(clause, document) for clause in condition):
+                return False
+        elif key == "$or":
+            if not any(matches(clause, document) for clause in condition):
+                return False
+        elif not _match_condition(document, key, condition):
+            return False
+    return True
+
+
+def _sorted(documents, sort):
+    documents = list(documents)
+    for field, direction in reversed(sort or []):
+        documents.sort(key=lambda doc: _get_path(doc, field), reverse=direction == -1)
+    return documents
+
+
+class FakeCursor:
+    def __init__(self, documents):
+        self._documents = documents
+        self._skip = 0
+        self._limit = 0
+
+    def sort(self, sort):
+        self._documents = _sorted(self._documents, sort)
+        return self
+
+    def skip(self, skip):
+        self._skip = skip
+        return self
+
+    def limit(self, limit):
+        self._limit = limit
+        return self
+
+    def _window(self):
+        documents = self._documents[self._skip:]
+        return copy.deepcopy(documents[:self._limit] if self._limit else documents)
+
+    async def to_list(self, length=None):
+        return self._window()
+
+    def __iter__(self):
+        return iter(self._window())
+
+
+class FakeCollection:
+    def __init__(self, documents=(), name="posts"):
+        self.name = name
+        self.documents = [copy.deepcopy(doc) for doc in documents]
+        self.queries = []
+
+    def with_options(self, **kwargs):
+        return self
+
+    def find(self, query=None, projection=None):
+        self.queries.append(query)
+        return FakeCursor([doc for doc in self.documents if matches(query, doc)])
+
+    async def find_one(self, query=None, projection=None):
+        found = [doc for doc in self.documents if matches(query, doc)]
+        return copy.deepcopy(found[0]) if found else None
+
+    async def update_one(self, query, update):
+        found = [doc for doc in self.documents if matches(query, doc)][:1]
+        for doc in found:
+            apply_update(doc, update)
+        return SimpleNamespace(matched_count=len(found), modified_count=len(found))
+
+    async def find_one_and_update(self, query, update, projection=None, upsert=False,
+                                  return_document=True, sort=None):
+        # return_document: ReturnDocument.AFTER (True) o BEFORE (False)
+        found = _sorted([doc for doc in self.documents if matches(query, doc)], sort)
+        if not found:
+            return None
+        before = copy.deepcopy(found[0])
+        apply_update(found[0], update)
+        return copy.deepcopy(found[0]) if return_document else before
+
+    async def bulk_write(self, operations, ordered=True):
+        # Solo UpdateOne (es. contatori con $inc e upsert)
+        for operation in operations:
+            found = [doc for doc in self.documents if matches(operation._filter, doc)][:1]
+            if not found and operation._upsert:
+                found = [dict(operation._filter)]
+                self.documents.append(found[0])
+                apply_update(found[0], operation._doc, inserted=True)
+                continue
+            for doc in found:
+                apply_update(doc, operation._doc)
+        return SimpleNamespace(acknowledged=True)
+
+
+class SyncFakeCollection(FakeCollection):
+    """Come FakeCollection, con i metodi sincroni di pymongo"""
+
+    def find_one(self, query=None, projection=None):
+        self.queries.append(query)
+        found = [doc for doc in self.documents if matches(query, doc)]
+        return copy.deepcopy(found[0]) if found else None
+
+    def insert_one(self, document):
+        document.setdefault("_id", ObjectId())
+        self.documents.append(copy.deepcopy(document))
+        return SimpleNamespace(inserted_id=document["_id"])
+
+    def update_one(self, query, update):
+        found = [doc for doc in self.documents if matches(query, doc)][:1]
+        for doc in found:
+            apply_update(doc, update)
+        return SimpleNamespace(matched_count=len(found), modified_count=len(found))
+
+    def delete_one(self, query):
+        found = [doc for doc in self.documents if matches(query, doc)][:1]
+        for doc in found:
+            self.documents.remove(doc)
+        return SimpleNamespace(deleted_count=len(found))
@@ -0,0 +1,81 @@
+"""
+Test CircuitBreaker (backend/app/circuit_breaker.py)
+"""
+
+import pytest
+
+from backend.app import circuit_breaker
+from backend.app.circuit_breaker import CircuitBreaker
+from backend.app.errors import GraphCircuitOpenError
+
+
+@pytest.fixture
+def now(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", lambda: now[0])
+    return now
+
+
+def _open(breaker):
+    for _ in range(breaker.failure_threshold):
+        breaker.before_call()
+        breaker.record_failure()
+
+
+def test_opens_after_consecutive_failures(now):
+    breaker = CircuitBreaker("media", failure_threshold=3, reset_timeout=30)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()  # un successo azzera il conteggio
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_open_circuit_fails_fast_with_retry_after(now):
+    breaker = CircuitBreaker("media", failure_threshold=2, reset_timeout=30)
+    _open(breaker)
+    now[0] += 10
+    with pytest.raises(GraphCircuitOpenError) as exc:
+        breaker.before_call()
+    assert exc.value.retry_after == pytest.approx(20)
+
+
+def test_half_open_lets_a_single_probe_through(now):
+    breaker = CircuitBreaker("media", failure_threshold=2, reset_timeout=30)
+    _open(breaker)
+    now[0] += 30
+    breaker.before_call()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    with pytest.raises(GraphCircuitOpenError):
+        breaker.before_call()
+
+    # Prova senza esito (es. cancellata): dopo reset_timeout ne passa un'altra
+    now[0] += 30
+    breaker.before_call()
+
+
+def test_successful_probe_closes_the_circuit(now):
+    breaker = CircuitBreaker("media", failure_threshold=2, reset_timeout=30)
+    _open(breaker)
+    now[0] += 30
+    breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.failures == 0
+    breaker.before_call()
+
+
+def test_failed_probe_reopens_the_circuit(now):
+    breaker = CircuitBreaker("media", failure_threshold=5, reset_timeout=30)
+    _open(breaker)
+    now[0] += 30
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(GraphCircuitOpenError) as exc:
+        breaker.before_call()
+    assert exc.value.retry_after == pytest.approx(30)
@@ -0,0 +1,90 @@
+"""
+Test paginazione keyset di BaseDAO (backend/dao/base_dao.py)
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+from backend.dao.base_dao import BaseDAO, decode_page_token, encode_page_token, keyset_sort
+from tests.unit.fakes import FakeCollection
+
+
+def _posts(count, group):
+    # Gruppi di `group` post con lo stesso created_at
+    start = datetime(2026, 3, 1, 9, 30)
+    return [
+        {"_id": ObjectId(), "status": "draft" if i % 3 else "published",
+         "created_at": start + timedelta(minutes=i // group)}
+        for i in range(count)
+    ]
+
+
+def _all_pages(dao, limit, **kwargs):
+    async def run():
+        pages, token = [], None
+        # Limite: un token che non avanza non deve bloccare il test
+        for _ in range(100):
+            page, token = await dao.find_page(limit=limit, page_token=token, **kwargs)
+            pages.append(page)
+            if token is None:
+                return pages
+        raise AssertionError("la paginazione non termina")
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("direction", [1, -1])
+def test_find_page_round_trips_across_equal_created_at(direction):
+    docs = _posts(30, group=7)
+    dao = BaseDAO(FakeCollection(docs))
+
+    pages = _all_pages(dao, limit=4, sort=[("created_at", direction)])
+
+    assert [len(page) for page in pages] == [4] * 7 + [2]
+    seen = [doc["_id"] for page in pages for doc in page]
+    expected = sorted(docs, key=lambda doc: (doc["created_at"], doc["_id"]), reverse=direction == -1)
+    assert seen == [str(doc["_id"]) for doc in expected]
+
+
+def test_find_page_keeps_the_filter_on_later_pages():
+    docs = _posts(20, group=5)
+    dao = BaseDAO(FakeCollection(docs))
+
+    pages = _all_pages(dao, limit=3, filter_query={"status": "draft"}, sort=[("created_at", -1)])
+
+    seen = [doc["_id"] for page in pages for doc in page]
+    drafts = [str(doc["_id"]) for doc in docs if doc["status"] == "draft"]
+    assert sorted(seen) == sorted(drafts)
+    assert len(seen) == len(set(seen))
+
+
+def test_last_page_has_no_token():
+    dao = BaseDAO(FakeCollection(_posts(4, group=2)))
+    page, token = asyncio.run(dao.find_page(limit=4, sort=[("created_at", 1)]))
+    assert len(page) == 4
+    assert token is None
+
+
+def test_invalid_page_token_is_rejected():
+    dao = BaseDAO(FakeCollection(_posts(4, group=2)))
+    with pytest.raises(ValueError):
+        asyncio.run(dao.find_page(page_token="non-un-token"))
+    token = encode_page_token({"_id": ObjectId()}, keyset_sort(None))
+    with pytest.raises(ValueError):
+        asyncio.run(dao.find_page(sort=[("created_at", 1)], page_token=token))
+
+
+def test_keyset_sort_adds_id_with_last_direction():
+    assert keyset_sort(None) == [("_id", 1)]
+    assert keyset_sort([("created_at", -1)]) == [("created_at", -1), ("_id", -1)]
+    assert keyset_sort([("_id", -1), ("status", 1)]) == [("_id", -1), ("status", 1)]
+
+
+def test_page_token_keeps_types_and_nested_fields():
+    sort = keyset_sort([("data_programmazione.ora", 1)])
+    doc = {"_id": ObjectId(), "data_programmazione": {"ora": datetime(2026, 3, 1, 9, 30)}}
+    assert decode_page_token(encode_page_token(doc, sort), sort) == [
+        doc["data_programmazione"]["ora"], doc["_id"],
+    ]
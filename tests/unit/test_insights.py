@@ -0,0 +1,49 @@
+"""
+Test ingestion insights (backend/services/insights.py)
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+from backend.dao.base_dao import BaseDAO
+from backend.dao.post_dao import PostDAO
+from backend.services import insights
+from tests.unit.fakes import FakeCollection
+
+
+def _dao(count):
+    start = datetime(2026, 3, 1)
+    docs = [
+        {"_id": ObjectId(), "status": "published", "media_id": f"m{i}",
+         "created_at": start + timedelta(minutes=i // 4)}
+        for i in range(count)
+    ]
+    docs.append({"_id": ObjectId(), "status": "draft", "created_at": start})
+    dao = PostDAO.__new__(PostDAO)
+    BaseDAO.__init__(dao, FakeCollection(docs))
+    return dao
+
+
+def test_ingest_reads_one_page_per_chunk(monkeypatch):
+    dao = _dao(23)
+    flushed = []
+
+    async def fake_fetch(media_ids, concurrency, user_id=None):
+        # Ogni pagina e gia stata letta per intero prima delle chiamate Graph
+        assert len(dao.collection.queries) == len(flushed) + 1
+        flushed.append(list(media_ids))
+        return {media_id: object() for media_id in media_ids}
+
+    async def fake_update(metrics):
+        return len(metrics)
+
+    monkeypatch.setattr(insights, "fetch_insights", fake_fetch)
+    monkeypatch.setattr(dao, "bulk_update_metadata", fake_update)
+
+    updated = asyncio.run(insights.ingest_insights(dao, chunk_size=5))
+
+    assert updated == 23
+    assert [len(chunk) for chunk in flushed] == [5, 5, 5, 5, 3]
+    assert sorted(m for chunk in flushed for m in chunk) == sorted(f"m{i}" for i in range(23))
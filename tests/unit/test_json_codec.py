@@ -0,0 +1,35 @@
+"""
+Test decodifica JSON-ready (backend/dao/json_codec.py)
+"""
+
+import json
+from datetime import datetime, timedelta, timezone
+
+from bson import BSON, ObjectId
+
+from backend.dao.json_codec import JSON_CODEC_OPTIONS, encode_json
+
+
+def test_objectids_and_datetimes_decode_to_strings():
+    post_id = ObjectId()
+    raw = BSON.encode({"_id": post_id, "created_at": datetime(2026, 3, 1, 9, 30, 15, 123000)})
+
+    doc = BSON(raw).decode(codec_options=JSON_CODEC_OPTIONS)
+
+    assert doc == {"_id": str(post_id), "created_at": "2026-03-01T09:30:15.123000+00:00"}
+    parsed = datetime.fromisoformat(doc["created_at"])
+    assert parsed.utcoffset() == timedelta(0)
+
+
+def test_aware_datetimes_are_returned_in_utc():
+    rome = timezone(timedelta(hours=1))
+    raw = BSON.encode({"data_programmazione": datetime(2026, 3, 1, 10, 0, tzinfo=rome)})
+
+    doc = BSON(raw).decode(codec_options=JSON_CODEC_OPTIONS)
+
+    assert doc["data_programmazione"] == "2026-03-01T09:00:00+00:00"
+
+
+def test_encode_json_is_compact_utf8():
+    assert json.loads(encode_json([{"testo": "però"}])) == [{"testo": "però"}]
+    assert encode_json({"a": 1}) == b'{"a":1}'
@@ -0,0 +1,213 @@
+"""
+Test invalidazione di QueryCache (backend/dao/query_cache.py) e letture
+in cache di BaseDAO/SyncBaseDAO
+"""
+
+import asyncio
+import json
+import time
+
+from bson import ObjectId
+
+from backend.dao.base_dao import BaseDAO
+from backend.dao.query_cache import MISSING, QueryCache, filter_fields, may_match
+from backend.dao.sync_dao import SyncBaseDAO
+from tests.unit.fakes import FakeCollection, SyncFakeCollection
+
+
+COLLECTION = "posts"
+
+
+def _put(cache, name, value, filter_query=None, sort=None, positional=False):
+    key = cache.make_key(COLLECTION, name, filter_query=filter_query)
+    cache.put(key, value, cache.generation(COLLECTION), filter_query, sort, positional)
+    return key
+
+
+def _cached(cache, key):
+    return cache.get(key) is not MISSING
+
+
+def test_filter_fields_include_logical_operators():
+    query = {"status": "draft", "$or": [{"social_target": "x"}, {"metadata.views": {"$gt": 1}}]}
+    assert filter_fields(query) == {"status", "social_target", "metadata"}
+
+
+def test_may_match_is_false_only_for_failed_equalities():
+    doc = {"status": "draft", "tags": ["a", "b"], "views": 3}
+    assert may_match({"status": "draft"}, doc)
+    assert not may_match({"status": "published"}, doc)
+    assert may_match({"status": {"$in": ["draft", "scheduled"]}}, doc)
+    assert not may_match({"status": {"$in": ["published"]}}, doc)
+    assert may_match({"tags": "a"}, doc)
+    assert may_match({"missing": None}, doc)
+    # Operatori non valutati: sempre possibili
+    assert may_match({"views": {"$gt": 100}}, doc)
+    assert not may_match({"$or": [{"status": "x"}, {"status": "y"}]}, doc)
+    assert not may_match({"$and": [{"status": "draft"}, {"views": {"$eq": 4}}]}, doc)
+
+
+def test_get_returns_a_copy():
+    cache = QueryCache()
+    key = _put(cache, "find_one", {"_id": 1, "tags": ["a"]})
+    cache.get(key)["tags"].append("b")
+    assert cache.get(key) == {"_id": 1, "tags": ["a"]}
+
+
+def test_documents_without_id_are_not_cached():
+    cache = QueryCache()
+    key = _put(cache, "find_many", [{"testo": "senza _id"}])
+    assert not _cached(cache, key)
+
+
+def test_insert_drops_only_entries_the_document_can_match():
+    cache = QueryCache()
+    drafts = _put(cache, "drafts", [{"_id": 1}], {"status": "draft"})
+    published = _put(cache, "published", [{"_id": 2}], {"status": "published"})
+    recent = _put(cache, "recent", [{"_id": 3}], {"created_at": {"$gte": 0}})
+
+    cache.invalidate_insert(COLLECTION, [{"_id": 4, "status": "draft", "created_at": 1}])
+
+    assert not _cached(cache, drafts)
+    assert _cached(cache, published)
+    assert not _cached(cache, recent)
+
+
+def test_update_by_id_drops_entries_with_the_document_or_changed_fields():
+    cache = QueryCache()
+    post_id = ObjectId()
+    with_doc = _put(cache, "by_social", [{"_id": post_id}], {"social_target": "instagram"})
+    by_status = _put(cache, "by_status", [{"_id": ObjectId()}], {"status": "draft"})
+    sorted_by_date = _put(
+        cache, "scheduled", [{"_id": ObjectId()}], {"social_target": "x"},
+        sort=[("data_programmazione", 1)],
+    )
+    unrelated = _put(cache, "other_social", [{"_id": ObjectId()}], {"social_target": "linkedin"})
+    counter = _put(cache, "count", 5, {"social_target": "linkedin"})
+
+    cache.invalidate_update(COLLECTION, post_id, {"status", "data_programmazione.ora"})
+
+    assert not _cached(cache, with_doc)
+    assert not _cached(cache, by_status)
+    assert not _cached(cache, sorted_by_date)
+    assert _cached(cache, unrelated)
+    assert _cached(cache, counter)
+
+
+def test_delete_drops_counts_pages_and_entries_with_the_document():
+    cache = QueryCache()
+    post_id = ObjectId()
+    with_doc = _put(cache, "with_doc", [{"_id": post_id}], {"status": "draft"})
+    counter = _put(cache, "count", 10, {"status": "draft"})
+    page = _put(cache, "page", ([{"_id": ObjectId()}], "token"), {"status": "draft"}, positional=True)
+    unrelated = _put(cache, "unrelated", [{"_id": ObjectId()}], {"status": "draft"})
+    not_found = _put(cache, "find_one_missing", None, {"_id": ObjectId()})
+
+    cache.invalidate_delete(COLLECTION, post_id)
+
+    assert not _cached(cache, with_doc)
+    assert not _cached(cache, counter)
+    assert not _cached(cache, page)
+    assert _cached(cache, unrelated)
+    assert _cached(cache, not_found)
+
+
+def test_read_that_raced_a_write_is_not_stored():
+    cache = QueryCache()
+    key = cache.make_key(COLLECTION, "find_many", filter_query={"status": "draft"})
+    generation = cache.generation(COLLECTION)
+
+    # La scrittura arriva mentre la lettura e in volo
+    cache.invalidate_update(COLLECTION, ObjectId(), {"metadata"})
+    cache.put(key, [{"_id": 1}], generation, {"status": "draft"})
+
+    assert not _cached(cache, key)
+
+
+def test_writes_on_other_collections_do_not_block_puts():
+    cache = QueryCache()
+    generation = cache.generation(COLLECTION)
+    cache.invalidate_collection("instagram_media")
+    key = _put(cache, "find_many", [{"_id": 1}])
+    cache.put(key, [{"_id": 1}], generation)
+    assert _cached(cache, key)
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    cache = QueryCache(ttl=30)
+    key = _put(cache, "find_one", {"_id": 1})
+
+    now[0] += 29
+    assert _cached(cache, key)
+    now[0] += 1
+    assert not _cached(cache, key)
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = QueryCache(max_entries=2)
+    first = _put(cache, "first", {"_id": 1})
+    second = _put(cache, "second", {"_id": 2})
+    cache.get(first)
+    third = _put(cache, "third", {"_id": 3})
+
+    assert _cached(cache, first)
+    assert not _cached(cache, second)
+    assert _cached(cache, third)
+
+
+def test_clear_drops_entries_and_in_flight_reads():
+    cache = QueryCache()
+    key = _put(cache, "find_one", {"_id": 1})
+    generation = cache.generation(COLLECTION)
+    cache.clear()
+    cache.put(key, {"_id": 1}, generation)
+    assert not _cached(cache, key)
+
+
+def _media(count):
+    return [{"_id": f"m{i}", "user_id": "ig-user", "timestamp": i, "caption": ""} for i in range(count)]
+
+
+def test_sync_dao_serves_repeated_reads_from_the_cache():
+    collection = SyncFakeCollection(_media(3), name="instagram_media")
+    dao = SyncBaseDAO(collection, cache=QueryCache())
+
+    first = dao.find_many({"user_id": "ig-user"}, sort=[("timestamp", -1)])
+    assert dao.find_many({"user_id": "ig-user"}, sort=[("timestamp", -1)]) == first
+    assert dao.find_one({"_id": "m1"}) == dao.find_one({"_id": "m1"})
+    assert len(collection.queries) == 2
+
+
+def test_sync_dao_writes_invalidate_its_cache():
+    collection = SyncFakeCollection(_media(2), name="instagram_media")
+    dao = SyncBaseDAO(collection, cache=QueryCache())
+
+    dao.find_many({"user_id": "ig-user"})
+    dao.update_one({"_id": "m0"}, {"caption": "nuova"})
+    assert dao.find_many({"user_id": "ig-user"})[0]["caption"] == "nuova"
+
+    dao.insert_one({"_id": "m9", "user_id": "ig-user"})
+    assert len(dao.find_many({"user_id": "ig-user"})) == 3
+
+    dao.delete_one({"_id": "m9"})
+    assert len(dao.find_many({"user_id": "ig-user"})) == 2
+    assert len(collection.queries) == 4
+
+
+def test_find_many_json_is_cached_and_invalidated():
+    collection = FakeCollection(_media(3), name="instagram_media")
+    dao = BaseDAO(collection, cache=QueryCache())
+
+    async def scenario():
+        read = lambda: dao.find_many_json({"user_id": "ig-user"}, limit=2, sort=[("timestamp", -1)])
+        first = await read()
+        assert await read() == first
+        await dao.update_one({"_id": "m2"}, {"caption": "nuova"})
+        return first, await read()
+
+    first, after_update = asyncio.run(scenario())
+    assert [media["_id"] for media in json.loads(first)] == ["m2", "m1"]
+    assert json.loads(after_update)[0]["caption"] == "nuova"
+    assert len(collection.queries) == 2
@@ -0,0 +1,92 @@
+"""
+Test TokenBucket e RateLimiter (backend/app/rate_limit.py)
+"""
+
+import asyncio
+
+import pytest
+
+from backend.app import rate_limit
+from backend.app.rate_limit import RateLimiter, TokenBucket, _parse_usage_header
+
+
+class FakeClock:
+    """Orologio finto: asyncio.sleep fa solo avanzare il tempo"""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limit.time, "monotonic", clock.monotonic)
+    monkeypatch.setattr(rate_limit.asyncio, "sleep", clock.sleep)
+    return clock
+
+
+def _acquire(bucket, times):
+    async def run():
+        for _ in range(times):
+            await bucket.acquire()
+    asyncio.run(run())
+
+
+def test_burst_up_to_capacity_then_waits_for_refill(clock):
+    bucket = TokenBucket(rate=2, capacity=3)
+    _acquire(bucket, 3)
+    assert clock.sleeps == []
+
+    _acquire(bucket, 1)
+    assert clock.sleeps == [pytest.approx(0.5)]
+
+
+def test_tokens_never_exceed_capacity(clock):
+    bucket = TokenBucket(rate=1, capacity=2)
+    _acquire(bucket, 2)
+    clock.now += 3600
+    _acquire(bucket, 2)
+    _acquire(bucket, 1)
+    assert clock.sleeps == [pytest.approx(1.0)]
+
+
+def test_pause_blocks_until_expiry(clock):
+    bucket = TokenBucket(rate=1, capacity=5)
+    bucket.pause(30)
+    bucket.pause(10)  # una pausa piu corta non accorcia quella in corso
+    _acquire(bucket, 1)
+    assert clock.now == pytest.approx(1030.0)
+
+
+def test_throttle_slows_refill(clock):
+    bucket = TokenBucket(rate=1, capacity=1)
+    bucket.throttle = 0.5
+    _acquire(bucket, 2)
+    assert clock.sleeps == [pytest.approx(2.0)]
+
+
+def test_usage_headers_throttle_and_pause(clock):
+    limiter = RateLimiter(calls_per_hour=3600)
+    limiter.update_from_headers("acct", {"x-app-usage": '{"call_count": 87.5}'})
+    assert limiter.bucket("acct").throttle == pytest.approx(0.5)
+
+    limiter.update_from_headers("acct", {
+        "x-business-use-case-usage": '{"123": [{"call_count": 100, "estimated_time_to_regain_access": 2}]}',
+    })
+    assert limiter.bucket("acct").paused_until == pytest.approx(1120.0)
+
+    limiter.update_from_headers("acct", {})
+    assert limiter.bucket("acct").throttle == 1.0
+
+
+def test_malformed_usage_header_is_ignored():
+    assert _parse_usage_header("non json") == (0.0, 0.0)
+    assert _parse_usage_header(None) == (0.0, 0.0)
@@ -0,0 +1,291 @@
+"""
+Test claim atomico, lease e idempotenza del container (backend/services/scheduler.py)
+
+PostDAO reale su una collection finta, Graph API finta e orologio finto per
+le scadenze delle lease.
+"""
+
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+from backend.app.errors import GraphUnavailableError
+from backend.app.pubblicazione import PublishError
+from backend.dao import post_dao as post_dao_module
+from backend.dao.base_dao import BaseDAO
+from backend.dao.post_dao import PostDAO
+from backend.services import scheduler as scheduler_module
+from backend.services.scheduler import PostScheduler
+from tests.unit.fakes import FakeCollection
+
+
+START = datetime(2026, 3, 1, 12, 0)
+
+
+class FakeClock(datetime):
+    current = START
+
+    @classmethod
+    def utcnow(cls):
+        return cls.current
+
+    @classmethod
+    def advance(cls, seconds):
+        cls.current += timedelta(seconds=seconds)
+
+
+class FakeGraph:
+    """Container Graph in memoria: creation_id -> status"""
+
+    def __init__(self):
+        self.containers = {}
+        self.created = 0
+        self.published = []
+        self.on_create = None
+        self.on_publish = None
+
+    async def create_container(self, url_risorsa, caption, user_id):
+        self.created += 1
+        creation_id = f"c{self.created}"
+        self.containers[creation_id] = "FINISHED"
+        if self.on_create:
+            await self.on_create(creation_id)
+        return creation_id
+
+    async def container_status(self, creation_id):
+        return self.containers.get(creation_id)
+
+    async def wait_until_ready(self, creation_id, *args, **kwargs):
+        return None
+
+    async def publish_container(self, user_id, creation_id):
+        self.published.append(creation_id)
+        self.containers[creation_id] = "PUBLISHED"
+        if self.on_publish:
+            await self.on_publish(creation_id)
+        return f"media-{creation_id}"
+
+
+@pytest.fixture
+def graph(monkeypatch):
+    FakeClock.current = START
+    monkeypatch.setattr(post_dao_module, "datetime", FakeClock)
+    monkeypatch.setattr(scheduler_module, "datetime", FakeClock)
+    graph = FakeGraph()
+    for name in ("create_container", "container_status", "wait_until_ready", "publish_container"):
+        monkeypatch.setattr(scheduler_module, name, getattr(graph, name))
+    return graph
+
+
+def _post(**fields):
+    post = {
+        "_id": ObjectId(),
+        "status": "scheduled",
+        "social_target": "instagram",
+        "data_programmazione": START - timedelta(minutes=5),
+        "url_risorsa": "https://example.com/foto.jpg",
+        "user_id": "ig-user",
+        "testo": "caption",
+        "created_at": START - timedelta(days=1),
+    }
+    post.update(fields)
+    return post
+
+
+def _dao(posts=None, collection=None, counters=None):
+    dao = PostDAO.__new__(PostDAO)
+    BaseDAO.__init__(dao, collection or FakeCollection(posts or []))
+    dao.counters = counters or FakeCollection(name="post_counters")
+    return dao
+
+
+def _scheduler(dao, owner, **kwargs):
+    return PostScheduler(dao=dao, owner=owner, sharding=False, **kwargs)
+
+
+def _run(scheduler):
+    async def run():
+        await scheduler.run_once()
+        await scheduler.stop()
+    asyncio.run(run())
+
+
+def _doc(dao, post_id):
+    return next(doc for doc in dao.collection.documents if doc["_id"] == post_id)
+
+
+def _counts(dao):
+    return {doc["_id"]: doc["count"] for doc in dao.counters.documents}
+
+
+def test_claim_is_exclusive_and_takes_the_oldest_due_post(graph):
+    posts = [
+        _post(data_programmazione=START - timedelta(minutes=1)),
+        _post(data_programmazione=START - timedelta(minutes=9)),
+        _post(data_programmazione=START + timedelta(minutes=5)),  # non ancora dovuto
+        _post(status="draft"),
+    ]
+    dao = _dao(posts)
+
+    async def claims():
+        return [await dao.claim_due_post(owner, 60) for owner in ("a", "b", "a")]
+
+    first, second, third = asyncio.run(claims())
+
+    assert (first["_id"], second["_id"], third) == (str(posts[1]["_id"]), str(posts[0]["_id"]), None)
+    assert first["attempts"] == 1
+    assert _doc(dao, posts[1]["_id"])["lease_owner"] == "a"
+    assert _doc(dao, posts[0]["_id"])["lease_owner"] == "b"
+    assert _counts(dao) == {"instagram|scheduled": -2, "instagram|publishing": 2}
+
+
+def test_expired_lease_moves_to_another_worker(graph):
+    post = _post()
+    dao = _dao([post])
+    post_id = str(post["_id"])
+
+    async def scenario():
+        assert await dao.claim_due_post("a", 60)
+        FakeClock.advance(30)
+        assert await dao.renew_lease(post_id, "a", 60)
+        FakeClock.advance(59)
+        assert await dao.claim_due_post("b", 60) is None  # lease rinnovata: ancora valida
+        FakeClock.advance(2)
+        reclaimed = await dao.claim_due_post("b", 60)
+        assert reclaimed["attempts"] == 2
+        assert not await dao.renew_lease(post_id, "a", 60)
+        assert not await dao.complete_publication(post_id, "a", "media-a")
+        assert await dao.complete_publication(post_id, "b", "media-b")
+
+    asyncio.run(scenario())
+    doc = _doc(dao, post["_id"])
+    assert (doc["status"], doc["media_id"]) == ("published", "media-b")
+    assert "lease_owner" not in doc and "lease_expires" not in doc
+
+
+def test_concurrent_schedulers_publish_each_post_once(graph):
+    posts = [_post(data_programmazione=START - timedelta(seconds=i)) for i in range(12)]
+    collection = FakeCollection(posts)
+    counters = FakeCollection(name="post_counters")
+    schedulers = [
+        _scheduler(_dao(collection=collection, counters=counters), owner, concurrency=3)
+        for owner in ("a", "b")
+    ]
+
+    async def run():
+        await asyncio.gather(*(scheduler.run_once() for scheduler in schedulers))
+        await asyncio.gather(*(scheduler.stop() for scheduler in schedulers))
+
+    asyncio.run(run())
+
+    assert len(graph.published) == len(set(graph.published)) == 12
+    for doc in collection.documents:
+        assert doc["status"] == "published"
+        assert doc["media_id"] == f"media-{doc['creation_id']}"
+    assert _counts(schedulers[0].dao) == {
+        "instagram|scheduled": -12, "instagram|publishing": 0, "instagram|published": 12,
+    }
+
+
+def test_retry_closes_a_post_whose_container_is_already_published(graph):
+    # Tentativo precedente: media_publish riuscito ma risposta persa, worker morto
+    graph.containers["c-old"] = "PUBLISHED"
+    post = _post(status="publishing", lease_owner="morto", lease_expires=START - timedelta(seconds=1),
+                 creation_id="c-old", attempts=1)
+    dao = _dao([post])
+
+    _run(_scheduler(dao, "a"))
+
+    doc = _doc(dao, post["_id"])
+    assert doc["status"] == "published"
+    assert (graph.created, graph.published) == (0, [])
+
+
+def test_retry_reuses_a_finished_container(graph):
+    graph.containers["c-old"] = "FINISHED"
+    post = _post(status="publishing", lease_owner="morto", lease_expires=START - timedelta(seconds=1),
+                 creation_id="c-old", attempts=1)
+    dao = _dao([post])
+
+    _run(_scheduler(dao, "a"))
+
+    assert graph.created == 0
+    assert graph.published == ["c-old"]
+    assert _doc(dao, post["_id"])["media_id"] == "media-c-old"
+
+
+def test_lost_publish_reply_is_not_published_twice(graph):
+    async def drop_reply(creation_id):
+        raise PublishError("timeout") from GraphUnavailableError("timeout")
+
+    graph.on_publish = drop_reply
+    post = _post()
+    dao = _dao([post])
+
+    _run(_scheduler(dao, "a", retry_delay=10))
+    doc = _doc(dao, post["_id"])
+    assert (doc["status"], doc["creation_id"]) == ("scheduled", "c1")
+
+    graph.on_publish = None
+    FakeClock.advance(11)
+    _run(_scheduler(dao, "b"))
+
+    assert _doc(dao, post["_id"])["status"] == "published"
+    assert graph.published == ["c1"]
+
+
+def test_publish_is_skipped_when_the_lease_was_taken(graph):
+    post = _post()
+    dao = _dao([post])
+
+    async def steal(creation_id):
+        _doc(dao, post["_id"])["lease_owner"] = "b"
+
+    graph.on_create = steal
+    _run(_scheduler(dao, "a"))
+
+    assert graph.published == []
+    doc = _doc(dao, post["_id"])
+    assert (doc["status"], doc["lease_owner"]) == ("publishing", "b")
+
+
+def test_late_renewal_does_not_cancel_the_final_write(graph):
+    post = _post()
+    dao = _dao([post])
+    apply_counters = dao._apply_counters
+
+    async def slow_counters(changes):
+        # Piu lungo di un intervallo di rinnovo (lease_seconds / 3)
+        await asyncio.sleep(0.1)
+        await apply_counters(changes)
+
+    dao._apply_counters = slow_counters
+    _run(_scheduler(dao, "a", lease_seconds=0.06))
+
+    assert _doc(dao, post["_id"])["status"] == "published"
+    assert _counts(dao) == {"instagram|scheduled": -1, "instagram|publishing": 0, "instagram|published": 1}
+
+
+def test_stop_cancels_stuck_publications_after_timeout(graph):
+    async def never(creation_id):
+        await asyncio.Event().wait()
+
+    graph.on_publish = never
+    post = _post()
+    dao = _dao([post])
+    scheduler = _scheduler(dao, "a")
+
+    async def run():
+        await scheduler.run_once()
+        await asyncio.sleep(0.01)
+        started = time.monotonic()
+        await scheduler.stop(timeout=0.05)
+        return time.monotonic() - started
+
+    assert asyncio.run(run()) < 1
+    assert not scheduler._tasks
+    # La lease resta: alla scadenza il post viene ripreso da un altro worker
+    assert _doc(dao, post["_id"])["status"] == "publishing"
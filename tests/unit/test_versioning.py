@@ -0,0 +1,54 @@
+"""
+Test versioning ottimistico di BaseDAO (backend/dao/base_dao.py)
+"""
+
+import asyncio
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+
+from backend.dao.base_dao import BaseDAO, VersionConflictError, document_version
+from tests.unit.fakes import FakeCollection
+
+
+def test_stamped_update_bumps_version_unless_opted_out():
+    now = datetime(2026, 3, 1)
+    bumped = BaseDAO._stamped_update({"status": "draft"}, now, upsert=False)
+    assert bumped == {"$set": {"status": "draft", "updated_at": now}, "$inc": {"version": 1}}
+
+    kept = BaseDAO._stamped_update({"$set": {"metadata.views": 3}}, now, upsert=True, bump_version=False)
+    assert "$inc" not in kept
+    assert kept["$setOnInsert"] == {"version": 1, "created_at": now}
+
+
+def test_legacy_document_without_version_is_version_zero():
+    post_id = ObjectId()
+    dao = BaseDAO(FakeCollection([{"_id": post_id, "testo": "vecchio"}]))
+    post = asyncio.run(dao.find_one({"_id": post_id}))
+    assert document_version(post) == 0
+
+    updated = asyncio.run(dao.find_one_and_update(
+        {"_id": post_id}, {"testo": "nuovo"}, expected_version=document_version(post),
+    ))
+    assert updated["testo"] == "nuovo"
+    assert updated["version"] == 1
+
+
+def test_stale_version_raises_conflict():
+    post_id = ObjectId()
+    dao = BaseDAO(FakeCollection([{"_id": post_id, "testo": "vecchio"}]))
+    asyncio.run(dao.update_one({"_id": post_id}, {"testo": "primo"}, expected_version=0))
+
+    with pytest.raises(VersionConflictError) as exc:
+        asyncio.run(dao.update_one({"_id": post_id}, {"testo": "secondo"}, expected_version=0))
+    assert (exc.value.expected_version, exc.value.current_version) == (0, 1)
+
+
+def test_system_writes_keep_the_version():
+    post_id = ObjectId()
+    collection = FakeCollection([{"_id": post_id, "version": 3}])
+    dao = BaseDAO(collection)
+    asyncio.run(dao.update_one({"_id": post_id}, {"metadata.views": 10}, bump_version=False))
+    asyncio.run(dao.update_one({"_id": post_id}, {"testo": "ok"}, expected_version=3))
+    assert collection.documents[0]["version"] == 4